@@ -1,12 +1,10 @@
 #!/usr/bin/env python
 
+import os
 import sys
-from discogs_jockey.exceptions import NoData, StopPlaying
-from discogs_jockey.collection import Record, Crate, Shelf
+from discogs_jockey.collection import Shelf
 from discogs_jockey.interactor import TerminalInteractor
-from discogs_jockey.load import load_from_dir
 from discogs_jockey.game import Game
-from discogs_jockey.discogs_api import get_collection_from_discogs
 
 # Initialise interactor
 io = TerminalInteractor()
@@ -14,34 +12,106 @@ io = TerminalInteractor()
 # Game parameters
 crate_size = 5 # How many records can you choose from?
 replace = False # Should unplayed records be put back on the shelf?
+free_picks = 1 # How many times can you find a record on the shelf instead of drawing?
+shelf_filter = {} # Restrict the set, e.g. {'year': range(1990, 2000), 'styles': 'Techno'}
+mix_bias = 0 # Chance (0-1) of each draw being like the last record played
+guests = [] # Discogs usernames of DJs playing back to back with you, in turn
+recency_weights = False # Draw records played in recent sets less often?
+switch_user = False # Forget the remembered discogs user, to play as someone else?
 
-def get_collection_offline():
+# Collection sources import their dependencies (pandas, discogs_client) only
+# when used, to keep startup fast
+
+def get_shelf_offline():
     # Load csv collection to shelf
+    from discogs_jockey.load import iter_rows_from_dir
     fdir = "collection"
-    df = load_from_dir(fdir)
-    return df
+    return Shelf(iter_rows_from_dir(fdir))
 
-def get_collection_online():
-    # Get a collection
+def get_shelf_online():
+    # Get a collection, from the local cache if it has been loaded before
+    from discogs_client.exceptions import HTTPError
+    from discogs_jockey.cache import CollectionCache
+    from discogs_jockey.credentials import CredentialCache
+    from discogs_jockey.details import DetailsCache
+    from discogs_jockey.discogs_api import (get_shelf_from_discogs,
+                                            get_merged_shelf_from_discogs)
+    from discogs_jockey.transport import transport_from_env
+    if switch_user: # asked for a username (and authorisation) again
+        CredentialCache().clear()
     try:
-        collection = get_collection_from_discogs(io)
+        # Tracklists of the next few draws are fetched in the background.
+        # The user (and access token) are remembered for next time.
+        # Set DISCOGS_JOCKEY_RECORD or _REPLAY to record or replay requests
+        if guests: # draw from each DJ's records in turn
+            return get_merged_shelf_from_discogs(
+                    io, guests, cache=CollectionCache(),
+                    details=DetailsCache(), transport=transport_from_env(),
+                    credentials=CredentialCache())
+        shelf = get_shelf_from_discogs(io, CollectionCache(),
+                                       details=DetailsCache(),
+                                       transport=transport_from_env(),
+                                       credentials=CredentialCache())
     except HTTPError: # it's not possible to get anything other than code 400
         print('Authorisation failed, try again?') # or upload collection, etc    
-    return collection
+        sys.exit()
+    return shelf
 
-collection = get_collection_online()
-if not collection.releases:
-    print("You don't have any records in your collection!")
-    print("Quitting...")
-    sys.exit()
+if __name__ == '__main__':
+    if guests and mix_bias: # a MixableShelf would lose whose records are whose
+        print("mix_bias can't be used with guests, set one of them to play")
+        sys.exit()
+    if recency_weights and (guests or mix_bias): # each draws in its own way
+        print("recency_weights can't be used with guests or mix_bias, "
+              "set one of them to play")
+        sys.exit()
+
+    # Set DISCOGS_JOCKEY_METRICS to a .json or .prom path to record timings
+    metrics_path = os.environ.get('DISCOGS_JOCKEY_METRICS')
+    if metrics_path:
+        from discogs_jockey.metrics import metrics
+        metrics.enable()
+
+    # Load up shelf
+    shelf = get_shelf_online()
+    prefetcher = shelf.prefetcher # shared by shelves made from this one
+    if shelf_filter:
+        shelf = shelf.query(**shelf_filter)
+    if mix_bias:
+        from discogs_jockey.similarity import MixableShelf
+        shelf = MixableShelf(shelf, bias=mix_bias)
+    if recency_weights: # saved next to the play history between sets
+        from discogs_jockey.sampling import RecencyWeights, WeightedShelf
+        weights = RecencyWeights.load()
+        shelf = WeightedShelf(shelf, weights=weights)
+    if not len(shelf):
+        print("You don't have any records in your collection!")
+        print("Quitting...")
+        sys.exit()
 
-# Load up shelf
-shelf = Shelf(collection)
-print("{} records loaded from your collection to the shelf, let's play!".format(len(collection.releases)))
-game = Game(shelf, TerminalInteractor())
-game.play_set() 
+    print("{} records loaded from your collection to the shelf, let's play!".format(len(shelf)))
 
-# Play discogs jockey game
-game = Game(shelf, io, rules={'cap': crate_size, 'replace': replace})
-game.play_set()
-sys.exit()
+    # Play discogs jockey game, picking up a set left unfinished last time
+    from discogs_jockey.history import (HistoryJournal, HistoryStore,
+                                        DEFAULT_JOURNAL, resume_game)
+    game = Game(shelf, io, rules={'cap': crate_size, 'replace': replace,
+                                'free_picks': free_picks})
+    session = resume_game(game, DEFAULT_JOURNAL)
+    if session is not None:
+        print("Resuming your set from {}, at round {}".format(session, game.round))
+    game.journal = HistoryJournal(DEFAULT_JOURNAL, session=session)
+    game.play_set()
+    game.journal.close()
+
+    # Stop prefetching, and trim the details cache to size
+    if prefetcher is not None:
+        prefetcher.close()
+        prefetcher.cache.close()
+
+    # Keep the finished set in the play history
+    if recency_weights:
+        weights.save()
+    HistoryStore().compact(DEFAULT_JOURNAL)
+    if metrics_path:
+        metrics.save(metrics_path)
+    sys.exit()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+""" bench_covers
+
+Thumbnail throughput of `CoverArt.warm` for a whole synthetic collection,
+with covers read from local fixture images (written once, in a temporary
+directory) instead of downloaded. Compares thumbnailing in this process
+with the default process pool, then times serving held crate covers.
+"""
+import os
+import random
+import tempfile
+import time
+from io import BytesIO
+from PIL import Image
+from discogs_jockey.collection import Shelf
+from discogs_jockey.covers import CoverArt, CoverCache
+from synthetic import make_collection_items
+
+RECORDS = 1000
+FIXTURES = 50 # distinct fixture images, shared round robin
+SIZE = 600 # pixels, as discogs primary images
+
+def write_fixtures(fdir, n=FIXTURES, seed=0):
+    """ Write `n` noisy JPEG fixture images, returning their paths."""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(n):
+        image = Image.effect_noise((SIZE, SIZE), 40 + i).convert('RGB')
+        image = Image.blend(image, Image.new('RGB', (SIZE, SIZE), tuple(
+                rng.randrange(256) for c in range(3))), 0.5)
+        out = BytesIO()
+        image.save(out, 'JPEG', quality=90)
+        path = os.path.join(fdir, 'cover{}.jpg'.format(i))
+        with open(path, 'wb') as f:
+            f.write(out.getvalue())
+        paths.append(path)
+    return paths
+
+def time_warm(records, fixtures, processes, budget=2**30):
+    """ Return (seconds, thumbnails made) to warm an empty cache."""
+    images = {record.cover_image: fixtures[i % len(fixtures)]
+              for i, record in enumerate(records)}
+    def download(url):
+        with open(images[url], 'rb') as f:
+            return f.read()
+
+    cache = CoverCache(tempfile.mkdtemp(), budget)
+    covers = CoverArt(cache, download=download, processes=processes)
+    start = time.perf_counter()
+    made, failed = covers.warm(records)
+    seconds = time.perf_counter() - start
+    return seconds, made, covers
+
+if __name__ == '__main__':
+    records = list(Shelf(make_collection_items(RECORDS)).records.values())
+    fixtures = write_fixtures(tempfile.mkdtemp())
+    for processes in [1, None]:
+        seconds, made, covers = time_warm(records, fixtures, processes)
+        print('{:>8} processes: {:5} thumbnails in {:6.2f} s, {:7.1f}/s'.format(
+                processes or os.cpu_count(), made, seconds, made / seconds))
+
+    crate = records[:5]
+    covers.hold(crate)
+    start = time.perf_counter()
+    for i in range(1000):
+        for record in crate:
+            covers.thumbnail(record)
+    print('held crate covers served in {:.2f} us each'.format(
+            1e6*(time.perf_counter() - start) / 5000))
+    print('{} thumbnail bytes stored once each on disk, for {} records'.format(
+            covers.cache.size, len(records)))
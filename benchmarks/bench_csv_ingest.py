@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+""" bench_csv_ingest
+
+Wall time and peak memory of loading a synthetic csv export onto a
+`Shelf` through pandas (`load_from_dir`) and through the streaming csv
+reader (`iter_rows_from_dir`). Each path runs in a fresh interpreter, so
+import costs are included; time is measured in a run without tracemalloc.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from synthetic import write_export_csv
+
+N_RECORDS = 200000
+
+RUN = """
+import resource, time, tracemalloc
+start = time.perf_counter()
+if {trace!r}:
+    tracemalloc.start()
+from discogs_jockey.collection import Shelf
+from discogs_jockey.load import load_from_dir, iter_rows_from_dir
+if {pandas!r}:
+    shelf = Shelf(load_from_dir({fdir!r}))
+else:
+    shelf = Shelf(iter_rows_from_dir({fdir!r}))
+peak = tracemalloc.get_traced_memory()[1]
+print(len(shelf), time.perf_counter() - start, peak,
+      resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def run(fdir, pandas, trace):
+    """ Return (records, seconds, traced peak bytes, max RSS kB) of a load."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+            [os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+             os.environ.get('PYTHONPATH', '')]))
+    out = subprocess.check_output(
+            [sys.executable, '-c', RUN.format(fdir=fdir, pandas=pandas, trace=trace)],
+            env=env)
+    n, seconds, peak, rss = out.split()
+    return int(n), float(seconds), int(peak), int(rss)
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as fdir:
+        write_export_csv(os.path.join(fdir, 'collection.csv'), N_RECORDS)
+        for label, pandas in [('pandas', True), ('csv', False)]:
+            n, seconds, _, rss = run(fdir, pandas, trace=False)
+            _, _, peak, _ = run(fdir, pandas, trace=True)
+            print('{:>6}: {} records in {:.2f} s, traced peak {:.0f} MB, '
+                  'max RSS {:.0f} MB'.format(label, n, seconds, peak/2**20,
+                                             rss/2**10))
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+""" bench_metrics
+
+Cost of instrumentation in a headless game: sets are played with metrics
+disabled (the default) and enabled, and the metrics collected while
+enabled are printed as Prometheus text.
+"""
+import time
+from discogs_jockey.collection import RecordTable
+from discogs_jockey.metrics import metrics
+from discogs_jockey.simulate import ChooseWithProbability, play_sets
+from bench_random_records import make_records
+
+RECORDS = 100000
+SETS = 200
+
+def time_sets(table):
+    """ Return mean seconds per round over `SETS` simulated sets."""
+    start = time.perf_counter()
+    stats = play_sets(table, {'cap': 5, 'replace': True},
+                      ChooseWithProbability(0.4), range(SETS))
+    rounds = sum(len(draws) for draws, cap_hits in stats)
+    return (time.perf_counter() - start) / rounds
+
+if __name__ == '__main__':
+    table = RecordTable(make_records(RECORDS))
+    time_sets(table) # warm up
+
+    disabled = time_sets(table)
+    metrics.enable()
+    enabled = time_sets(table)
+    metrics.disable()
+    print('disabled: {:6.2f} us/round'.format(1e6*disabled))
+    print('enabled:  {:6.2f} us/round ({:+.1%})'.format(
+            1e6*enabled, enabled/disabled - 1))
+    print()
+    print(metrics.to_prometheus())
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+""" bench_mixable_draws
+
+Time to build a `MixabilityIndex`, to find the top 20 most similar records
+for a batch of records, and per draw from a `MixableShelf` always drawing
+similar records to the last played, on synthetic collections of increasing
+size. Draws should stay within a few milliseconds at 100k records.
+"""
+import random
+import time
+from discogs_jockey.similarity import MixabilityIndex, MixableShelf
+from synthetic import make_collection_items
+
+SIZES = [1000, 10000, 100000]
+
+def time_index(n, batch=32):
+    """ Return (build seconds, seconds per record of a batched top-k)."""
+    shelf = MixableShelf(make_collection_items(n))
+    start = time.perf_counter()
+    index = MixabilityIndex(shelf.records.values())
+    build_time = time.perf_counter() - start
+
+    ids = random.Random(0).sample(index.ids, batch)
+    start = time.perf_counter()
+    index.similar(ids, k=20)
+    return build_time, (time.perf_counter() - start) / batch
+
+def time_draws(n, rounds=50, crate=5):
+    """ Return seconds per draw, after a record has been played."""
+    shelf = MixableShelf(make_collection_items(n), bias=1.0)
+    shelf.rng = random.Random(0)
+    shelf.mixability # built before timing
+    elapsed = 0.0
+    for i in range(rounds):
+        start = time.perf_counter()
+        records = shelf.random_records(crate)
+        elapsed += time.perf_counter() - start
+        shelf.note_round(records[:1], records[1:])
+        shelf.add_records(records[1:]) # unplayed go back
+    return elapsed / (rounds*crate)
+
+if __name__ == '__main__':
+    for n in SIZES:
+        build_time, top_k_time = time_index(n)
+        draw_time = time_draws(n)
+        print('{:>7} records: index {:7.1f} ms, top-k {:6.2f} ms/record, '
+              'draw {:6.2f} ms'.format(n, 1e3*build_time, 1e3*top_k_time,
+                                       1e3*draw_time))
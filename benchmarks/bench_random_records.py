@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+""" bench_random_records
+
+Per-draw latency of `Crate.random_records` as the shelf grows.
+Draw time should stay flat from 1k to 1M records.
+"""
+import random
+import time
+from discogs_jockey.collection import Crate
+from synthetic import make_records
+
+SIZES = [1000, 10000, 100000, 1000000]
+DRAWS = 10000 # draws timed per size
+
+def time_draws(n, draws=DRAWS):
+    """ Return mean seconds per single-record draw from a crate of `n`."""
+    crate = Crate()
+    crate.add_records(make_records(n))
+    draws = min(draws, n)
+    start = time.perf_counter()
+    for i in range(draws):
+        crate.random_records(1)
+    return (time.perf_counter() - start) / draws
+
+if __name__ == '__main__':
+    random.seed(0)
+    for n in SIZES:
+        print('{:>9} records: {:8.2f} us/draw'.format(n, 1e6*time_draws(n)))
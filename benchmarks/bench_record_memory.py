@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+""" bench_record_memory
+
+Bytes per record of a 500k record `Shelf`, measured with tracemalloc,
+against plain `__dict__` records holding fresh strings and lists.
+"""
+import gc
+import tracemalloc
+from discogs_jockey.collection import Record, Shelf
+from synthetic import make_export_rows
+
+N_RECORDS = 500000
+
+class DictRecord(object):
+    """ An unslotted, uninterned record for comparison."""
+    def __init__(self, row):
+        self.release_id = row['release_id']
+        self.title = row['Title']
+        self.artists = row['Artist']
+        self.labels = row['Label'].split(',')
+        self.cat_nums = row['Catalog#'].split(',')
+        self.year = row['Released']
+
+def fresh(value):
+    """ Return a new copy of string `value`, as a csv parser would."""
+    return value.encode('utf-8').decode('utf-8')
+
+def fresh_row(row):
+    return {k: fresh(v) if isinstance(v, str) else v for k, v in row.items()}
+
+def record_shelf(rows):
+    shelf = Shelf(None)
+    for row in rows:
+        row = fresh_row(row)
+        shelf.add_records(Record._from_values(
+                row['release_id'], row['Title'], row['Artist'],
+                row['Label'].split(','), row['Catalog#'].split(','),
+                row['Released']))
+    return shelf
+
+def dict_shelf(rows):
+    return {row['release_id']: DictRecord(fresh_row(row)) for row in rows}
+
+def bytes_per_record(build, rows):
+    """ Return traced bytes per record retained by `build(rows)`."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    shelf = build(rows)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del shelf
+    return (after - before) / len(rows)
+
+if __name__ == '__main__':
+    rows = make_export_rows(N_RECORDS)
+    print('dict records: {:6.0f} bytes/record'.format(
+            bytes_per_record(dict_shelf, rows)))
+    print('Shelf:        {:6.0f} bytes/record'.format(
+            bytes_per_record(record_shelf, rows)))
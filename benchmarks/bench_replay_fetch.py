@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+""" bench_replay_fetch
+
+Offline load test of fetching a multi-page collection, replayed from a
+synthetic cassette with latency, a rate limit and injected 429s. Reports
+wall time, requests made and responses by status, so the effect of
+concurrency and backoff on throughput can be seen without a network.
+"""
+import json
+import os
+import tempfile
+import time
+from discogs_jockey.discogs_api import make_app_client, make_collection_fetcher
+from discogs_jockey.fetch import BASE_URL, TokenBucket
+from discogs_jockey.transport import Cassette, ReplayTransport, request_key
+from synthetic import make_collection_items
+
+USERNAME = 'bench'
+N_RECORDS = 5000
+PER_PAGE = 100
+LATENCY = (0.05, 0.15) # seconds per response
+PER_MINUTE = 240
+SCENARIOS = [(1, 0.0), (4, 0.0), (4, 0.05), (8, 0.05)] # (workers, 429 rate)
+
+def write_cassette(path, n=N_RECORDS):
+    """ Record a user and `n` collection items, a page at a time."""
+    cassette = Cassette(path)
+    user_url = '{}/users/{}'.format(BASE_URL, USERNAME)
+    cassette.put(request_key('GET', user_url), 200, {}, json.dumps(
+            {'id': 1, 'username': USERNAME, 'resource_url': user_url}).encode())
+
+    items = make_collection_items(n)
+    pages = -(-n // PER_PAGE)
+    for page in range(1, pages + 1):
+        url = '{}/collection/folders/0/releases?page={}&per_page={}'.format(
+                user_url, page, PER_PAGE)
+        body = {'pagination': {'page': page, 'pages': pages, 'items': n,
+                               'per_page': PER_PAGE},
+                'releases': items[(page - 1)*PER_PAGE:page*PER_PAGE]}
+        cassette.put(request_key('GET', url), 200, {}, json.dumps(body).encode())
+    return cassette
+
+def run(cassette, workers, error_rate):
+    """ Return (seconds, items, transport) of fetching the collection."""
+    transport = ReplayTransport(cassette, latency=LATENCY,
+                                per_minute=PER_MINUTE, error_rate=error_rate)
+    start = time.perf_counter()
+    client = make_app_client(transport)
+    client.user(USERNAME).id # as get_user checks
+    fetcher = make_collection_fetcher(
+            client, workers=workers, limiter=TokenBucket(PER_MINUTE),
+            backoff=0.1)
+    items = fetcher.fetch_items(USERNAME)
+    return time.perf_counter() - start, len(items), transport
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as tmp:
+        cassette = write_cassette(os.path.join(tmp, 'cassette.jsonl'))
+        for workers, error_rate in SCENARIOS:
+            seconds, n, transport = run(cassette, workers, error_rate)
+            print('{} workers, {:>3.0%} injected 429s: {} items in {:5.2f} s '
+                  '({:6.0f} items/s), {} requests {}'.format(
+                          workers, error_rate, n, seconds, n / seconds,
+                          transport.requests, dict(transport.statuses)))
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+""" bench_search
+
+Typeahead latency of `Shelf.search` on synthetic collections: each query
+is typed one keystroke at a time, as in a free pick, and the slowest
+keystroke is reported against a budget. Also times building the index and
+the cost it adds to each draw while kept in step with the shelf.
+"""
+import sys
+import time
+from discogs_jockey.collection import Shelf
+from synthetic import make_collection_items
+
+SIZES = [1000, 10000, 100000]
+BUDGET = 0.050 # seconds per keystroke
+
+def typed(query):
+    """ Return each prefix of `query`, as typed."""
+    return [query[:i] for i in range(1, len(query) + 1)]
+
+def queries(shelf):
+    """ Return queries for records on `shelf`: a title, artist, label and
+    catalog number, and a miss.
+    """
+    records = list(shelf.records.values())
+    record = records[len(records) // 2]
+    return [record.title, record.artists, record.labels[0],
+            record.cat_nums[0], 'zzz no such record']
+
+def time_search(n):
+    """ Return (index seconds, worst keystroke seconds, mean keystroke
+    seconds, draw overhead seconds) on `n` records.
+    """
+    shelf = Shelf(make_collection_items(n))
+    start = time.perf_counter()
+    shelf.search_index
+    index_time = time.perf_counter() - start
+
+    keystrokes = []
+    for query in queries(shelf):
+        for prefix in typed(query):
+            start = time.perf_counter()
+            shelf.search(prefix)
+            keystrokes.append(time.perf_counter() - start)
+
+    # Draw with and without the index kept in step
+    draws = min(1000, n // 2)
+    start = time.perf_counter()
+    drawn = shelf.random_records(draws)
+    indexed = time.perf_counter() - start
+    shelf.add_records(drawn)
+    shelf._search = None
+    start = time.perf_counter()
+    shelf.random_records(draws)
+    plain = time.perf_counter() - start
+
+    return (index_time, max(keystrokes), sum(keystrokes) / len(keystrokes),
+            (indexed - plain) / draws)
+
+if __name__ == '__main__':
+    over_budget = False
+    for n in SIZES:
+        index_time, worst, mean, overhead = time_search(n)
+        print('{:>7} records: index {:7.1f} ms, keystroke mean {:6.2f} ms, '
+              'worst {:6.2f} ms, +{:5.1f} us/draw'.format(
+                      n, 1e3*index_time, 1e3*mean, 1e3*worst, 1e6*overhead))
+        over_budget |= worst > BUDGET
+    if over_budget:
+        print('Keystroke budget of {:.0f} ms exceeded'.format(1e3*BUDGET))
+        sys.exit(1)
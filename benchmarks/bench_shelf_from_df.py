@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+""" bench_shelf_from_df
+
+Time to build a `Shelf` from a synthetic 100k row csv export DataFrame,
+comparing the columnar ingest with the old row-by-row `iterrows` loop.
+"""
+import time
+from discogs_jockey.collection import Record, Shelf
+from synthetic import make_export_df
+
+N_ROWS = 100000
+
+def iterrows_shelf(df):
+    """ Build a Shelf the old way, one `iterrows` Series at a time."""
+    shelf = Shelf(None)
+    for i, release in df.iterrows():
+        formats = release['Format'].split(',')
+        if set(formats).isdisjoint(Shelf.formats['bad']):
+            shelf.add_records(Record(release))
+    return shelf
+
+def best_of(func, *args, repeat=3):
+    """ Return the fastest of `repeat` timed calls of `func(*args)`."""
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+if __name__ == '__main__':
+    df = make_export_df(N_ROWS)
+    old = best_of(iterrows_shelf, df, repeat=1)
+    new = best_of(Shelf, df)
+    print('iterrows: {:.3f} s'.format(old))
+    print('columnar: {:.3f} s ({:.1f}x faster)'.format(new, old / new))
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+""" bench_shelf_query
+
+Time to build `Shelf.index` once, then to start a filtered set with
+`Shelf.query`, on synthetic collections of increasing size. Queries should
+take time in proportion to the records matched, not the collection size.
+"""
+import time
+from discogs_jockey.collection import Shelf
+from synthetic import make_collection_items
+
+SIZES = [1000, 10000, 100000]
+QUERIES = [{'year': range(1990, 2000)},
+           {'year': range(1990, 2000), 'styles': 'Techno'},
+           {'genres': 'Jazz', 'formats': 'LP'},
+           {'styles': ['Acid', 'Electro'], 'formats': '12"'}]
+
+def time_queries(n, repeats=10):
+    """ Return (index seconds, [(query, matches, seconds per query)])."""
+    shelf = Shelf(make_collection_items(n))
+    start = time.perf_counter()
+    shelf.index
+    index_time = time.perf_counter() - start
+
+    results = []
+    for query in QUERIES:
+        start = time.perf_counter()
+        for i in range(repeats):
+            sub_shelf = shelf.query(**query)
+        results.append((query, len(sub_shelf),
+                        (time.perf_counter() - start) / repeats))
+    return index_time, results
+
+if __name__ == '__main__':
+    for n in SIZES:
+        index_time, results = time_queries(n)
+        print('{:>7} records: index built in {:7.1f} ms'.format(
+                n, 1e3*index_time))
+        for query, matches, seconds in results:
+            print('    {:>6} matches in {:7.2f} ms  {}'.format(
+                    matches, 1e3*seconds, query))
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+""" bench_startup
+
+Cold start budget for the game: imports `Play_Discogs_Jockey` in a fresh
+interpreter with `-X importtime` and fails (exit status 1) if the total
+import time exceeds the budget, or if a heavy dependency that only a
+collection source needs was imported.
+
+Usage: bench_startup.py [budget_ms]
+"""
+import os
+import subprocess
+import sys
+
+BUDGET_MS = 100 # default cold start budget
+HEAVY = ['pandas', 'numpy', 'discogs_client', 'requests']
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_times(module='Play_Discogs_Jockey'):
+    """ Return {module: cumulative import microseconds} for a cold import."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                           'import {}'.format(module)],
+                          env=env, cwd=ROOT, stderr=subprocess.PIPE,
+                          universal_newlines=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative_us)
+    return times
+
+def main(budget_ms=BUDGET_MS):
+    times = import_times()
+    total_ms = times['Play_Discogs_Jockey'] / 1e3
+    heavy = [name for name in HEAVY if name in times]
+
+    print('cold import: {:.1f} ms (budget {} ms)'.format(total_ms, budget_ms))
+    for name in heavy:
+        print('heavy import: {} ({:.1f} ms)'.format(name, times[name] / 1e3))
+    return 1 if heavy or total_ms > budget_ms else 0
+
+if __name__ == '__main__':
+    sys.exit(main(*[float(arg) for arg in sys.argv[1:]]))
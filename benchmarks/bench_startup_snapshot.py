@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+""" bench_startup_snapshot
+
+Time to get a drawable `Shelf` of 1M records on launch: parsing the csv
+export, unpickling a saved shelf, or opening a binary snapshot.
+"""
+import os
+import pickle
+import tempfile
+import time
+import pandas as pd
+from discogs_jockey.collection import Shelf
+from synthetic import write_export_csv
+
+N_RECORDS = 1000000
+
+def timed(label, func):
+    """ Print and return the result of timing `func()` then one draw."""
+    start = time.perf_counter()
+    shelf = func()
+    shelf.random_records(1)
+    print('{:>9}: {:8.1f} ms'.format(label, 1e3*(time.perf_counter() - start)))
+    return shelf
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'collection.csv')
+        pickle_path = os.path.join(tmp, 'shelf.pickle')
+        snap_path = os.path.join(tmp, 'shelf.snap')
+
+        write_export_csv(csv_path, N_RECORDS)
+        shelf = timed('csv', lambda: Shelf(pd.read_csv(csv_path)))
+        with open(pickle_path, 'wb') as f:
+            pickle.dump(shelf, f, protocol=pickle.HIGHEST_PROTOCOL)
+        shelf.save_snapshot(snap_path)
+        del shelf
+
+        def load_pickle():
+            with open(pickle_path, 'rb') as f:
+                return pickle.load(f)
+        timed('pickle', load_pickle)
+        timed('snapshot', lambda: Shelf.load_snapshot(snap_path))
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+""" bench_weighted_draws
+
+Per-draw and per-reweight latency of `WeightedShelf` as the shelf grows.
+Both should grow only logarithmically from 1k to 1M records.
+"""
+import random
+import time
+from discogs_jockey.sampling import RecencyWeights, WeightedShelf
+from bench_random_records import make_records, SIZES
+
+DRAWS = 10000 # draws timed per size
+
+def time_weighted(n, draws=DRAWS):
+    """ Return mean seconds per (draw, note_round + replace) on `n` records."""
+    rng = random.Random(0)
+    weights = RecencyWeights({i: rng.randrange(10) for i in range(0, n, 3)},
+                             session=10)
+    shelf = WeightedShelf(make_records(n), weights)
+    draws = min(draws, n)
+
+    start = time.perf_counter()
+    drawn = [shelf.random_records(1)[0] for i in range(draws)]
+    draw_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for record in drawn:
+        shelf.add_records(record)
+        shelf.note_round([], [record])
+    update_time = time.perf_counter() - start
+    return draw_time / draws, update_time / draws
+
+if __name__ == '__main__':
+    for n in SIZES:
+        draw, update = time_weighted(n)
+        print('{:>9} records: {:6.2f} us/draw, {:6.2f} us/reweight'.format(
+                n, 1e6*draw, 1e6*update))
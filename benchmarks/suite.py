@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+""" suite
+
+Benchmark suite of the hot paths, on seeded synthetic collections of 1k,
+100k and 1M records: loading csv exports, filling a Shelf from a DataFrame
+and from collection items, drawing, picking and emptying, headless sets of
+`Game.play_set`, and `TerminalInteractor.describe_record`.
+
+Results (best of `--repeats` seconds per operation) are written as JSON
+with `--out`. Given a `--baseline` of earlier results, the run fails if any
+case is slower than its baseline by more than `--threshold` (a fraction),
+so save a baseline on the machine it will be compared on:
+
+    PYTHONPATH=.. python suite.py --out baseline.json
+    PYTHONPATH=.. python suite.py --baseline baseline.json --threshold 0.25
+"""
+import argparse
+from itertools import islice
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from discogs_jockey.collection import RecordTable, Shelf
+from discogs_jockey.interactor import TerminalInteractor
+from discogs_jockey.load import load_from_dir
+from discogs_jockey.simulate import ChooseAfter, play_sets
+from synthetic import iter_collection_items, write_export_csv
+
+SIZES = [1000, 100000, 1000000]
+CHUNK = 100000 # collection items held at once, to bound memory at 1M
+OPS = 1000 # operations timed per repeat of per-operation cases
+SETS = 20 # sets played per repeat of play_set
+
+def best_of(repeats, run, number=1):
+    """ Return least seconds per operation over `repeats` calls of `run`,
+    each doing `number` operations and returning the seconds they took.
+    """
+    return min(run() for i in range(repeats)) / number
+
+def stopwatch(func, *args):
+    """ Return seconds taken to call func(*args)."""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def bench_load(fdir, repeats):
+    return {'load_from_dir': best_of(repeats,
+                                     lambda: stopwatch(load_from_dir, fdir))}
+
+def bench_shelf_init(df, n, repeats):
+    """ Time filling Shelves from a DataFrame and from collection items.
+
+    Items are generated (untimed) and shelved a chunk at a time.
+    """
+    def from_items():
+        seconds = 0.0
+        items = iter_collection_items(n)
+        while True:
+            chunk = list(islice(items, CHUNK))
+            if not chunk:
+                return seconds
+            seconds += stopwatch(Shelf, chunk)
+
+    return {'shelf_from_df': best_of(repeats, lambda: stopwatch(Shelf, df)),
+            'shelf_from_items': best_of(repeats, from_items)}
+
+def bench_crate(shelf, repeats, rng):
+    """ Time draws, picks and emptying, putting records back untimed."""
+    shelf.rng = rng
+    ops = min(OPS, len(shelf))
+
+    def draw():
+        start = time.perf_counter()
+        drawn = [shelf.random_records(1) for i in range(ops)]
+        seconds = time.perf_counter() - start
+        for records in drawn:
+            shelf.add_records(records)
+        return seconds
+
+    def pick():
+        ids = [[id] for id in rng.sample(list(shelf.records), ops)]
+        start = time.perf_counter()
+        picked = [shelf.pick_records(id) for id in ids]
+        seconds = time.perf_counter() - start
+        for records in picked:
+            shelf.add_records(records)
+        return seconds
+
+    def empty():
+        # A crate of five is filled and emptied each round of a game
+        crate = Shelf(None)
+        records = shelf.random_records(5)
+        seconds = 0.0
+        for i in range(ops):
+            crate.add_records(records)
+            seconds += stopwatch(crate.empty)
+        shelf.add_records(records)
+        return seconds
+
+    return {'random_records': best_of(repeats, draw, ops),
+            'pick_records': best_of(repeats, pick, ops),
+            'empty': best_of(repeats, empty, ops)}
+
+def bench_play_set(table, repeats):
+    """ Time headless sets of 30 rounds, drawing three records a round."""
+    rules = {'cap': 5, 'replace': False}
+    run = lambda: stopwatch(play_sets, table, rules, ChooseAfter(3),
+                            range(SETS))
+    return {'play_set': best_of(repeats, run, SETS)}
+
+def bench_describe(records, repeats):
+    io = TerminalInteractor()
+    records = records[:OPS]
+    def describe():
+        start = time.perf_counter()
+        for record in records:
+            io.describe_record(record)
+        return time.perf_counter() - start
+    return {'describe_record': best_of(repeats, describe, len(records))}
+
+def run_suite(sizes, repeats):
+    """ Return {'case/size': seconds per operation} of all cases."""
+    results = {}
+    for n in sizes:
+        cases = {}
+        with tempfile.TemporaryDirectory() as fdir:
+            write_export_csv(os.path.join(fdir, 'collection.csv'), n)
+            cases.update(bench_load(fdir, repeats))
+            df = load_from_dir(fdir)
+        cases.update(bench_shelf_init(df, n, repeats))
+        shelf = Shelf(df)
+        del df
+        cases.update(bench_crate(shelf, repeats, random.Random(0)))
+        records = list(shelf.records.values())
+        del shelf
+        cases.update(bench_play_set(RecordTable(records), repeats))
+        cases.update(bench_describe(records, repeats))
+        del records
+
+        for case, seconds in cases.items():
+            results['{}/{}'.format(case, n)] = seconds
+            print('{:>8} {:<18} {:12.2f} us'.format(n, case, 1e6*seconds),
+                  flush=True)
+    return results
+
+def compare(results, baseline, threshold):
+    """ Print results relative to `baseline` and return list of cases that
+    are more than `threshold` (a fraction) slower.
+    """
+    regressions = []
+    print('\n{:<26} {:>12} {:>12} {:>8}'.format('case', 'baseline us',
+                                                'now us', 'change'))
+    for case, seconds in sorted(results.items()):
+        before = baseline.get(case)
+        if not before:
+            continue
+        change = seconds / before - 1
+        regressed = change > threshold
+        if regressed:
+            regressions.append(case)
+        print('{:<26} {:12.2f} {:12.2f} {:>+7.0%}{}'.format(
+                case, 1e6*before, 1e6*seconds, change,
+                '  REGRESSED' if regressed else ''))
+    return regressions
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=lambda s: [int(n) for n in s.split(',')],
+                        default=SIZES, help='comma separated record counts')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--out', help='path to write JSON results to')
+    parser.add_argument('--baseline', help='path of JSON results to compare to')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='fraction slower than baseline to fail at')
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    results = run_suite(args.sizes, args.repeats)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'repeats': args.repeats,
+                       'results': results}, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print('\n{} case(s) regressed by more than {:.0%}'.format(
+                    len(regressions), args.threshold))
+            sys.exit(1)
@@ -0,0 +1,121 @@
+""" synthetic
+
+Seeded generators of synthetic Discogs collection data for benchmarks.
+"""
+import csv
+import random
+
+# Columns of a Discogs collection .csv export, in export order
+CSV_COLUMNS = ['Catalog#', 'Artist', 'Title', 'Label', 'Format', 'Rating',
+               'Released', 'release_id', 'CollectionFolder', 'Date Added',
+               'Collection Media Condition', 'Collection Sleeve Condition',
+               'Collection Notes']
+
+FORMATS = ['Vinyl, 12", 33 ⅓ RPM', 'Vinyl, LP, Album', 'Vinyl, 7", Single',
+           '2xVinyl, LP, Compilation', 'CD, Album', 'Cass, Album',
+           'File, MP3, EP']
+
+def _pool(rng, prefix, n):
+    """ Return `n` distinct names, repeated heavily across a collection."""
+    return ['{} {}'.format(prefix, rng.randrange(10**6)) for i in range(n)]
+
+def make_export_rows(n, seed=0):
+    """ Return list of `n` dicts shaped like rows of a Discogs csv export."""
+    return list(iter_export_rows(n, seed))
+
+def iter_export_rows(n, seed=0):
+    """ Yield `n` dicts shaped like rows of a Discogs csv export, one at a
+    time, for collections too big to hold as dicts.
+    """
+    rng = random.Random(seed)
+    artists = _pool(rng, 'Artist', max(10, n // 20))
+    labels = _pool(rng, 'Label', max(5, n // 50))
+
+    for i in range(n):
+        n_labels = 1 if rng.random() < 0.9 else 2
+        release_labels = rng.sample(labels, n_labels)
+        yield {
+            'Catalog#': ', '.join('{}{:04d}'.format(lab[-3:], rng.randrange(10**4))
+                                  for lab in release_labels),
+            'Artist': rng.choice(artists),
+            'Title': 'Title {}'.format(i),
+            'Label': ', '.join(release_labels),
+            'Format': rng.choice(FORMATS),
+            'Rating': '',
+            'Released': rng.randrange(1960, 2020),
+            'release_id': 1000000 + i,
+            'CollectionFolder': 'Uncategorized',
+            'Date Added': '2016-01-01 00:00:00',
+            'Collection Media Condition': 'Very Good Plus (VG+)',
+            'Collection Sleeve Condition': 'Very Good (VG)',
+            'Collection Notes': '',
+            }
+
+GENRES = {'Electronic': ['Techno', 'House', 'Acid', 'Ambient', 'Electro',
+                         'Drum n Bass', 'Dub Techno'],
+          'Rock': ['Punk', 'Post-Punk', 'Krautrock', 'Psychedelic Rock'],
+          'Jazz': ['Soul-Jazz', 'Hard Bop', 'Free Jazz', 'Fusion'],
+          'Funk / Soul': ['Disco', 'Funk', 'Soul', 'Boogie'],
+          'Hip Hop': ['Boom Bap', 'Instrumental', 'Trip Hop']}
+
+def make_records(n):
+    """ Return a list of `n` minimal Records. """
+    from discogs_jockey.collection import Record
+    return [Record({'release_id': i, 'title': 'Title {}'.format(i),
+                    'artists': 'Artist', 'labels': ('Label',),
+                    'cat_nums': ('CAT{}'.format(i),), 'year': 1990})
+            for i in range(n)]
+
+def make_collection_items(n, seed=0):
+    """ Return list of `n` collection item dicts shaped like those of the
+    discogs collection releases endpoint (see `discogs_api`).
+    """
+    return list(iter_collection_items(n, seed))
+
+def iter_collection_items(n, seed=0):
+    """ Yield `n` collection item dicts, as `make_collection_items`, one at
+    a time.
+    """
+    rng = random.Random(seed)
+    artists = _pool(rng, 'Artist', max(10, n // 20))
+    labels = _pool(rng, 'Label', max(5, n // 50))
+    genres = list(GENRES)
+
+    for i, row in enumerate(iter_export_rows(n, seed)):
+        names = [name.strip() for name in row['Format'].split(',')]
+        release_genres = rng.sample(genres, 1 if rng.random() < 0.8 else 2)
+        styles = [rng.choice(GENRES[genre]) for genre in release_genres]
+        release_labels = rng.sample(labels, 1 if rng.random() < 0.9 else 2)
+        yield {
+            'id': row['release_id'],
+            'instance_id': 5000000 + i,
+            'date_added': '2016-01-01T00:00:00-08:00',
+            'basic_information': {
+                'id': row['release_id'],
+                'title': row['Title'],
+                'year': row['Released'],
+                'artists': [{'name': rng.choice(artists), 'anv': '',
+                             'join': ''}],
+                'labels': [{'name': label,
+                            'catno': '{}{:04d}'.format(label[-3:],
+                                                       rng.randrange(10**4))}
+                           for label in release_labels],
+                'formats': [{'name': names[0], 'qty': '1',
+                             'descriptions': names[1:]}],
+                'genres': release_genres,
+                'styles': sorted(set(styles)),
+                'cover_image': 'https://i.discogs.com/{}.jpg'.format(
+                        row['release_id']),
+                }}
+
+def make_export_df(n, seed=0):
+    """ Return a pandas DataFrame of a synthetic `n` record csv export."""
+    import pandas as pd
+    return pd.DataFrame(make_export_rows(n, seed), columns=CSV_COLUMNS)
+
+def write_export_csv(fpath, n, seed=0):
+    """ Write a synthetic `n` record csv export to `fpath`."""
+    with open(fpath, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        writer.writerows(iter_export_rows(n, seed))
@@ -0,0 +1,210 @@
+""" cache
+
+Module for keeping a local SQLite copy of users' discogs collections, so
+that a collection loaded before can go straight onto the shelf while it is
+brought up to date in the background.
+"""
+from .collection import Record, Shelf
+from datetime import datetime, timezone
+import json
+import os
+import sqlite3
+import threading
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.discogs_jockey',
+                            'collection.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    username TEXT NOT NULL,
+    folder_id INTEGER NOT NULL,
+    instance_id INTEGER NOT NULL,
+    release_id INTEGER NOT NULL,
+    date_added TEXT NOT NULL,
+    formats TEXT NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (username, folder_id, instance_id)
+);
+CREATE INDEX IF NOT EXISTS items_added ON items (username, folder_id, date_added);
+CREATE TABLE IF NOT EXISTS syncs (
+    username TEXT NOT NULL,
+    folder_id INTEGER NOT NULL,
+    last_added TEXT,
+    PRIMARY KEY (username, folder_id)
+);
+"""
+
+def parse_date(date_added):
+    """ Return timezone aware datetime of a discogs `date_added` timestamp,
+    e.g. '2016-01-01T00:00:00-08:00'.
+    """
+    return datetime.fromisoformat(date_added)
+
+def utc_date(date_added):
+    """ Return a discogs timestamp in UTC, so that timestamps in any offset
+    sort (and compare in SQL) in time order.
+    """
+    return parse_date(date_added).astimezone(timezone.utc).isoformat()
+
+class CollectionCache():
+    """ On-disk cache of normalised Record data per username and folder."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        """
+        Args:
+            path ::: str path of SQLite database, created if necessary
+        """
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock() # one connection, shared by threads
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def load_records(self, username, folder_id=0):
+        """ Return list of cached wax Records in a user's folder."""
+        with self._lock:
+            rows = self._conn.execute(
+                    'SELECT formats, record FROM items '
+                    'WHERE username = ? AND folder_id = ?',
+                    (username, folder_id)).fetchall()
+        return [Record(json.loads(record)) for formats, record in rows
+                if Shelf.is_wax(json.loads(formats))]
+
+    def last_added(self, username, folder_id=0):
+        """ Return `date_added` of newest item seen by the last sync, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                    'SELECT last_added FROM syncs '
+                    'WHERE username = ? AND folder_id = ?',
+                    (username, folder_id)).fetchone()
+        return row[0] if row else None
+
+    def store_items(self, username, folder_id, items, replace=False):
+        """ Store collection item dicts, and return their wax Records.
+        Args:
+            items ::: list of collection item dicts (from the discogs API)
+            replace ::: bool to drop all previously cached items first
+        """
+        rows = []
+        records = []
+        for item in items:
+            info = item['basic_information']
+            record = Record._from_basic_information(info)
+            formats = [format['name'] for format in info['formats']]
+            rows.append((username, folder_id, item['instance_id'],
+                         info['id'], utc_date(item['date_added']),
+                         json.dumps(formats),
+                         json.dumps(record.to_dict())))
+            if Shelf.is_wax(formats):
+                records.append(record)
+
+        with self._lock, self._conn:
+            if replace:
+                self._conn.execute('DELETE FROM items WHERE username = ? '
+                                   'AND folder_id = ?', (username, folder_id))
+            self._conn.executemany('INSERT OR REPLACE INTO items VALUES '
+                                   '(?, ?, ?, ?, ?, ?, ?)', rows)
+            self._conn.execute(
+                    'INSERT OR REPLACE INTO syncs VALUES (?, ?, '
+                    '(SELECT MAX(date_added) FROM items '
+                    ' WHERE username = ? AND folder_id = ?))',
+                    (username, folder_id, username, folder_id))
+        return records
+
+    def remove_missing(self, username, folder_id, instance_ids):
+        """ Drop cached items not in `instance_ids`, returning release_ids
+        no longer in the folder at all.
+        """
+        instance_ids = set(instance_ids)
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                    'SELECT instance_id, release_id FROM items '
+                    'WHERE username = ? AND folder_id = ?',
+                    (username, folder_id)).fetchall()
+            gone = [row for row in rows if row[0] not in instance_ids]
+            self._conn.executemany(
+                    'DELETE FROM items WHERE username = ? AND folder_id = ? '
+                    'AND instance_id = ?',
+                    [(username, folder_id, instance) for instance, _ in gone])
+        kept = {release for instance, release in rows
+                if instance in instance_ids}
+        return sorted({release for _, release in gone} - kept)
+
+    def count(self, username, folder_id=0):
+        """ Return number of cached items (instances) in a user's folder."""
+        with self._lock:
+            return self._conn.execute(
+                    'SELECT COUNT(*) FROM items WHERE username = ? '
+                    'AND folder_id = ?', (username, folder_id)).fetchone()[0]
+
+    def sync(self, fetcher, username, folder_id=0):
+        """ Bring a cached folder up to date with discogs.
+
+        Only pages of items added since the last sync are fetched (newest
+        first); a full scan of the folder is made only if items have been
+        removed, to find which.
+        Args:
+            fetcher ::: a `discogs_jockey.fetch.CollectionFetcher` instance
+        Returns:
+            added ::: list of new wax Records
+            removed ::: list of release_ids no longer in the folder
+        """
+        last = self.last_added(username, folder_id)
+        if last is None: # never synced, fetch everything
+            items = fetcher.fetch_items(username, folder_id)
+            return self.store_items(username, folder_id, items, replace=True), []
+
+        # Page through newest items until reaching those already seen,
+        # comparing times rather than strings (offsets may differ)
+        last = parse_date(last)
+        new = []
+        total = 0
+        for page in fetcher.iter_pages(username, folder_id, sort='added',
+                                       sort_order='desc'):
+            total = page['pagination']['items']
+            fresh = [item for item in page['releases']
+                     if parse_date(item['date_added']) > last]
+            new.extend(fresh)
+            if len(fresh) < len(page['releases']):
+                break
+        added = self.store_items(username, folder_id, new)
+
+        # Reconcile removals if counts no longer agree
+        removed = []
+        if self.count(username, folder_id) != total:
+            items = fetcher.fetch_items(username, folder_id)
+            removed = self.remove_missing(
+                    username, folder_id, [item['instance_id'] for item in items])
+        return added, removed
+
+    def sync_in_background(self, fetcher, shelf, username, folder_id=0,
+                           io=None):
+        """ Start and return a daemon thread syncing a folder into `shelf`.
+
+        New and removed records are queued on the shelf with
+        `Shelf.queue_update`, and applied before its next draw. Any error is
+        stored on the thread as `error` rather than raised, and reported
+        through `io` if given.
+        Args:
+            io ::: optional `discogs_jockey.interactor.Interactor` instance
+        """
+        def run():
+            try:
+                added, removed = self.sync(fetcher, username, folder_id)
+            except Exception as err: # sync is best effort, cache still usable
+                thread.error = err
+                if io is not None:
+                    io.display_sync_failed(err)
+            else:
+                shelf.queue_update(added, removed)
+
+        thread = threading.Thread(target=run, name='discogs_jockey-sync',
+                                  daemon=True)
+        thread.error = None
+        thread.start()
+        return thread
@@ -2,32 +2,165 @@
 
 Module for loading a collection from various sources to a shelf of Records.
 Note that discogs server requests should be rate limited.
+
+Neither discogs_client nor pandas is imported here: a source can only be
+one of their types if the caller has already imported them.
 """
-from discogs_client.models import Release, CollectionFolder
-from collections import OrderedDict
-from pandas import DataFrame, Series
+from collections import OrderedDict, deque
+from array import array
 import random
+import re
+import sys
+import time
+import weakref
+from .metrics import metrics
+
+def _is_instance(obj, module, name):
+    """ Return True if `obj` is a `module.name`, without importing `module`.
+    """
+    module = sys.modules.get(module)
+    return module is not None and isinstance(obj, getattr(module, name))
+
+def _intern(value):
+    """ Return interned `value` if it is a string, else `value` unchanged."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+# Shared tuples of interned strings, e.g. labels. Tuples can't be weakly
+# referenced, so the pool is bounded instead: once full it is emptied, and
+# tuples already shared stay shared
+_pooled_tuples = {}
+_POOL_SIZE = 1 << 16
+
+def _as_tuple(values, intern=False):
+    """ Return `values` (a string or iterable of strings) as a tuple of
+    stripped strings, optionally interned and pooled.
+    """
+    if isinstance(values, str):
+        values = (values,)
+    values = tuple([value.strip() if isinstance(value, str) else value
+                    for value in values])
+    if intern:
+        pooled = _pooled_tuples.get(values)
+        if pooled is not None: # already interned
+            return pooled
+        values = tuple([_intern(value) for value in values])
+        if len(_pooled_tuples) >= _POOL_SIZE:
+            _pooled_tuples.clear()
+        _pooled_tuples[values] = values
+    return values
 
 class Record(object):
-    """ A vinyl record, do not leave in direct sunlight. """
+    """ A vinyl record, do not leave in direct sunlight. 
+    
+    Records are slotted, and repeated strings (artists, labels) are interned,
+    so that large collections stay compact in memory. `labels`, `cat_nums`,
+    `formats`, `genres` and `styles` are always tuples of stripped strings;
+    the last three are empty where the source does not give them, as is
+    `cover_image` (the url of the release's primary image).
+
+    `details` (e.g. the tracklist) is None until hydrated from a
+    `discogs_jockey.details.DetailsCache`.
+    """
+    __slots__ = ('release_id', 'title', 'artists', 'labels', 'cat_nums',
+                 'year', 'formats', 'genres', 'styles', 'cover_image',
+                 'details', '_client', '_release')
+    _fields = ('release_id', 'title', 'artists', 'labels', 'cat_nums', 'year',
+               'formats', 'genres', 'styles', 'cover_image')
+    _defaults = {'formats': (), 'genres': (), 'styles': (),
+                 'cover_image': ''} # for fields missing from a dict
     
     def __init__(self, release):
-        if isinstance(release, Release): # from discogs client
+        if _is_instance(release, 'discogs_client.models', 'Release'): # api
             self._initialise_from_release(release)
-        elif isinstance(release, Series): # from csv
+        elif _is_instance(release, 'pandas', 'Series'): # from csv
             self._initialise_from_series(release)
         elif isinstance(release, dict): # user defined
             self._initialise_from_dict(release)
         else:
             raise TypeError('Invalid release type: {}'.format(type(release)))
     
+    @classmethod
+    def _from_values(cls, release_id, title, artists, labels, cat_nums, year,
+                     formats=(), genres=(), styles=(), cover_image=''):
+        """ Return a Record built directly from its attribute values.
+
+        Skips the type dispatch of `__init__`, for bulk construction.
+        """
+        record = cls.__new__(cls)
+        record._assign(release_id, title, artists, labels, cat_nums, year,
+                       formats, genres, styles, cover_image)
+        return record
+
+    @classmethod
+    def _from_basic_information(cls, info, client=None):
+        """ Return a Record built from the `basic_information` dict of a
+        collection item, as returned by the collection releases endpoint.
+
+        No further requests are made; if `client` is given, the full release
+        can later be fetched on demand through `Record.release`.
+        """
+        record = cls.__new__(cls)
+        labels = info['labels']
+        record._assign(info['id'], info['title'],
+                       cls._join_artists(info['artists']),
+                       [label['name'] for label in labels],
+                       [label['catno'] for label in labels], info['year'],
+                       cls._format_names(info['formats']),
+                       info.get('genres', ()), info.get('styles', ()),
+                       info.get('cover_image', ''))
+        record._client = client
+        return record
+
+    @classmethod
+    def _from_row(cls, row):
+        """ Return a Record from a dict of strings, i.e. a row of a Discogs
+        csv export as read by `csv.DictReader`.
+        """
+        year = row['Released']
+        return cls._from_values(int(row['release_id']), row['Title'],
+                                row['Artist'], row['Label'].split(','),
+                                row['Catalog#'].split(','),
+                                int(year) if year.isdigit() else 0,
+                                row['Format'].split(','))
+
+    def to_dict(self):
+        """ Return dict of release details, as accepted by `Record(dict)`."""
+        return {attr: getattr(self, attr) for attr in Record._fields}
+
+    @property
+    def release(self):
+        """ The full `discogs_client.models.Release`, fetched on first use.
+
+        Returns None if the Record was not loaded from discogs.
+        """
+        if self._release is None and self._client is not None:
+            self._release = self._client.release(self.release_id)
+        return self._release
+
+    def _assign(self, release_id, title, artists, labels, cat_nums, year,
+                formats=(), genres=(), styles=(), cover_image=''):
+        """ Set Record attributes, normalising and interning strings."""
+        self.release_id = release_id
+        self.title = title
+        self.artists = _intern(artists)
+        self.labels = _as_tuple(labels, intern=True)
+        self.cat_nums = _as_tuple(cat_nums)
+        self.year = year
+        self.formats = _as_tuple(formats, intern=True)
+        self.genres = _as_tuple(genres, intern=True)
+        self.styles = _as_tuple(styles, intern=True)
+        self.cover_image = cover_image
+        self.details = None # dict of release details, once hydrated
+        self._client = None # client to fetch full release details with
+        self._release = None # full release details, once fetched
+
     def _initialise_from_dict(self, details):
         """ Assign Record info from dict of release details."""
         
         # Directly assign release details
-        for attr in ['release_id', 'title', 'artists', 
-                'cat_nums', 'labels', 'year']:
-            setattr(self, attr, details.pop(attr))
+        defaults = Record._defaults
+        self._assign(*[details.pop(attr, defaults[attr]) if attr in defaults
+                       else details.pop(attr) for attr in Record._fields])
 
         if details: # ensure no superfluous info
             raise TypeError("Unused release details {}".format(
@@ -36,29 +169,42 @@ class Record(object):
     def _initialise_from_release(self, release):
         """ Assign Record info from discogs_client.models.Release object."""
         
-        self.release_id = release.id
-        self.title = release.title
-        self.artists = self._get_artists(release)  
-        self.labels, self.cat_nums = zip(*[(label.data['name'],
-                label.data['catno']) for label in release.labels]) #append loop
-        self.year = release.year
+        labels, cat_nums = zip(*[(label.data['name'], label.data['catno'])
+                                 for label in release.labels])
+        self._assign(release.id, release.title,
+                     self._join_artists(release.data['artists']),
+                     labels, cat_nums, release.year,
+                     self._format_names(release.formats),
+                     release.genres or (), release.styles or (),
+                     (release.data.get('images') or [{}])[0].get('uri', ''))
+        self._release = release
 
     def _initialise_from_series(self, series):
         """ Assign Record from pandas.core.series.Series object """
         
-        self.release_id = series['release_id']
-        self.title = series['Title']
-        self.artists = series['Artist']
-        self.labels = series['Label'].split(',')
-        self.cat_nums = series['Catalog#'].split(',')
-        self.year = series['Released']
-
-    def _get_artists(self, release):
-        """ Return a string of artists names from a release. """
+        self._assign(series['release_id'], series['Title'], series['Artist'],
+                     series['Label'].split(','), series['Catalog#'].split(','),
+                     series['Released'], series['Format'].split(','))
+
+    @staticmethod
+    def _format_names(format_data):
+        """ Return list of format names and descriptions (e.g. 'Vinyl',
+        'LP', 'Album') from a release's format dicts, as in a csv export.
+        """
+        names = []
+        for format in format_data:
+            names.append(format['name'])
+            names.extend(format.get('descriptions', ()))
+        return names
+
+    @staticmethod
+    def _join_artists(artist_data):
+        """ Return a string of artists names from a release's artist dicts."""
         
         # Construct `artists` string artist by artist
         artists = ""
-        for artist in release.data['artists']:
+        join = ''
+        for artist in artist_data:
             name = artist['anv'] if artist['anv'] else artist['name']
             join = artist['join']
             
@@ -81,8 +227,16 @@ class Crate():
     """ An old milk crate, repurposed for holding Records."""
     
     def __init__(self):
-        """ Store records as {release_id: `Record`}. """
+        """ Store records as {release_id: `Record`}.
+
+        Alongside `records`, release_ids are kept in a flat list `_ids`
+        (with their positions in `_slots`) so that random draws and removal
+        by release_id are O(1), using swap-with-last removal.
+        """
         self.records = OrderedDict()
+        self._ids = [] # release_ids in arbitrary order, for random draws
+        self._slots = {} # {release_id: index in self._ids}
+        self.rng = random # or a seeded `random.Random` instance
     
     def __len__(self):
         return len(self.records)
@@ -98,7 +252,7 @@ class Crate():
 
         # Add records to collection
         for record in records:
-            self.records[record.release_id] = record
+            self._put(record)
    
     def pick_records(self, ids):
         """ Remove and return specific records.
@@ -108,7 +262,7 @@ class Crate():
         Returns:
             records ::: list of Record objects
         """
-        return [self.records.pop(id) for id in ids]
+        return [self._take(id) for id in ids]
 
     def random_records(self, n):                                                    
         """ Return list of `n` records removed at random.
@@ -121,15 +275,61 @@ class Crate():
         records = []
         for i in range(n):
             # Randomly pop record
-            pick = random.choice(list(self.records.keys()))                          
-            records.append(self.records.pop(pick))
+            records.append(self._take_slot(self._pick_slot()))
         
         return records
+
+    def _pick_slot(self):
+        """ Return the slot of a record to draw, at random."""
+        return self.rng.randrange(len(self._ids))
     
     def empty(self):
         """ Remove all records and return them as list. """
-        return [self.records.popitem()[1]
-                for i in range(len(self))]
+        records = [self.records.popitem()[1]
+                   for i in range(len(self))]
+        self._ids = []
+        self._slots = {}
+        return records
+
+    def _put(self, record):
+        """ Store a single record, replacing any with the same release_id."""
+        release_id = record.release_id
+        if release_id not in self.records:
+            if self._slots is not None:
+                self._slots[release_id] = len(self._ids)
+            self._ids.append(release_id)
+        self.records[release_id] = record
+
+    def _take(self, release_id):
+        """ Remove and return a single record by release_id in O(1)."""
+        return self._take_slot(self._slot_map()[release_id])
+
+    def _take_slot(self, slot):
+        """ Remove and return the record whose release_id is at `slot`."""
+        release_id = self._ids[slot]
+        record = self.records.pop(release_id)
+
+        # Fill the vacated slot with the last id, then drop the last slot
+        last = self._ids.pop()
+        if self._slots is not None:
+            del self._slots[release_id]
+        if last != release_id:
+            self._ids[slot] = last
+            if self._slots is not None:
+                self._slots[last] = slot
+
+        return record
+
+    def _slot_map(self):
+        """ Return {release_id: slot}, building it if not yet kept.
+
+        Crates loaded in bulk (see `Shelf.load_snapshot`) defer building it
+        until a record is first taken by release_id.
+        """
+        if self._slots is None:
+            self._slots = {release_id: slot
+                           for slot, release_id in enumerate(self._ids)}
+        return self._slots
 
 
 class Shelf(Crate):
@@ -139,17 +339,270 @@ class Shelf(Crate):
     formats = {'good': ['Vinyl'],
                'bad': ['CD', 'CDr', 'DVD', 'USB', 'Cass', 'Cassette', 'File',
                        'MP3', 'WAV', 'FLAC']}
+
+    # Matches a csv export Format string containing any bad format
+    _bad_format = re.compile(r'(?:^|,)\s*(?:{})\s*(?:,|$)'.format(
+            '|'.join(re.escape(format) for format in formats['bad'])))
     
-    def __init__(self, collection):
-        """ Fill shelf with Records from either csv or discogs collection."""
+    def __init__(self, collection, client=None):
+        """ Fill shelf with Records from either csv or discogs collection.
+        Args:
+            collection ::: `discogs_client.models.CollectionFolder`, pandas
+                           DataFrame of a csv export, any iterable of Records,
+                           collection item dicts (see `discogs_api`) or csv
+                           row dicts (see `load.iter_rows_from_dir`), or
+                           None for empty, or another Shelf to reshelve, whose
+                           prefetcher and queued updates are then shared
+            client ::: optional `discogs_client.client.Client` with which
+                       Records from collection items can fetch full releases
+        """
         
         super().__init__()  
-        if collection is None:
-            pass # let shelf remain empty
-        elif isinstance(collection, CollectionFolder):
+        self._pending = deque() # updates queued by other threads
+        self._index = None # `index.ShelfIndex`, built on first query
+        self._search = None # `search.TrigramIndex`, built on first search
+        self.prefetcher = None # `details.Prefetcher`, see `prefetch`
+        self.ahead = 0 # number of upcoming draws to prefetch details for
+        self._upcoming = deque() # release_ids pre-picked as the next draws
+        self._criteria = None # of records to take from queued updates
+        self._followers = [] # weak references to shelves made from this one
+        source = None
+        if isinstance(collection, Shelf):
+            source = collection
+            source._apply_pending()
+            collection = source.records.values()
+        if metrics.enabled:
+            start = time.perf_counter()
+        if collection is not None: # else let shelf remain empty
+            self._ingest(collection, client)
+        if metrics.enabled and collection is not None:
+            metrics.observe('ingest_seconds', time.perf_counter() - start)
+            metrics.count('records_ingested_total', len(self.records))
+        if source is not None:
+            self._follow(source)
+
+    def _follow(self, shelf, criteria=None):
+        """ Share the prefetcher of `shelf`, which this shelf was made from,
+        and receive the updates queued on it (those of records matching
+        `criteria`, as for `query`).
+        """
+        self._criteria = criteria
+        self._source = shelf # kept while updates may come through it
+        shelf._followers.append(weakref.ref(self))
+        if shelf.prefetcher is not None:
+            self.prefetch(shelf.prefetcher, shelf.ahead)
+
+    @classmethod
+    def load_snapshot(cls, path):
+        """ Return a Shelf over a snapshot file written by `save_snapshot`.
+
+        The file is memory mapped and only the array of release_ids is
+        copied, so opening is cheap even for very large shelves; Records are
+        built as they are drawn.
+        """
+        from .snapshot import Snapshot, SnapshotRecords
+
+        snapshot = Snapshot(path)
+        shelf = cls(None)
+        shelf.records = SnapshotRecords(snapshot)
+        shelf._ids = array('q')
+        shelf._ids.frombytes(snapshot.ids.cast('B'))
+        shelf._slots = None # built if a record is taken by release_id
+        return shelf
+
+    def save_snapshot(self, path):
+        """ Save records on shelf to a binary snapshot file at `path`."""
+        from .snapshot import save_snapshot
+        save_snapshot(self.records.values(), path)
+
+    @staticmethod
+    def is_wax(formats):
+        """ Return True if any of discogs `formats` names is acceptable."""
+        return not set(formats).isdisjoint(Shelf.formats['good'])
+
+    def __len__(self):
+        self._apply_pending()
+        return super().__len__()
+
+    def random_records(self, n):
+        self._apply_pending()
+        if self.prefetcher is None:
+            return super().random_records(n)
+
+        # Draw pre-picked records first, then pre-pick the next few
+        records = []
+        while self._upcoming and len(records) < n:
+            release_id = self._upcoming.popleft()
+            if release_id in self.records: # not since taken
+                records.append(self._take(release_id))
+        records.extend(super().random_records(n - len(records)))
+        self._pre_pick()
+        return [self.prefetcher.hydrate(record) for record in records]
+    random_records.__doc__ = Crate.random_records.__doc__
+
+    def prefetch(self, prefetcher, ahead=3):
+        """ Fetch details of records ahead of them being drawn.
+
+        The next `ahead` random draws are picked in advance (uniformly, as
+        when drawn) and their details requested from `prefetcher`, so that
+        drawn records are hydrated without waiting on the network.
+        Args:
+            prefetcher ::: `discogs_jockey.details.Prefetcher` instance
+            ahead ::: int number of upcoming draws to prefetch
+        """
+        self.prefetcher = prefetcher
+        self.ahead = ahead
+        self._pre_pick()
+
+    def _pre_pick(self):
+        """ Pick upcoming draws at random (as `_pick_slot` draws), up to
+        `ahead` of them.
+        """
+        upcoming = set(self._upcoming)
+        target = min(self.ahead, len(self.records))
+        for i in range(8*target): # few draws may be likely, so give up
+            if len(upcoming) >= target:
+                break
+            release_id = self._ids[self._pick_slot()]
+            if release_id not in upcoming:
+                upcoming.add(release_id)
+                self._upcoming.append(release_id)
+        self.prefetcher.request(self._upcoming)
+
+    def _repick(self):
+        """ Pick upcoming draws afresh, once the chances of drawing each
+        record have changed.
+        """
+        self._upcoming.clear()
+        if self.prefetcher is not None:
+            self._pre_pick()
+
+    @property
+    def index(self):
+        """ `discogs_jockey.index.ShelfIndex` of records on the shelf.
+
+        Built once, the first time it is used, then kept in step with the
+        shelf as records are added and taken.
+        """
+        if self._index is None:
+            from .index import ShelfIndex
+            self._apply_pending()
+            self._index = ShelfIndex(self.records.values())
+        return self._index
+
+    def query(self, **criteria):
+        """ Return a new Shelf of the records matching all `criteria`.
+
+        Records are found through `Shelf.index` rather than by checking
+        every record, and are left on this shelf.
+        Args:
+            criteria ::: as for `discogs_jockey.index.ShelfIndex.ids`, e.g.
+                         shelf.query(year=range(1990, 2000), labels='Warp')
+        """
+        records = self.records
+        ids = self.index.ids(**criteria)
+        shelf = Shelf([records[id] for id in sorted(ids) if id in records])
+        shelf._follow(self, criteria)
+        return shelf
+
+    @property
+    def search_index(self):
+        """ `discogs_jockey.search.TrigramIndex` of records on the shelf.
+
+        Built the first time it is used, then kept in step with the shelf
+        as records are added and taken.
+        """
+        if self._search is None:
+            from .search import TrigramIndex
+            self._apply_pending()
+            self._search = TrigramIndex(self.records.values())
+        return self._search
+
+    def search(self, query, limit=10):
+        """ Return list of up to `limit` records on the shelf, best first,
+        with words starting with each word of `query` in their title,
+        artists, labels or catalog numbers. Records are left on the shelf.
+        """
+        return self.search_index.search(query, limit)
+
+    def note_round(self, played, unplayed):
+        """ Called by `Game` with the records of each finished round, for
+        shelves whose draws depend on play (see `sampling.WeightedShelf`).
+        """
+        pass
+
+    current_owner = None # whose turn it is, see `merged.MergedShelf`
+
+    def owners_of(self, release_id):
+        """ Return tuple of the owners of a record, for shelves of several
+        owners' collections (see `merged.MergedShelf`).
+        """
+        return ()
+
+    def queue_update(self, added=(), removed=()):
+        """ Queue records to add and release_ids to remove.
+
+        Safe to call from another thread (e.g. a background sync); updates
+        are applied by the thread using the shelf before its next draw.
+        They are passed on to shelves made from this one, by `query` or by
+        reshelving it, keeping only records that match a query.
+        """
+        added, removed = list(added), list(removed)
+        if self._criteria and added:
+            matching = Shelf(None)
+            matching.add_records(added)
+            ids = matching.index.ids(**self._criteria)
+            added = [record for record in added if record.release_id in ids]
+        self._pending.append((added, removed))
+        for ref in self._followers[:]:
+            shelf = ref()
+            if shelf is not None:
+                shelf.queue_update(added, removed)
+
+    def _apply_pending(self):
+        """ Apply any updates queued by `queue_update`."""
+        while self._pending:
+            added, removed = self._pending.popleft()
+            self.add_records(added)
+            self.pick_records([id for id in removed if id in self.records])
+
+    def _put(self, record):
+        if self._index is not None:
+            replaced = self.records.get(record.release_id)
+            if replaced is not None:
+                self._index.remove(replaced)
+            self._index.add(record)
+        if self._search is not None:
+            self._search.add(record)
+        super()._put(record)
+    _put.__doc__ = Crate._put.__doc__
+
+    def _take_slot(self, slot):
+        record = super()._take_slot(slot)
+        if self._index is not None:
+            self._index.remove(record)
+        if self._search is not None:
+            self._search.remove(record.release_id)
+        return record
+    _take_slot.__doc__ = Crate._take_slot.__doc__
+
+    def empty(self):
+        records = super().empty()
+        self._index = None
+        self._search = None
+        self._upcoming.clear()
+        return records
+    empty.__doc__ = Crate.empty.__doc__
+
+    def _ingest(self, collection, client=None):
+        """ Add the records of any collection type `Shelf` accepts."""
+        if _is_instance(collection, 'discogs_client.models',
+                        'CollectionFolder'):
             self._initialise_from_folder(collection)
-        elif isinstance(collection, DataFrame): # from pandas
+        elif _is_instance(collection, 'pandas', 'DataFrame'): # from csv
             self._initialise_from_df(collection)
+        elif hasattr(collection, '__iter__'): # records, items or rows
+            self._initialise_from_iterable(collection, client)
         else:
             raise TypeError('Invalid collection type: {}'.format(
                     type(collection)))
@@ -157,19 +610,173 @@ class Shelf(Crate):
     def _initialise_from_folder(self, folder):
         """ Coerce discogs_client.models.CollectionFolder to Records."""
 
-        # Extract Release objects from folder
-        for item in folder.releases:
-            release = item.release
+        # Build Records from the release summaries each page of the folder
+        # already holds, rather than fetching every release in full
+        items = (item.data for item in folder.releases)
+        self._initialise_from_items(items, folder.client)
+
+    def _initialise_from_iterable(self, iterable, client=None):
+        """ Add Records, collection item dicts or csv row dicts, streamed
+        one at a time from `iterable`.
+        """
+        for item in iterable:
+            if isinstance(item, Record):
+                self._put(item)
+            elif 'basic_information' in item: # discogs collection item
+                self._initialise_from_items([item], client)
+            elif 'Format' in item: # csv export row
+                if not Shelf._bad_format.search(item['Format']):
+                    self._put(Record._from_row(item))
+            else: # user defined
+                self._put(Record(item))
+
+    def _initialise_from_items(self, items, client=None):
+        """ Coerce collection item dicts to Records."""
+        for item in items:
+            info = item['basic_information']
             # Only store wax (i.e. exclude CDs, Tapes, MP3s etc)
-            formats = [format['name'] for format in release.formats]
-            if not set(formats).isdisjoint(Shelf.formats['good']):
-                self.records[release.id] = Record(release)
+            formats = [format['name'] for format in info['formats']]
+            if Shelf.is_wax(formats):
+                self._put(Record._from_basic_information(info, client))
 
     def _initialise_from_df(self, df):
-        """  Coerce pandas.core.frame.DataFrame object to Records. """
-        for i, release in df.iterrows():
-            # Exclude non-wax releases
-            formats = release['Format'].split(',')
-            if set(formats).isdisjoint(Shelf.formats['bad']):
-                self.records[release['release_id']] = Record(release)
+        """  Coerce pandas.core.frame.DataFrame object to Records.
+
+        Works column-wise rather than row by row: formats and labels are
+        split with vectorised string methods and Records are built in bulk
+        from the resulting columns.
+        """
+        # Exclude non-wax releases, matching whole comma separated formats
+        bad = df['Format'].str.contains(Shelf._bad_format.pattern, na=False)
+        df = df[~bad]
+
+        # Split multi-label releases, and format descriptions
+        labels = df['Label'].astype(object).fillna('').str.split(',')
+        cat_nums = df['Catalog#'].astype(object).fillna('').str.split(',')
+        formats = df['Format'].astype(object).fillna('').str.split(',')
+
+        records = map(Record._from_values, df['release_id'].tolist(),
+                      df['Title'].tolist(), df['Artist'].tolist(),
+                      labels.tolist(), cat_nums.tolist(),
+                      df['Released'].tolist(), formats.tolist())
+        for record in records:
+            self._put(record)
    
+
+class RecordTable():
+    """ An immutable table of Records, shared by many `ShelfView`s.
+
+    Lets many sessions draw from one loaded collection without each having
+    to copy it.
+    """
+
+    def __init__(self, records):
+        """ Store each release once, as {release_id: row} and rows of Records.
+
+        As on a Shelf, a later Record of a release replaces an earlier one.
+        Args:
+            records ::: iterable of Records (e.g. `Shelf.records.values()`)
+        """
+        self.rows = {} # {release_id: row}
+        table = []
+        for record in records:
+            row = self.rows.get(record.release_id)
+            if row is None:
+                self.rows[record.release_id] = len(table)
+                table.append(record)
+            else:
+                table[row] = record
+        self.records = tuple(table)
+        self._all_rows = array('i', range(len(table))) # copied by views
+
+    def __len__(self):
+        return len(self.records)
+
+    def view(self):
+        """ Return a new, full `ShelfView` of the table."""
+        return ShelfView(self)
+
+class ShelfView():
+    """ One session's shelf over a shared `RecordTable`.
+
+    Behaves like a Shelf for a Game, but records on it are tracked as two
+    int32 arrays (8 bytes per record) rather than a copy of the collection:
+    `_rows` holds the remaining rows in arbitrary order, and `_pos` the
+    position of each row in `_rows`, or -1 once taken. Draws and
+    replacement are O(1).
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._rows = table._all_rows[:]
+        self._pos = table._all_rows[:]
+        self.rng = random # or a seeded `random.Random` instance
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, release_id):
+        row = self.table.rows.get(release_id)
+        return row is not None and self._pos[row] != -1
+
+    def add_records(self, records):
+        """ Put back records (single or iterable) from the table."""
+
+        # Coerce single record to iterable
+        try:
+            records = iter(records)
+        except(TypeError):
+            records = [records]
+
+        for record in records:
+            row = self.table.rows[record.release_id]
+            if self._pos[row] == -1:
+                self._pos[row] = len(self._rows)
+                self._rows.append(row)
+
+    def pick_records(self, ids):
+        """ Remove and return specific records.
+        
+        Args:
+            ids ::: iterable of release_ids of records to return
+        Returns:
+            records ::: list of Record objects
+        """
+        records = []
+        for id in ids:
+            row = self.table.rows[id]
+            if self._pos[row] == -1:
+                raise KeyError(id)
+            records.append(self._take_slot(self._pos[row]))
+        return records
+
+    def random_records(self, n):
+        """ Return list of `n` records removed at random.
+        
+        `n` will be coerced to be < len(self)
+        """
+        n = min(len(self), n)
+        return [self._take_slot(self.rng.randrange(len(self._rows)))
+                for i in range(n)]
+
+    note_round = Shelf.note_round
+    current_owner = Shelf.current_owner
+    owners_of = Shelf.owners_of
+
+    def empty(self):
+        """ Remove all records and return them as list. """
+        records = [self.table.records[row] for row in self._rows]
+        for row in self._rows:
+            self._pos[row] = -1
+        del self._rows[:]
+        return records
+
+    def _take_slot(self, slot):
+        """ Remove and return the record at `slot` of `_rows`."""
+        row = self._rows[slot]
+        last = self._rows.pop()
+        if last != row:
+            self._rows[slot] = last
+            self._pos[last] = slot
+        self._pos[row] = -1
+        return self.table.records[row]
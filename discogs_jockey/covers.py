@@ -0,0 +1,262 @@
+""" covers
+
+Module for cover art thumbnails of Records, by release_id.
+
+Images are downloaded through a pooled HTTP session, downscaled to
+thumbnails in a process pool, and kept in a content-addressed disk cache
+(identical thumbnails are stored once) whose least recently used images
+are evicted beyond a byte budget. Thumbnails of records in the crate are
+held in memory.
+
+Pillow is only needed to make thumbnails, and is imported by the worker
+processes that do so.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from .fetch import CollectionFetcher, USER_AGENT
+
+DEFAULT_DIR = os.path.join(os.path.expanduser('~'), '.discogs_jockey', 'covers')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS covers (
+    release_id INTEGER PRIMARY KEY,
+    digest TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS covers_digest ON covers (digest);
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blobs_used ON blobs (used);
+"""
+
+def make_thumbnail(data, size=150, quality=85):
+    """ Return JPEG bytes of image `data` downscaled to fit `size` pixels.
+    """
+    from io import BytesIO
+    from PIL import Image
+
+    image = Image.open(BytesIO(data))
+    image.draft('RGB', (size, size)) # let JPEG decoding downscale cheaply
+    image = image.convert('RGB')
+    image.thumbnail((size, size))
+    out = BytesIO()
+    image.save(out, 'JPEG', quality=quality)
+    return out.getvalue()
+
+class CoverCache():
+    """ Content-addressed disk cache of thumbnails, with an LRU byte budget.
+
+    Thumbnails are files named by the SHA-256 of their bytes, under
+    `directory`; an SQLite index maps release_ids to them and records when
+    each was last used.
+    """
+
+    def __init__(self, directory=DEFAULT_DIR, budget=100*2**20):
+        """
+        Args:
+            directory ::: str directory of the cache, created if necessary
+            budget ::: int most bytes of thumbnails to keep
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.budget = budget
+        self._conn = sqlite3.connect(os.path.join(directory, 'index.sqlite'),
+                                     check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+            self.size = self._conn.execute(
+                    'SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest[2:] + '.jpg')
+
+    def __contains__(self, release_id):
+        with self._lock:
+            return self._conn.execute(
+                    'SELECT 1 FROM covers WHERE release_id = ?',
+                    (release_id,)).fetchone() is not None
+
+    def get(self, release_id):
+        """ Return thumbnail bytes of `release_id`, or None if not cached."""
+        with self._lock:
+            row = self._conn.execute(
+                    'SELECT digest FROM covers WHERE release_id = ?',
+                    (release_id,)).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._conn.execute('UPDATE blobs SET used = ? '
+                                   'WHERE digest = ?', (time.time(), row[0]))
+        try:
+            with open(self._path(row[0]), 'rb') as f:
+                return f.read()
+        except FileNotFoundError: # evicted meanwhile
+            return None
+
+    def put(self, release_id, thumbnail):
+        """ Store `thumbnail` bytes for `release_id`, evicting least
+        recently used thumbnails if over budget.
+        """
+        digest = hashlib.sha256(thumbnail).hexdigest()
+        path = self._path(digest)
+        with self._lock:
+            new = self._conn.execute('SELECT 1 FROM blobs WHERE digest = ?',
+                                     (digest,)).fetchone() is None
+            if new:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(thumbnail)
+                os.replace(path + '.tmp', path) # never a partial image
+                self.size += len(thumbnail)
+            with self._conn:
+                self._conn.execute(
+                        'INSERT OR REPLACE INTO blobs VALUES (?, ?, ?)',
+                        (digest, len(thumbnail), time.time()))
+                self._conn.execute(
+                        'INSERT OR REPLACE INTO covers VALUES (?, ?)',
+                        (release_id, digest))
+            if self.size > self.budget:
+                self._evict()
+
+    def _evict(self):
+        """ Delete least recently used thumbnails until within budget."""
+        with self._conn:
+            rows = self._conn.execute(
+                    'SELECT digest, size FROM blobs ORDER BY used').fetchall()
+            evicted = []
+            for digest, size in rows:
+                if self.size <= self.budget:
+                    break
+                evicted.append((digest,))
+                self.size -= size
+                try:
+                    os.remove(self._path(digest))
+                except FileNotFoundError:
+                    pass
+            self._conn.executemany('DELETE FROM blobs WHERE digest = ?', evicted)
+            self._conn.executemany('DELETE FROM covers WHERE digest = ?', evicted)
+
+    def close(self):
+        self._conn.close()
+
+class CoverArt():
+    """ Cover art thumbnails for Records, fetched and made on demand.
+
+    `warm` downloads (in threads) and thumbnails (in processes) the covers
+    of many records at once, e.g. a whole collection; `hold` keeps those of
+    the records in the crate in memory for `thumbnail` to serve.
+    """
+
+    def __init__(self, cache, download=None, workers=8, processes=None,
+                 size=150):
+        """
+        Args:
+            cache ::: `CoverCache` to store thumbnails in
+            download ::: optional callable url -> image bytes, by default a
+                         GET through a pooled `requests.Session`
+            workers ::: int number of downloads at once
+            processes ::: int number of thumbnailing processes (default one
+                          per CPU), 1 to thumbnail in this process
+            size ::: int width and height in pixels to fit thumbnails to
+        """
+        self.cache = cache
+        self.workers = workers
+        self.processes = processes
+        self.size = size
+        if download is None:
+            session = CollectionFetcher._make_session(workers)
+            def download(url):
+                resp = session.get(url, headers={'User-Agent': USER_AGENT},
+                                   timeout=30)
+                resp.raise_for_status()
+                return resp.content
+        self.download = download
+        self._held = {} # {release_id: thumbnail bytes} for the crate
+
+    def thumbnail(self, record):
+        """ Return thumbnail bytes of a Record's cover, or None if not
+        available without downloading it.
+        """
+        thumbnail = self._held.get(record.release_id)
+        if thumbnail is None:
+            thumbnail = self.cache.get(record.release_id)
+        return thumbnail
+
+    def hold(self, records):
+        """ Keep thumbnails of `records` (e.g. those in the crate) in memory,
+        releasing any others held.
+        """
+        held = {}
+        for record in records:
+            thumbnail = self.thumbnail(record)
+            if thumbnail is not None:
+                held[record.release_id] = thumbnail
+        self._held = held
+
+    def warm(self, records):
+        """ Make and cache thumbnails for those of `records` with a cover not
+        yet cached. Downloads run in a thread pool, feeding thumbnailing in
+        a process pool as each arrives.
+        Returns:
+            made ::: int number of thumbnails made
+            failed ::: int number of covers that could not be fetched or read
+        """
+        todo = [record for record in records
+                if record.cover_image and record.release_id not in self.cache]
+        if not todo:
+            return 0, 0
+
+        if self.processes == 1:
+            pool = ThreadPoolExecutor(1) # thumbnail in this process' thread
+        else:
+            pool = ProcessPoolExecutor(self.processes)
+        made = failed = 0
+        with ThreadPoolExecutor(self.workers) as downloads, pool:
+            def fetch(record):
+                try:
+                    return record, self.download(record.cover_image)
+                except Exception: # missing covers are skipped
+                    return record, None
+
+            def store(release_id, future):
+                try:
+                    self.cache.put(release_id, future.result())
+                    return 1, 0
+                except Exception: # not a readable image
+                    return 0, 1
+
+            def fetched():
+                # Yield downloads in order, keeping only a window of them in
+                # flight, so that few covers are held in memory at once
+                window = deque()
+                for record in todo:
+                    window.append(downloads.submit(fetch, record))
+                    if len(window) >= 2*self.workers:
+                        yield window.popleft().result()
+                while window:
+                    yield window.popleft().result()
+
+            # Store thumbnails as they are made, so few are held at once
+            pending = deque()
+            for record, data in fetched():
+                if data is None:
+                    failed += 1
+                    continue
+                pending.append((record.release_id, pool.submit(
+                        make_thumbnail, data, self.size)))
+                while pending and (pending[0][1].done()
+                                   or len(pending) > 4*self.workers):
+                    ok, bad = store(*pending.popleft())
+                    made, failed = made + ok, failed + bad
+            while pending:
+                ok, bad = store(*pending.popleft())
+                made, failed = made + ok, failed + bad
+        return made, failed
@@ -0,0 +1,59 @@
+""" credentials
+
+Module for remembering who is playing between launches: their discogs
+username and, once they have authorised discogs jockey, OAuth access token
+and secret, so later launches need neither prompts nor identity requests.
+"""
+import json
+import os
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.discogs_jockey',
+                            'credentials.json')
+
+class CredentialCache():
+    """ JSON file of the username, user id and access token and secret of
+    the last user, readable only by its owner.
+    """
+
+    fields = ('username', 'user_id', 'token', 'secret')
+
+    def __init__(self, path=DEFAULT_PATH):
+        """
+        Args:
+            path ::: str path of the file, created when first saved
+        """
+        self.path = path
+
+    def load(self):
+        """ Return dict of saved credentials, or None if there are none."""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except (FileNotFoundError, ValueError): # none, or unreadable
+            return None
+        if not saved.get('username'):
+            return None
+        return {field: saved.get(field) for field in self.fields}
+
+    def save(self, username, user_id=None, token=None, secret=None):
+        """ Save credentials, replacing any saved before.
+
+        The file is written with owner only permissions, then moved into
+        place, so it is never readable by others or left half written.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'username': username, 'user_id': user_id,
+                       'token': token, 'secret': secret}, f)
+        os.chmod(tmp_path, 0o600) # in case it existed with other permissions
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """ Forget saved credentials, e.g. when a token has been revoked."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,187 @@
+""" details
+
+Module for hydrating Records with details that collection pages do not
+include, such as tracklists. Details are fetched ahead of time in a
+background thread, for the records a shelf will draw next, and kept in a
+bounded LRU cache persisted to SQLite.
+"""
+from collections import OrderedDict
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.discogs_jockey',
+                            'details.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS details (
+    release_id INTEGER PRIMARY KEY,
+    details TEXT NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS details_used ON details (used);
+"""
+
+def release_details(release):
+    """ Return dict of the details to keep from a release's JSON data.
+
+    'tracklist' is a list of (position, title, duration) lists.
+    """
+    return {'tracklist': [[track.get('position', ''), track.get('title', ''),
+                           track.get('duration', '')]
+                          for track in release.get('tracklist', ())
+                          if track.get('type_', 'track') == 'track'],
+            'genres': release.get('genres', []),
+            'styles': release.get('styles', [])}
+
+class DetailsCache():
+    """ Release details by release_id, as an LRU of at most `maxsize` in
+    memory over at most `max_stored` on disk.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, maxsize=256, max_stored=20000,
+                 trim_every=100):
+        """
+        Args:
+            path ::: str path of SQLite database, created if necessary
+            maxsize ::: int most details to hold in memory
+            max_stored ::: int most details to keep on disk, least recently
+                           used are dropped beyond this every `trim_every`
+                           inserts, and when closed
+            trim_every ::: int inserts between trims of the disk cache
+        """
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.maxsize = maxsize
+        self.max_stored = max_stored
+        self.trim_every = trim_every
+        self._inserts = 0 # since the last trim
+        self._memory = OrderedDict() # {release_id: details}, oldest first
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock() # used by game and prefetch threads
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def __contains__(self, release_id):
+        with self._lock:
+            if release_id in self._memory:
+                return True
+            return self._conn.execute(
+                    'SELECT 1 FROM details WHERE release_id = ?',
+                    (release_id,)).fetchone() is not None
+
+    def get(self, release_id):
+        """ Return details of `release_id`, or None if not cached."""
+        with self._lock:
+            details = self._memory.get(release_id)
+            if details is not None:
+                self._memory.move_to_end(release_id)
+                return details
+            row = self._conn.execute(
+                    'SELECT details FROM details WHERE release_id = ?',
+                    (release_id,)).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._conn.execute('UPDATE details SET used = ? '
+                                   'WHERE release_id = ?',
+                                   (time.time(), release_id))
+            details = json.loads(row[0])
+            self._remember(release_id, details)
+            return details
+
+    def put(self, release_id, details):
+        """ Cache `details` of `release_id`, in memory and on disk."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                        'INSERT OR REPLACE INTO details VALUES (?, ?, ?)',
+                        (release_id, json.dumps(details), time.time()))
+                self._inserts += 1
+                if self._inserts >= self.trim_every:
+                    self._trim()
+            self._remember(release_id, details)
+
+    def _remember(self, release_id, details):
+        self._memory[release_id] = details
+        self._memory.move_to_end(release_id)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def _trim(self):
+        """ Drop least recently used details beyond `max_stored` from disk."""
+        self._conn.execute(
+                'DELETE FROM details WHERE release_id IN '
+                '(SELECT release_id FROM details ORDER BY used DESC '
+                ' LIMIT -1 OFFSET ?)', (self.max_stored,))
+        self._inserts = 0
+
+    def close(self):
+        """ Drop least recently used details beyond `max_stored`, and close."""
+        with self._lock, self._conn:
+            self._trim()
+        self._conn.close()
+
+class Prefetcher():
+    """ Fetches details of requested releases into a `DetailsCache` in a
+    background daemon thread, one at a time and in request order.
+    """
+
+    def __init__(self, fetch, cache):
+        """
+        Args:
+            fetch ::: callable release_id -> release JSON dict, e.g.
+                      `discogs_jockey.fetch.CollectionFetcher.get_release`
+            cache ::: `DetailsCache` to fill
+        """
+        self.fetch = fetch
+        self.cache = cache
+        self.error = None # last error fetching, fetches are best effort
+        self._queue = queue.Queue()
+        self._requested = set() # release_ids queued or being fetched
+        self._thread = threading.Thread(target=self._run,
+                                        name='discogs_jockey-prefetch',
+                                        daemon=True)
+        self._thread.start()
+
+    def request(self, release_ids):
+        """ Queue details of `release_ids` to be fetched, if not cached."""
+        for release_id in release_ids:
+            if release_id not in self._requested:
+                self._requested.add(release_id)
+                self._queue.put(release_id)
+
+    def hydrate(self, record):
+        """ Set `record.details` from the cache, if fetched; never blocks on
+        the network.
+        """
+        if record.details is None:
+            record.details = self.cache.get(record.release_id)
+        return record
+
+    def _run(self):
+        while True:
+            release_id = self._queue.get()
+            if release_id is None:
+                return
+            try:
+                if release_id not in self.cache:
+                    self.cache.put(release_id,
+                                   release_details(self.fetch(release_id)))
+            except Exception as err:
+                self.error = err
+            finally:
+                self._requested.discard(release_id)
+                self._queue.task_done()
+
+    def join(self):
+        """ Wait until all requested details have been fetched."""
+        self._queue.join()
+
+    def close(self):
+        """ Stop the thread once requests queued so far are done."""
+        self._queue.put(None)
+        self._thread.join()
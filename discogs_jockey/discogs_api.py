@@ -4,22 +4,69 @@ module for interacting with the discogs server via the discogs_client
 """
 
 from discogs_client import Client
-from discogs_client.exceptions import HTTPError
+from discogs_client.exceptions import ConfigurationError, HTTPError
 from discogs_jockey.interactor import TerminalInteractor
+from discogs_jockey.fetch import CollectionFetcher, USER_AGENT
+from discogs_jockey.collection import Shelf
+from discogs_jockey.transport import SessionTransport
 import os
 
-def make_app_client():
-    """ Return the discogs client authorised to Discogs_Jockey. """
+def make_app_client(transport=None):
+    """ Return the discogs client authorised to Discogs_Jockey.
+
+    Requests are made through one pooled session (see
+    `discogs_jockey.transport.SessionTransport`), which collection fetchers
+    made from the client share.
+    Args:
+        transport ::: optional `discogs_jockey.transport.Transport` to make
+                      requests through instead, e.g. to record or replay them
+    """
     # Retrieve credentials from environmental variables
-    consumer_key = os.environ['DISCOGS_JOCKEY_CONSUMER_KEY']
-    consumer_secret = os.environ['DISCOGS_JOCKEY_CONSUMER_SECRET']
-    user_agent = 'discogs_jockey/0.1' # should also be an env var
-    
+    if transport is None:
+        consumer_key = os.environ['DISCOGS_JOCKEY_CONSUMER_KEY']
+        consumer_secret = os.environ['DISCOGS_JOCKEY_CONSUMER_SECRET']
+        transport = SessionTransport()
+    else: # not needed to replay
+        consumer_key = os.environ.get('DISCOGS_JOCKEY_CONSUMER_KEY', '')
+        consumer_secret = os.environ.get('DISCOGS_JOCKEY_CONSUMER_SECRET', '')
     # Set up client
-    client = Client(user_agent, consumer_key, consumer_secret)
+    client = Client(USER_AGENT, consumer_key, consumer_secret)
+    client._fetcher = transport.wrap(client._fetcher)
     
     return client
 
+def get_identity(io, transport=None, credentials=None):
+    """ Return a client and user, from saved credentials if there are any.
+
+    Saved users are neither asked for their username nor looked up on
+    discogs, and the client is given their access token, if they have one.
+    Otherwise the username is requested (and checked) as by `get_user`, and
+    saved.
+    Args:
+        io ::: a `discogs_jockey.interactor.Interactor' instance
+        transport ::: as for `make_app_client`
+        credentials ::: optional `discogs_jockey.credentials.CredentialCache`
+    Returns:
+        client ::: a `discogs_client.client.Client` instance
+        user ::: a `discogs_client.models.User` instance
+    """
+    client = make_app_client(transport)
+    saved = credentials.load() if credentials is not None else None
+    if saved is None:
+        user = get_user(client, io)
+        if credentials is not None:
+            credentials.save(user.username, user_id=user.id)
+        return client, user
+
+    if saved['token'] and saved['secret']:
+        try:
+            client.set_token(saved['token'], saved['secret'])
+        except ConfigurationError: # no consumer key, e.g. when replaying
+            pass
+    user = client.user(saved['username']) # fetched only if details are used
+    io.greet_user(user)
+    return client, user
+
 def get_user(client, io):
     """ Return an (unauthorised) user client from user supplied username.
     Args:
@@ -54,39 +101,206 @@ def get_authorisation_code(client, io):
     auth_code = io.request_authorisation(auth_url)
     return auth_code.strip()
 
-def get_authorisation(io):
+def get_authorisation(io, transport=None, credentials=None, client=None):
     """ Get an authorised user and client from user.
+    Args:
+        io ::: a `discogs_jockey.interactor.Interactor' instance
+        transport ::: as for `make_app_client`
+        credentials ::: optional `discogs_jockey.credentials.CredentialCache`
+                        to save the access token and user to
+        client ::: optional `discogs_client.client.Client` to authorise,
+                   rather than making a new one (and session)
     Returns:
         client ::: a `discogs_client.client.Client` instance (authorised)
         user ::: a `discogs_client.models.User` instance (authorised)
     """
-    client = make_app_client()
+    if client is None:
+        client = make_app_client(transport)
     auth_code = get_authorisation_code(client, io)
-    token, secret = client.get_access_token(auth_code) # store access keys if needed
+    token, secret = client.get_access_token(auth_code)
     user = client.identity() # authorised user
+    if credentials is not None:
+        credentials.save(user.username, user_id=user.id, token=token,
+                         secret=secret)
     return client, user
 
-def get_collection_from_discogs(io):
-    """ Return a user's collection from discogs, verifying if necessary.
+def reauthorise(io, transport=None, credentials=None, client=None):
+    """ Get an authorised user and client after a request was refused (401).
+
+    A saved access token that was refused has been revoked, so it is
+    forgotten (with the rest of the saved credentials) and a new client is
+    authorised in place of the one holding it.
     Args:
-        io ::: a `discogs_jockey.interactor.Interactor' instance
+        io, transport, credentials, client ::: as for `get_authorisation`
     Returns:
-        collection ::: `discogs_client.models.CollectionFolder` instance
-                        always the 'all' folder
+        client, user ::: as for `get_authorisation`
+    """
+    saved = credentials.load() if credentials is not None else None
+    if saved is not None and saved['token']:
+        credentials.clear()
+        client = None
+    return get_authorisation(io, transport, credentials, client)
+
+def _authorised(load, io, client, user, transport=None, credentials=None):
+    """ Return `load(client, user)`, authorising (see `reauthorise`) and
+    trying once more if discogs refuses it (401).
+
+    Any other error is passed on.
     """
-    client = make_app_client()
-    user = get_user(client, io)
-    
-    # Try to access collection
     try:
-        collection = user.collection_folders[0] # 0 is folder `all`
+        return load(client, user)
     except(HTTPError) as err:
         errcode = err.args[1] # extract the error code
-        if errcode == 401: # only handle Authentication Error
-            # Seek authorisation
-            client, user = get_authorisation(io)
-            collection = user.collection_folders[0]
-        else: # pass on any other errors
+        if errcode != 401: # only handle Authentication Error
             raise err
+    client, user = reauthorise(io, transport, credentials, client)
+    return load(client, user)
+
+def make_collection_fetcher(client, **kwargs):
+    """ Return a `CollectionFetcher` authenticated as `client` is, and
+    using its transport, if it has one.
+    Args:
+        client ::: a `discogs_client.client.Client` instance
+        kwargs ::: passed on to `discogs_jockey.fetch.CollectionFetcher`
+    Returns:
+        fetcher ::: a `discogs_jockey.fetch.CollectionFetcher` instance
+    """
+    transport = getattr(client._fetcher, 'transport', None)
+    if transport is not None:
+        kwargs.setdefault('session', transport)
+
+    # Sign requests with the client's OAuth tokens, once it has them
+    oauth = getattr(client._fetcher, 'client', None)
+    sign = None
+    if oauth is not None and oauth.resource_owner_key is not None:
+        def sign(url, headers):
+            url, headers, body = oauth.sign(url, http_method='GET',
+                                            headers=headers)
+            return url, headers
+
+    return CollectionFetcher(base_url=client._base_url,
+                             user_agent=client.user_agent, sign=sign, **kwargs)
+
+def get_collection_items(client, user, folder_id=0):
+    """ Return all items in a user's collection folder, fetched concurrently.
+    Args:
+        client ::: a `discogs_client.client.Client` instance
+        user ::: a `discogs_client.models.User` instance
+        folder_id ::: int id of collection folder, 0 is folder `all`
+    Returns:
+        items ::: list of collection item dicts, each with the release
+                  summary under 'basic_information'
+    """
+    fetcher = make_collection_fetcher(client)
+    return fetcher.fetch_items(user.username, folder_id)
+
+def get_collection_from_discogs(io, transport=None, credentials=None):
+    """ Return a user's collection from discogs, verifying if necessary.
+    Args:
+        io ::: a `discogs_jockey.interactor.Interactor' instance
+        transport ::: as for `make_app_client`
+        credentials ::: as for `get_identity`
+    Returns:
+        collection ::: list of collection item dicts from the 'all' folder,
+                       to be loaded with `discogs_jockey.collection.Shelf`
+    """
+    client, user = get_identity(io, transport, credentials)
+    
+    # Access collection, seeking authorisation if necessary
+    return _authorised(get_collection_items, io, client, user, transport,
+                       credentials)
+
+def get_shelf_from_discogs(io, cache, folder_id=0, details=None,
+                           transport=None, credentials=None):
+    """ Return a Shelf of a user's collection, loaded from `cache` if possible.
+
+    A collection that has been cached before goes straight onto the shelf,
+    and is synced with discogs in the background. Otherwise the collection
+    is fetched (verifying if necessary) and cached before returning. With
+    saved `credentials`, a returning user with a cached collection gets
+    their shelf without waiting on any request.
+    Args:
+        io ::: a `discogs_jockey.interactor.Interactor' instance
+        cache ::: a `discogs_jockey.cache.CollectionCache` instance
+        folder_id ::: int id of collection folder, 0 is folder `all`
+        details ::: optional `discogs_jockey.details.DetailsCache`, to
+                    prefetch details (e.g. tracklists) of upcoming draws into
+        transport ::: as for `make_app_client`
+        credentials ::: as for `get_identity`
+    Returns:
+        shelf ::: `discogs_jockey.collection.Shelf` instance
+    """
+    client, user = get_identity(io, transport, credentials)
+    fetcher = make_collection_fetcher(client)
+    shelf = Shelf(None, client=client)
+
+    # Load previously seen collection instantly, and update it later
+    records = cache.load_records(user.username, folder_id)
+    if records:
+        shelf.add_records(records)
+        cache.sync_in_background(fetcher, shelf, user.username, folder_id,
+                                 io=io)
+        _prefetch_details(shelf, fetcher, details)
+        return shelf
+
+    # Access collection, seeking authorisation if necessary
+    def sync(client, user):
+        fetcher = make_collection_fetcher(client)
+        records, removed = cache.sync(fetcher, user.username, folder_id)
+        return fetcher, records
+    fetcher, records = _authorised(sync, io, client, user, transport,
+                                   credentials)
+
+    shelf.add_records(records)
+    _prefetch_details(shelf, fetcher, details)
+    return shelf
+
+def _prefetch_details(shelf, fetcher, details):
+    """ Start prefetching release details for `shelf`, if a cache is given.
+
+    Release requests share the fetcher's rate limit with collection syncs.
+    """
+    if details is not None:
+        from discogs_jockey.details import Prefetcher
+        shelf.prefetch(Prefetcher(fetcher.get_release, details))
+
+def get_merged_shelf_from_discogs(io, guests, folder_id=0, cache=None,
+                                  details=None, transport=None,
+                                  credentials=None):
+    """ Return a MergedShelf of the user's collection and those of `guests`,
+    taking turns to draw from each, in that order.
+
+    Collections are fetched in parallel (sharing one rate limit) and
+    shelved as their pages arrive. With a `cache`, each collection is
+    instead synced into it (fetching only what is new) in parallel, and
+    shelved from it. Guests' collections must be public. If discogs
+    refuses the user's, they are asked to authorise discogs jockey (as by
+    `reauthorise`), and collections are read again.
+    Args:
+        io ::: a `discogs_jockey.interactor.Interactor' instance
+        guests ::: list of discogs usernames of the other DJs
+        folder_id ::: int id of the user's collection folder to play from
+        cache ::: optional `discogs_jockey.cache.CollectionCache` instance
+        details ::: as for `get_shelf_from_discogs`
+        transport, credentials ::: as for `get_identity`
+    Returns:
+        shelf ::: `discogs_jockey.merged.MergedShelf` instance
+    """
+    from discogs_jockey.merged import (MergedShelf, cached_sources,
+                                       discogs_sources)
+    client, user = get_identity(io, transport, credentials)
 
-    return collection
+    def merge(client, user):
+        fetcher = make_collection_fetcher(client)
+        if cache is None:
+            sources = discogs_sources(fetcher, [user.username], folder_id)
+            sources.update(discogs_sources(fetcher, guests))
+        else:
+            sources = cached_sources(cache, fetcher, [user.username],
+                                     folder_id)
+            sources.update(cached_sources(cache, fetcher, guests))
+        return fetcher, MergedShelf(sources, turn_order=True, client=client)
+    fetcher, shelf = _authorised(merge, io, client, user, transport,
+                                 credentials)
+    _prefetch_details(shelf, fetcher, details)
+    return shelf
@@ -10,3 +10,7 @@ class NoData(OSError):
 class StopPlaying(Exception):                                                   
     """ Used to process a quit request."""                                      
     pass
+
+class FreePick(Exception):
+    """ Used to process a request to pick a record from the shelf by name."""
+    pass
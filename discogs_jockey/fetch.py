@@ -0,0 +1,233 @@
+""" fetch
+
+Module for fetching paginated collection data from the discogs API
+concurrently, within the discogs rate limit. Requests share one pooled,
+keep-alive `requests.Session`, and 429/5xx responses are retried with
+exponential backoff.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from discogs_client.exceptions import HTTPError
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from .metrics import metrics
+
+BASE_URL = 'https://api.discogs.com'
+USER_AGENT = 'discogs_jockey/0.1'
+
+class TokenBucket():
+    """ Thread-safe token bucket allowing `per_minute` requests a minute.
+
+    The bucket can be corrected from the X-Discogs-Ratelimit headers of each
+    response, so that requests made elsewhere are accounted for.
+    """
+
+    def __init__(self, per_minute=60, clock=time.monotonic, sleep=time.sleep):
+        self.capacity = per_minute
+        self.rate = per_minute / 60 # tokens per second
+        self.tokens = float(per_minute)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self._updated)*self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """ Take a token, blocking until one is available."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self._sleep(wait)
+
+    def update(self, headers):
+        """ Adjust limit and remaining tokens from discogs response headers."""
+        limit = headers.get('X-Discogs-Ratelimit')
+        remaining = headers.get('X-Discogs-Ratelimit-Remaining')
+        with self._lock:
+            self._refill()
+            if limit is not None:
+                self.capacity = int(limit)
+                self.rate = int(limit) / 60
+            if remaining is not None:
+                self.tokens = min(self.tokens, float(remaining))
+
+    def drain(self):
+        """ Empty the bucket, e.g. after being told to slow down (429)."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0)
+
+def _retry_delay(retry_after):
+    """ Return seconds to wait from a Retry-After header value, or None."""
+    if retry_after is None:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError): # not an HTTP date either
+        return None
+    if when.tzinfo is None:
+        return None
+    return max(when.timestamp() - time.time(), 0.0)
+
+class CollectionFetcher():
+    """ Fetches every page of a user's collection folder concurrently."""
+
+    retry_statuses = {429, 500, 502, 503, 504}
+
+    def __init__(self, base_url=BASE_URL, user_agent=USER_AGENT, sign=None,
+                 session=None, limiter=None, workers=4, per_page=100,
+                 max_retries=5, backoff=1.0, sleep=time.sleep):
+        """
+        Args:
+            base_url ::: str root of the discogs API (or a local stub)
+            user_agent ::: str User-Agent header sent with each request
+            sign ::: optional callable (url, headers) -> (url, headers)
+                     used to authenticate each request, e.g. with OAuth
+            session ::: `requests.Session`, created (pooled) if not given
+            limiter ::: `TokenBucket`, created at 60 requests/min if not given
+            workers ::: int number of pages to fetch at once
+            per_page ::: int collection items per page (discogs max 100)
+            max_retries ::: int attempts after a 429/5xx before giving up
+            backoff ::: float seconds before the first retry, then doubled
+            sleep ::: callable seconds -> None, waiting before a retry
+        """
+        self.base_url = base_url.rstrip('/')
+        self.user_agent = user_agent
+        self.sign = sign
+        self.session = session or self._make_session(workers)
+        self.limiter = limiter or TokenBucket()
+        self.workers = workers
+        self.per_page = per_page
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._sleep = sleep
+
+    @staticmethod
+    def _make_session(workers):
+        """ Return a `requests.Session` pooling a connection per worker."""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def get(self, url, params=None):
+        """ Return the decoded JSON body of a rate limited GET of `url`.
+
+        Raises `discogs_client.exceptions.HTTPError` for unsuccessful
+        responses, or once retries are exhausted.
+        """
+        if params:
+            url = requests.Request('GET', url, params=params).prepare().url
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            headers = {'User-Agent': self.user_agent,
+                       'Accept-Encoding': 'gzip'}
+            signed_url = url
+            if self.sign is not None:
+                signed_url, headers = self.sign(url, headers)
+
+            if metrics.enabled:
+                start = time.perf_counter()
+            try:
+                resp = self.session.get(signed_url, headers=headers,
+                                        timeout=30)
+            except requests.ConnectionError:
+                if metrics.enabled:
+                    metrics.count('http_errors_total')
+                if attempt == self.max_retries:
+                    raise
+                self._sleep_before_retry(attempt)
+                continue
+            if metrics.enabled:
+                metrics.observe('http_request_seconds',
+                                time.perf_counter() - start)
+                metrics.count('http_requests_total', status=resp.status_code)
+                metrics.count('http_received_bytes_total', len(resp.content))
+
+            self.limiter.update(resp.headers)
+            if resp.status_code not in self.retry_statuses:
+                break
+            if resp.status_code == 429:
+                self.limiter.drain()
+            if attempt < self.max_retries:
+                self._sleep_before_retry(attempt, resp.headers.get('Retry-After'))
+
+        if not 200 <= resp.status_code < 300:
+            try:
+                message = resp.json()['message']
+            except (ValueError, KeyError, TypeError):
+                message = resp.reason
+            raise HTTPError(message, resp.status_code)
+        return resp.json()
+
+    def _sleep_before_retry(self, attempt, retry_after=None):
+        """ Sleep as long as a Retry-After header asks (in seconds, or until
+        an HTTP date), or else with exponential backoff (and jitter), before
+        a retry.
+        """
+        delay = _retry_delay(retry_after)
+        if delay is None: # none given, or unreadable
+            delay = self.backoff * 2**attempt * (1 + random.random()/2)
+        self._sleep(delay)
+
+    def get_release(self, release_id):
+        """ Return the JSON body of a full release, e.g. with tracklist."""
+        return self.get('{}/releases/{}'.format(self.base_url, release_id))
+
+    def folder_url(self, username, folder_id=0):
+        """ Return the url of the releases in a user's collection folder."""
+        return '{}/users/{}/collection/folders/{}/releases'.format(
+                self.base_url, username, folder_id)
+
+    def get_page(self, username, folder_id=0, page=1, **params):
+        """ Return the JSON body of one page of a collection folder."""
+        params = dict(params, page=page, per_page=self.per_page)
+        return self.get(self.folder_url(username, folder_id), params)
+
+    def iter_pages(self, username, folder_id=0, **params):
+        """ Yield collection pages one at a time, in order.
+
+        For callers that may stop early, e.g. an incremental sync.
+        """
+        page = 1
+        while True:
+            body = self.get_page(username, folder_id, page, **params)
+            yield body
+            if page >= body['pagination']['pages']:
+                return
+            page += 1
+
+    def fetch_items(self, username, folder_id=0, **params):
+        """ Return list of all collection item dicts in a folder.
+
+        The first page is fetched to find the number of pages, the rest are
+        then fetched concurrently. Items are returned in page order.
+        """
+        first = self.get_page(username, folder_id, 1, **params)
+        items = list(first['releases'])
+        pages = range(2, first['pagination']['pages'] + 1)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            bodies = pool.map(lambda page: self.get_page(
+                    username, folder_id, page, **params), pages)
+            for body in bodies:
+                items.extend(body['releases'])
+
+        return items
@@ -3,12 +3,15 @@
 The Discogs Jockey game.
 """
 from .collection import Record, Crate, Shelf
-from .exceptions import StopPlaying
+from .exceptions import FreePick, StopPlaying
+from .metrics import metrics
+import time
 
 class Game():                                                          
     """ The discogs_jockey game."""                                          
     
-    def __init__(self, shelf, io, rules={'cap': 3, 'replace': True}):
+    def __init__(self, shelf, io, rules={'cap': 3, 'replace': True},
+                 journal=None):
         """
         Args:
             shelf ::: initialised `discogs_jockey.collection.Shelf` object
@@ -16,6 +19,12 @@ class Game():
             rules ::: dict of game rules
                     : 'cap' : int max number of records to draw per round
                     : 'replace : bool to replace unplayed records to crate
+                    : 'free_picks' : optional int number of times in a set
+                                     the user may find a record on the shelf
+                                     by name instead of drawing (default 0)
+            journal ::: optional `discogs_jockey.history.HistoryJournal` to
+                        record each round in as it is played, and the end
+                        of the set
         """
 
         self.shelf = shelf
@@ -25,6 +34,8 @@ class Game():
         self.history = {}
         self.cap = rules['cap']
         self.replace = rules['replace']
+        self.free_picks = rules.get('free_picks', 0)
+        self.journal = journal
     
     def play_set(self):
         """ Play a set of the discogs jockey game."""
@@ -36,6 +47,8 @@ class Game():
                 self.round += 1
             except(StopPlaying):
                 break
+        if self.journal is not None:
+            self.journal.finish()
         
         # Display post-set information
         self.io.display_finished()
@@ -44,23 +57,80 @@ class Game():
     def play_round(self):
         """ A single round of discogs jockey game."""
         
-        crate = self.crate
-        
         # Start round
+        if metrics.enabled:
+            start = time.perf_counter()
         choice = None # release_id of chosen record 
-        self.io.display_new_round(self.round)
+        self._announce_round()
+        draw = True
         while choice is None:
-            # Draw a record and display
-            if len(self.shelf) and len(crate) < self.cap:
-                record = self.shelf.random_records(1)
-                self.crate.add_records(record) 
-                self.io.display_option(*record)
-            else: 
-                self.io.display_cap_reached(self.cap)
-            
+            if draw:
+                self._draw()
+            else: # back from a free pick that found nothing
+                self.io.display_crate(self.crate)
             # Request user to choose
-            self.io.display_crate(crate)
-            choice = self.io.get_choice(crate)
+            try:
+                choice = self.io.get_choice(self.crate)
+                draw = True
+            except FreePick:
+                choice = self._free_pick()
+                draw = False
+        
+        self._finish_round(choice)
+        if metrics.enabled:
+            metrics.observe('round_seconds', time.perf_counter() - start)
+
+    def _announce_round(self):
+        """ Show the new round, and whose turn it is on shelves of several
+        owners' records taken in turn (see `merged.MergedShelf`).
+        """
+        self.io.display_new_round(self.round)
+        owner = self.shelf.current_owner
+        if owner is not None:
+            self.io.display_turn(owner)
+
+    def _draw(self):
+        """ Draw a record into the crate if allowed, and show the crate."""
+        crate = self.crate
+        
+        # Draw a record and display
+        if metrics.enabled:
+            start = time.perf_counter()
+        if len(self.shelf) and len(crate) < self.cap:
+            record = self.shelf.random_records(1)
+            if metrics.enabled:
+                drawn = time.perf_counter()
+                metrics.observe('draw_seconds', drawn - start)
+                start = drawn
+            self.crate.add_records(record) 
+            self.io.display_option(*record)
+            owners = self.shelf.owners_of(record[0].release_id)
+            if owners:
+                self.io.display_owners(record[0], owners)
+        else: 
+            self.io.display_cap_reached(self.cap)
+        
+        self.io.display_crate(crate)
+        if metrics.enabled:
+            metrics.observe('render_seconds', time.perf_counter() - start)
+
+    def _free_pick(self):
+        """ Move a record the user finds on the shelf into the crate, if
+        free picks are left, and return its release_id (or None).
+        """
+        if self.free_picks <= 0:
+            self.io.display_no_free_picks()
+            return None
+        release_id = self.io.find_record(self.shelf)
+        if release_id is None:
+            return None
+        self.crate.add_records(self.shelf.pick_records([release_id]))
+        self.free_picks -= 1
+        return release_id
+
+    def _finish_round(self, choice):
+        """ Play the chosen record and clear the crate."""
+        crate = self.crate
         
         # Process choice
         record = crate.pick_records([choice])
@@ -81,3 +151,47 @@ class Game():
 
         round_info = {'played': played, 'unplayed': unplayed}
         self.history[self.round] = round_info
+        self.shelf.note_round(played, unplayed)
+        if self.journal is not None:
+            self.journal.append(self.round, played, unplayed)
+
+
+class AsyncGame(Game):
+    """ The discogs_jockey game, awaiting choices from an asynchronous
+    interactor (see `discogs_jockey.interactor.AsyncInteractor`), so that
+    many games can be played at once in one event loop.
+    """
+
+    async def play_set(self):
+        """ Play a set of the discogs jockey game."""
+        
+        # Play rounds until no more unplayed records, or user requests quit
+        while len(self.shelf):
+            try:
+                await self.play_round()
+                self.round += 1
+            except(StopPlaying):
+                break
+        if self.journal is not None:
+            self.journal.finish()
+        
+        # Display post-set information
+        self.io.display_finished()
+        self.io.display_history(self.history)
+
+    async def play_round(self):
+        """ A single round of discogs jockey game."""
+        
+        # Start round
+        if metrics.enabled:
+            start = time.perf_counter()
+        choice = None # release_id of chosen record 
+        self._announce_round()
+        while choice is None:
+            self._draw()
+            # Await user's choice
+            choice = await self.io.get_choice(self.crate)
+        
+        self._finish_round(choice)
+        if metrics.enabled:
+            metrics.observe('round_seconds', time.perf_counter() - start)
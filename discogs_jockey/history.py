@@ -0,0 +1,253 @@
+""" history
+
+Module for keeping the history of played sets beyond a single game.
+
+Each round is appended to a journal (JSON lines, fsynced in batches) as it
+is played, so an interrupted set can be resumed, and the end of each set is
+marked, so a finished set never is. Journals are compacted into an indexed
+SQLite store for queries across years of sets.
+"""
+from .collection import Record
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+DEFAULT_DIR = os.path.join(os.path.expanduser('~'), '.discogs_jockey')
+DEFAULT_JOURNAL = os.path.join(DEFAULT_DIR, 'history.journal')
+DEFAULT_PATH = os.path.join(DEFAULT_DIR, 'history.sqlite')
+
+class HistoryJournal():
+    """ Append-only, crash-safe journal of the rounds of a set."""
+
+    def __init__(self, path=DEFAULT_JOURNAL, session=None, fsync_every=4):
+        """
+        Args:
+            path ::: str path of journal file, appended to if it exists
+            session ::: str id of this set, by default the start time
+                        followed by a random suffix
+            fsync_every ::: int rounds written between each fsync
+        """
+        self.path = path
+        self.session = session or '{}-{}'.format(
+                time.strftime('%Y-%m-%dT%H:%M:%S'), uuid.uuid4().hex[:8])
+        self.fsync_every = fsync_every
+        self._unsynced = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        if _torn(path): # end the line a crash left, so new rounds are whole
+            self._file.write('\n')
+            self._file.flush()
+
+    def append(self, roundn, played, unplayed):
+        """ Write a round of lists of played and unplayed Records."""
+        entry = {'session': self.session, 'round': roundn, 'time': time.time(),
+                 'played': [record.to_dict() for record in played],
+                 'unplayed': [record.to_dict() for record in unplayed]}
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self.sync()
+
+    def finish(self):
+        """ Mark the end of the set, so it is not resumed, and sync."""
+        entry = {'session': self.session, 'finished': True, 'time': time.time()}
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+        self.sync()
+
+    def sync(self):
+        """ Force written rounds to disk."""
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def close(self):
+        self.sync()
+        self._file.close()
+
+def read_journal(path):
+    """ Return list of round entries in a journal, oldest first, and end of
+    set markers (with 'finished' set, and no rounds).
+
+    Lines torn by a crash are skipped.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8', errors='replace') as f:
+        return _parse_lines(f)
+
+def _parse_lines(lines):
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except ValueError: # incomplete write
+            continue
+    return entries
+
+def _torn(path):
+    """ Return True if the file at `path` does not end in a newline."""
+    with open(path, 'rb') as f:
+        if not f.seek(0, os.SEEK_END):
+            return False # empty
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b'\n'
+
+def resume_game(game, path, session=None):
+    """ Restore `game` to the end of an interrupted set from its journal.
+
+    Played records (and unplayed ones, unless the game replaces them) are
+    taken off the shelf, the history is rebuilt and the round number set.
+    Args:
+        game ::: `discogs_jockey.game.Game` not yet started
+        path ::: str path of the journal
+        session ::: str session to resume, by default the last in journal
+    Returns:
+        session ::: str resumed session id, or None if nothing to resume
+                    (including if the set was finished)
+    """
+    entries = read_journal(path)
+    if session is None and entries:
+        session = entries[-1]['session']
+    entries = [entry for entry in entries if entry['session'] == session]
+    if any(entry.get('finished') for entry in entries):
+        return None
+
+    shelf = game.shelf
+    for entry in entries:
+        played = [_take_or_build(shelf, info) for info in entry['played']]
+        if game.replace:
+            unplayed = [Record(dict(info)) for info in entry['unplayed']]
+        else:
+            unplayed = [_take_or_build(shelf, info)
+                        for info in entry['unplayed']]
+        game.history[entry['round']] = {'played': played, 'unplayed': unplayed}
+        game.round = entry['round'] + 1
+    return session if entries else None
+
+def _take_or_build(shelf, info):
+    """ Take record described by `info` off `shelf`, or build it if absent."""
+    try:
+        return shelf.pick_records([info['release_id']])[0]
+    except KeyError:
+        return Record(dict(info))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plays (
+    session TEXT NOT NULL,
+    round INTEGER NOT NULL,
+    release_id INTEGER NOT NULL,
+    played INTEGER NOT NULL, -- 1 if played, 0 if drawn but rejected
+    time REAL,
+    PRIMARY KEY (session, round, release_id)
+);
+CREATE INDEX IF NOT EXISTS plays_release ON plays (release_id, played);
+CREATE TABLE IF NOT EXISTS records (
+    release_id INTEGER PRIMARY KEY,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS labels (
+    label TEXT NOT NULL,
+    release_id INTEGER NOT NULL,
+    PRIMARY KEY (label, release_id)
+);
+CREATE INDEX IF NOT EXISTS labels_release ON labels (release_id);
+"""
+
+class HistoryStore():
+    """ SQLite store of rounds from all sets, indexed for analytics."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        """
+        Args:
+            path ::: str path of SQLite database, created if necessary
+        """
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def compact(self, journal_path):
+        """ Move all rounds in a journal into the store, emptying it.
+
+        Safe to repeat: rounds already stored are ignored. The journal is
+        only emptied once its rounds are committed, by moving a new file
+        into place (keeping anything appended meanwhile), so it is never
+        left half written.
+        """
+        if not os.path.exists(journal_path):
+            return 0
+        with open(journal_path, 'rb') as f:
+            data = f.read()
+        entries = _parse_lines(
+                data.decode('utf-8', errors='replace').splitlines())
+        plays, records, labels = [], {}, set()
+        for entry in entries:
+            if entry.get('finished'): # end of set marker
+                continue
+            for played, key in [(1, 'played'), (0, 'unplayed')]:
+                for info in entry[key]:
+                    release_id = info['release_id']
+                    plays.append((entry['session'], entry['round'],
+                                  release_id, played, entry['time']))
+                    records[release_id] = json.dumps(info)
+                    labels.update((label, release_id)
+                                  for label in info['labels'])
+
+        with self._conn:
+            self._conn.executemany('INSERT OR IGNORE INTO plays VALUES '
+                                   '(?, ?, ?, ?, ?)', plays)
+            self._conn.executemany('INSERT OR REPLACE INTO records VALUES '
+                                   '(?, ?)', records.items())
+            self._conn.executemany('INSERT OR IGNORE INTO labels VALUES '
+                                   '(?, ?)', labels)
+
+        tmp_path = journal_path + '.tmp'
+        with open(journal_path, 'rb') as f, open(tmp_path, 'wb') as tmp:
+            f.seek(len(data))
+            tmp.write(f.read())
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp_path, journal_path)
+        return len(plays)
+
+    def _record(self, release_id):
+        row = self._conn.execute('SELECT record FROM records '
+                                 'WHERE release_id = ?', (release_id,)).fetchone()
+        return Record(json.loads(row[0])) if row else None
+
+    def most_played(self, n=10):
+        """ Return list of (Record, times played), most played first."""
+        rows = self._conn.execute(
+                'SELECT release_id, COUNT(*) AS n FROM plays WHERE played = 1 '
+                'GROUP BY release_id ORDER BY n DESC LIMIT ?', (n,)).fetchall()
+        return [(self._record(release_id), count) for release_id, count in rows]
+
+    def never_played(self, release_ids):
+        """ Return those of `release_ids` never played in any set."""
+        release_ids = set(release_ids)
+        played = {row[0] for row in self._conn.execute(
+                'SELECT DISTINCT release_id FROM plays WHERE played = 1')}
+        return sorted(release_ids - played)
+
+    def reject_rate_by_label(self, min_draws=1):
+        """ Return {label: fraction of draws left unplayed} for labels drawn
+        at least `min_draws` times.
+        """
+        rows = self._conn.execute(
+                'SELECT labels.label, COUNT(*), SUM(1 - plays.played) '
+                'FROM plays JOIN labels USING (release_id) '
+                'GROUP BY labels.label HAVING COUNT(*) >= ?', (min_draws,))
+        return {label: rejected / draws for label, draws, rejected in rows}
+
+    def sessions(self):
+        """ Return list of (session, records played), oldest first."""
+        return self._conn.execute(
+                'SELECT session, SUM(played) FROM plays '
+                'GROUP BY session ORDER BY session').fetchall()
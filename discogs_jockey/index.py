@@ -0,0 +1,87 @@
+""" index
+
+Module for finding Records on a shelf by label, year, format, genre and
+style without scanning the whole shelf, using inverted indexes.
+"""
+
+class ShelfIndex():
+    """ Inverted indexes of release_ids by the values of Record fields.
+
+    Each indexed field maps each of its values to the set of release_ids
+    of records with that value, so a query is a union of sets within a field
+    and an intersection of sets across fields.
+    """
+
+    fields = ('labels', 'year', 'formats', 'genres', 'styles')
+
+    def __init__(self, records=()):
+        """
+        Args:
+            records ::: iterable of Records to index
+        """
+        self.postings = {field: {} for field in self.fields}
+        for record in records:
+            self.add(record)
+
+    def add(self, record):
+        """ Index a Record."""
+        release_id = record.release_id
+        for field, postings in self.postings.items():
+            for value in self._values(record, field):
+                ids = postings.get(value)
+                if ids is None:
+                    postings[value] = {release_id}
+                else:
+                    ids.add(release_id)
+
+    def remove(self, record):
+        """ Stop indexing a Record."""
+        release_id = record.release_id
+        for field, postings in self.postings.items():
+            for value in self._values(record, field):
+                ids = postings.get(value)
+                if ids is not None:
+                    ids.discard(release_id)
+                    if not ids:
+                        del postings[value]
+
+    @staticmethod
+    def _values(record, field):
+        value = getattr(record, field)
+        return (value,) if field == 'year' else value
+
+    def values(self, field):
+        """ Return sorted list of (value, number of records) of a field."""
+        return sorted((value, len(ids))
+                      for value, ids in self.postings[field].items())
+
+    def ids(self, **criteria):
+        """ Return set of release_ids of records matching all `criteria`.
+
+        Args:
+            criteria ::: field=value, or field=iterable of values to match
+                         any of, for fields in `ShelfIndex.fields`, e.g.
+                         year=range(1990, 2000), styles=['Techno', 'Acid']
+        """
+        matches = []
+        for field, wanted in criteria.items():
+            if field not in self.postings:
+                raise TypeError('Cannot query by {}, index fields are {}'
+                                .format(field, ', '.join(self.fields)))
+            if isinstance(wanted, (str, int)):
+                wanted = [wanted]
+            postings = self.postings[field]
+            ids = [postings[value] for value in wanted if value in postings]
+            matches.append(ids[0] if len(ids) == 1 else set().union(*ids))
+
+        if not matches:
+            raise TypeError('No query criteria given')
+
+        # Intersect smallest first, so the work is bounded by the rarest
+        matches.sort(key=len)
+        result = set(matches[0])
+        for ids in matches[1:]:
+            if not result:
+                break
+            result.intersection_update(ids)
+        return result
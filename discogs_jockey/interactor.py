@@ -3,7 +3,7 @@ Module for interaction with user, including entry of collection
 information, display of game output and retrieval of user input in-game.
 """
 import abc
-from .exceptions import StopPlaying
+from .exceptions import FreePick, StopPlaying
 
 class Interactor:
     """ Abstract Base Class for object defining user interaction methods.
@@ -40,6 +40,12 @@ class Interactor:
         """ Return the release_id of a record in crate chosen by user input."""
         NotImplemented
 
+    @abc.abstractmethod
+    def find_record(self, shelf):
+        """ Return the release_id of a record on shelf found by user search,
+        or None."""
+        NotImplemented
+
     @abc.abstractmethod
     def display_cap_reached(self, cap):
         """ Inform user that no more records can be added to crate."""
@@ -50,6 +56,30 @@ class Interactor:
         """ Present the played and rejected records per round."""
         NotImplemented
 
+    def display_turn(self, owner):
+        """ Inform user whose records are drawn this round, when owners of
+        a merged shelf take turns. Optional.
+        """
+        pass
+
+    def display_owners(self, record, owners):
+        """ Inform user whose collections a drawn record is from, on a
+        merged shelf. Optional.
+        """
+        pass
+
+    def display_no_free_picks(self):
+        """ Inform user that they have used all of their free picks.
+        Optional.
+        """
+        pass
+
+    def display_sync_failed(self, error):
+        """ Inform user that their collection could not be brought up to
+        date in the background, so play is from the cached copy. Optional.
+        """
+        pass
+
     @abc.abstractmethod
     def request_username(self):
         """ Prompt user to enter their discogs username."""
@@ -78,6 +108,7 @@ class TerminalInteractor(Interactor):
         "Should also allow formatting options to be set"
 
         self.quitflags = ['q', 'quit', 'exit', 'stop']
+        self.pickflags = ['f', 'find', 'pick']
         self.starline = '*'*70 # a line of *****
         self.scoreline = '_'*70 # a line of _____
         self.gap3 = '\n'*3 # a 3 line gap
@@ -91,6 +122,8 @@ class TerminalInteractor(Interactor):
             TITLE
             ARTISTS
             LABEL1 [CAT1], LABEL2 [CAT2]
+        followed by its tracklist, if its details have been fetched
+            A1  TRACK TITLE (DURATION)
         """
 
         title = record.title
@@ -98,8 +131,15 @@ class TerminalInteractor(Interactor):
         labcats = [" ".join([lab.strip(), '[{}]'.format(catn.strip())])  # "label [catnum]"
                 for lab, catn in zip(record.labels, record.cat_nums)]
         labcats = ", ".join(labcats)
+        lines = [title, artists, labcats]
+
+        if record.details is not None: # hydrated, see `details` module
+            for position, track, duration in record.details['tracklist']:
+                if duration:
+                    track += ' ({})'.format(duration)
+                lines.append('  {:<4}{}'.format(position, track))
 
-        return '\n'.join((title, artists, labcats))
+        return '\n'.join(lines)
 
     def display_record(self, record):
         """ Show a record to user. """
@@ -115,6 +155,19 @@ class TerminalInteractor(Interactor):
         """ Inform user that new round has started."""
         print('\n' + '~~~ Round {} ~~~'.format(roundn) + '\n')
 
+    def display_turn(self, owner):
+        """ Tell user whose records are drawn this round."""
+        print("{}'s turn to pick".format(owner))
+
+    def display_owners(self, record, owners):
+        """ Tell user whose collections a drawn record is from."""
+        print('Drawn from the collection of {}'.format(' & '.join(owners)))
+
+    def display_sync_failed(self, error):
+        """ Tell user their collection could not be updated from discogs."""
+        print("\nCouldn't update your collection from discogs ({}), "
+              "playing with the records seen last time".format(error))
+
     def display_crate(self, crate):
         """ Print current options to user. """
 
@@ -145,7 +198,7 @@ class TerminalInteractor(Interactor):
 
         q_start = "Choose a record"
         opts = ["<{}> to choose".format(ks), "<Enter> to draw again",
-                "<Q> to quit"]
+                "<F> to find one on the shelf", "<Q> to quit"]
         q_opts = '(' + ", ".join(opts) + ')'
         k = input(q_start + '\n' + q_opts)
 
@@ -154,11 +207,38 @@ class TerminalInteractor(Interactor):
         except ValueError:
             if k.lower() in self.quitflags: # quit request
                 raise StopPlaying('User requested to quit')
+            if k.lower() in self.pickflags: # free pick request
+                raise FreePick('User requested to find a record')
 
         release_id, record = options.get(k, (None, None))
 
         return release_id
 
+    def find_record(self, shelf):
+        """ Return the release_id of a record on shelf found by searching
+        its title, artists, labels or catalog numbers, or None.
+        """
+        query = input("Search the shelf (title, artist, label or cat#):")
+        while query:
+            results = shelf.search(query, limit=9)
+            print('\n' + self.scoreline)
+            for k, record in enumerate(results, 1):
+                print('\n\t\t > {} <'.format(k))
+                self.display_record(record)
+            if not results:
+                print('Nothing on the shelf matches "{}"'.format(query))
+
+            choice = input("<1-{}> to pick, or search again (<Enter> to "
+                           "cancel):".format(len(results)))
+            if choice.isdigit() and 0 < int(choice) <= len(results):
+                return results[int(choice) - 1].release_id
+            query = choice
+        return None
+
+    def display_no_free_picks(self):
+        """ Tell user they have no free picks left."""
+        print("You have no free picks left, choose or draw again")
+
     def display_cap_reached(self, cap):
         """ Inform user that no more records can be added to crate."""
         msg = "You can only choose from {} records".format(cap)
@@ -202,3 +282,91 @@ class TerminalInteractor(Interactor):
         print('{}'.format(auth_url))
         auth_code = input('Authorisation code:')
         return auth_code         
+
+class AsyncInteractor(Interactor):
+    """ Interactor for a remote user, e.g. a session of `discogs_jockey.server`.
+
+    Output is queued as a list of JSON-serialisable event dicts, collected
+    with `pop_events`. `get_choice` is a coroutine, awaiting a choice sent
+    with `choose`, so a game using it must be an `AsyncGame`.
+    """
+
+    def __init__(self):
+        import asyncio
+        self.quitflags = ['q', 'quit', 'exit', 'stop']
+        self.events = [] # events not yet collected
+        self._choices = asyncio.Queue()
+        self.prompted = asyncio.Event() # set while awaiting a choice
+
+    def _emit(self, event, **info):
+        info['event'] = event
+        self.events.append(info)
+
+    def pop_events(self):
+        """ Return and clear the events queued so far."""
+        events, self.events = self.events, []
+        return events
+
+    def choose(self, choice):
+        """ Send the user's choice: an option number (as in the last 'crate'
+        event), None to draw again, or a quit flag.
+        """
+        self.prompted.clear()
+        self._choices.put_nowait(choice)
+
+    def _make_options(self, crate):
+        """ Return dict of {'k': (release_id, record)} from crate."""
+        return {k+1: option for k, option in enumerate(crate.records.items())}
+
+    def display_choice(self, record):
+        self._emit('choice', record=record.to_dict())
+
+    def display_new_round(self, roundn):
+        self._emit('new_round', round=roundn)
+
+    def display_crate(self, crate):
+        options = self._make_options(crate)
+        self._emit('crate', options=[dict(record.to_dict(), k=k)
+                                     for k, (id, record) in sorted(options.items())])
+
+    def display_option(self, record, k=None):
+        self._emit('drawn', record=record.to_dict())
+
+    def display_turn(self, owner):
+        self._emit('turn', owner=owner)
+
+    def display_owners(self, record, owners):
+        self._emit('owners', release_id=record.release_id, owners=list(owners))
+
+    async def get_choice(self, crate):
+        """ Return the release_id of a record in crate chosen by the user."""
+        self._emit('choose')
+        self.prompted.set()
+        k = await self._choices.get()
+
+        if isinstance(k, str) and k.lower() in self.quitflags: # quit request
+            raise StopPlaying('User requested to quit')
+
+        release_id, record = self._make_options(crate).get(k, (None, None))
+        return release_id
+
+    def find_record(self, shelf):
+        return None # remote users cannot request a free pick
+
+    def display_cap_reached(self, cap):
+        self._emit('cap_reached', cap=cap)
+
+    def display_finished(self):
+        self._emit('finished')
+
+    def display_history(self, history):
+        self._emit('history', rounds=[
+                {'round': k, 'played': [record.to_dict()
+                                        for record in round['played']]}
+                for k, round in sorted(history.items())])
+
+    # No discogs account interaction for remote users
+    def request_username(self): pass
+    def bad_username(self, username): pass
+    def greet_user(self, user): pass
+    def request_authorisation(self, auth_url): pass
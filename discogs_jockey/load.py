@@ -3,23 +3,73 @@ Module for loading record collections from various data sources, to be
 later processed by `collection` module. Current data sources are a .csv
 exported from Discogs, as well as directly from discogs via the API.
 """
+import csv
 import os
-import pandas as pd
 from .exceptions import NoData
 
-def load_from_dir(fdir='collection'):
-    """ Return a pandas DataFrame of a csv in `fdir`.
-    
-    Note: chooses an arbitrary file if multiple encountered. 
-    """
-    # Get filepaths of all matching files
-    fpaths = [os.path.join(fdir, fname) for fname in os.listdir(fdir)
-            if os.path.splitext(fname)[1].lower().endswith('csv')]
+# Columns of a Discogs csv export used by `collection`, with compact dtypes
+COLUMNS = {'release_id': 'int64',
+           'Title': 'object',
+           'Artist': 'category', # repeated heavily across a collection
+           'Label': 'category',
+           'Catalog#': 'object',
+           'Released': 'Int16', # year, may be blank
+           'Format': 'category'}
+
+def find_csvs(fdir='collection'):
+    """ Return sorted filepaths of all csv files in `fdir`."""
+    fpaths = sorted(os.path.join(fdir, fname) for fname in os.listdir(fdir)
+                    if os.path.splitext(fname)[1].lower().endswith('csv'))
     if not fpaths:
-        raise NoData('No {} files found in {} directory'.format(exts, fdir))
-    
-    # Process first file (though should combine all)
-    fpath = fpaths[0]
-    df = pd.read_csv(fpath)
-    
+        raise NoData('No csv files found in {} directory'.format(fdir))
+    return fpaths
+
+def load_from_dir(fdir='collection', chunksize=100000):
+    """ Return a pandas DataFrame of all csv exports in `fdir`.
+
+    Only the columns used to build a Shelf are read, in chunks of
+    `chunksize` rows, and releases found in more than one export (or twice
+    in one) are kept only once.
+    """
+    import pandas as pd # only needed on this path
+    from pandas.api.types import union_categoricals
+
+    chunks = []
+    seen = set() # release_ids already loaded
+    for fpath in find_csvs(fdir):
+        for chunk in pd.read_csv(fpath, usecols=list(COLUMNS), dtype=COLUMNS,
+                                 chunksize=chunksize):
+            chunk = chunk[~chunk['release_id'].isin(seen)]
+            chunk = chunk.drop_duplicates('release_id')
+            seen.update(chunk['release_id'])
+            chunks.append(chunk)
+
+    # Chunks have their own categories, so give them common ones to stay
+    # categorical (and compact) when concatenated
+    for column, dtype in COLUMNS.items():
+        if dtype == 'category':
+            categories = union_categoricals(
+                    [chunk[column] for chunk in chunks]).categories
+            chunks = [chunk.assign(**{column:
+                    chunk[column].cat.set_categories(categories)})
+                      for chunk in chunks]
+
+    df = pd.concat(chunks, ignore_index=True)
+    df['Released'] = df['Released'].fillna(0).astype('int16')
+
     return df
+
+def iter_rows_from_dir(fdir='collection'):
+    """ Yield row dicts of all csv exports in `fdir`, one at a time.
+
+    Uses the csv module rather than pandas, so rows can be streamed
+    straight onto a Shelf. As with `load_from_dir`, each release is only
+    yielded the first time it is found.
+    """
+    seen = set() # release_ids already yielded
+    for fpath in find_csvs(fdir):
+        with open(fpath, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if row['release_id'] not in seen:
+                    seen.add(row['release_id'])
+                    yield row
@@ -0,0 +1,312 @@
+""" merged
+
+Shelves of several DJs' collections combined, for back to back sets.
+
+Each owner's collection is read in its own thread (so that fetching from
+discogs overlaps) and handed over in chunks through a bounded queue, to be
+shelved as it arrives: only a few chunks are ever held besides the shelf
+itself. Records owned by more than one DJ are shelved once, remembering
+all of their owners.
+"""
+from queue import Queue
+import threading
+import time
+from .collection import Shelf, _is_instance
+from .metrics import metrics
+
+_DONE = object() # sent by a reader when its collection is exhausted
+
+def iter_folder_items(fetcher, username, folder_id=0):
+    """ Yield the collection item dicts of a user's folder, a page at a
+    time, so that pages can be shelved (and dropped) as they arrive.
+    Args:
+        fetcher ::: a `discogs_jockey.fetch.CollectionFetcher` instance
+    """
+    for page in fetcher.iter_pages(username, folder_id):
+        yield from page['releases']
+
+def discogs_sources(fetcher, usernames, folder_id=0):
+    """ Return {username: collection items} to merge, for `MergedShelf`.
+
+    Requests for all users share `fetcher`'s rate limit.
+    """
+    return {username: iter_folder_items(fetcher, username, folder_id)
+            for username in usernames}
+
+def iter_cached_records(cache, fetcher, username, folder_id=0):
+    """ Yield the wax Records of a user's folder from `cache`, first
+    bringing it up to date (fetching only what is new since the last sync).
+    Args:
+        cache ::: a `discogs_jockey.cache.CollectionCache` instance
+        fetcher ::: a `discogs_jockey.fetch.CollectionFetcher` instance
+    """
+    cache.sync(fetcher, username, folder_id)
+    yield from cache.load_records(username, folder_id)
+
+def cached_sources(cache, fetcher, usernames, folder_id=0):
+    """ Return {username: cached collection records} to merge, for
+    `MergedShelf`, as `discogs_sources` but synced through `cache`.
+    """
+    return {username: iter_cached_records(cache, fetcher, username, folder_id)
+            for username in usernames}
+
+def csv_sources(fdirs):
+    """ Return {owner: csv rows} to merge, for `MergedShelf`.
+    Args:
+        fdirs ::: {owner: directory of their csv exports}
+    """
+    from .load import iter_rows_from_dir
+    return {owner: iter_rows_from_dir(fdir) for owner, fdir in fdirs.items()}
+
+class MergedShelf(Shelf):
+    """ A Shelf of several owners' collections, each record shelved once.
+
+    `owners` maps each release_id to the owners of the record, in the
+    order their copies were shelved. With a `turn_order`, each round's
+    draws are made from the records of the owner whose turn it is, moving
+    to the next owner as each round is finished (see `note_round`).
+    """
+
+    def __init__(self, sources=None, turn_order=None, client=None, chunk=500):
+        """
+        Args:
+            sources ::: {owner: collection} where each collection is any
+                        collection `Shelf` accepts, e.g. from
+                        `discogs_sources` or `csv_sources`
+            turn_order ::: optional list of owners to draw for in turn, or
+                           True for the order of `sources`
+            client ::: as for `Shelf`
+            chunk ::: int records handed over from a reader at a time
+        """
+        self.owners = {} # {release_id: tuple of owners}
+        self._owner_ids = {} # {owner: release_ids on shelf, for draws}
+        self._owner_slots = {} # {owner: {release_id: index in _owner_ids}}
+        self._owner = None # owner of the records being shelved
+        self.chunk = chunk
+        super().__init__(None, client=client)
+        if sources:
+            self.merge(sources, client)
+        if turn_order is True:
+            turn_order = list(sources or ())
+        self.turn_order = list(turn_order or ())
+        self.turn = 0 # index in turn_order of the owner to draw for
+
+    def merge(self, sources, client=None):
+        """ Add the records of each of `sources` ({owner: collection}),
+        reading collections in parallel and shelving them as they arrive.
+        """
+        if metrics.enabled:
+            start = time.perf_counter()
+            count = len(self.records)
+        queue = Queue(maxsize=2*len(sources))
+
+        def read(owner, collection):
+            try:
+                if _is_instance(collection, 'pandas', 'DataFrame'):
+                    queue.put((owner, collection, None)) # already in memory
+                    return
+                reader_client = client
+                if _is_instance(collection, 'discogs_client.models',
+                                'CollectionFolder'):
+                    reader_client = collection.client
+                    collection = (item.data for item in collection.releases)
+                chunk = []
+                for item in collection:
+                    chunk.append(item)
+                    if len(chunk) >= self.chunk:
+                        queue.put((owner, chunk, reader_client))
+                        chunk = []
+                if chunk:
+                    queue.put((owner, chunk, reader_client))
+            except Exception as err:
+                queue.put((owner, err, None))
+            finally:
+                queue.put((owner, _DONE, None))
+
+        for owner, collection in sources.items():
+            threading.Thread(target=read, args=(owner, collection),
+                             daemon=True).start()
+
+        # Shelve in this thread as chunks arrive, draining the queue after a
+        # failure so that no reader is left blocked
+        error = None
+        remaining = len(sources)
+        while remaining:
+            owner, piece, piece_client = queue.get()
+            if piece is _DONE:
+                remaining -= 1
+            elif isinstance(piece, Exception):
+                error = error or piece
+            elif error is None:
+                self._owner = owner
+                try:
+                    self._ingest(piece, piece_client)
+                except Exception as err:
+                    error = err
+                finally:
+                    self._owner = None
+        if error is not None:
+            raise error
+
+        if metrics.enabled:
+            metrics.observe('ingest_seconds', time.perf_counter() - start)
+            metrics.count('records_ingested_total', len(self.records) - count)
+
+    def records_of(self, owner):
+        """ Return list of the records on the shelf owned by `owner`."""
+        return [self.records[release_id]
+                for release_id in self._owner_ids.get(owner, ())]
+
+    def owners_of(self, release_id):
+        return self.owners.get(release_id, ())
+    owners_of.__doc__ = Shelf.owners_of.__doc__
+
+    @property
+    def current_owner(self):
+        """ Owner whose turn it is to draw for (skipping any with no records
+        left), or None without turns.
+        """
+        if not self.turn_order:
+            return None
+        owner = self._turn_owner()
+        if owner is None:
+            owner = self.turn_order[self.turn % len(self.turn_order)]
+        return owner
+
+    def query(self, **criteria):
+        """ Return a new MergedShelf of the records matching all `criteria`,
+        keeping their owners and the turn order.
+
+        Records are found as by `Shelf.query`, and are left on this shelf.
+        """
+        records = self.records
+        shelf = MergedShelf(turn_order=self.turn_order, chunk=self.chunk)
+        shelf.turn = self.turn
+        for release_id in sorted(self.index.ids(**criteria)):
+            if release_id in records:
+                shelf.owners[release_id] = self.owners.get(release_id, ())
+                shelf._put(records[release_id])
+        shelf._follow(self, criteria)
+        return shelf
+
+    def random_records(self, n):
+        """ Return list of `n` records removed at random, owned by the owner
+        whose turn it is (or the next with records left), if taking turns.
+
+        `n` will be coerced to be < len(self.records)
+        """
+        if not self.turn_order:
+            return super().random_records(n)
+        self._apply_pending()
+        n = min(len(self), n)
+        records = []
+        for i in range(n):
+            owner = self._turn_owner()
+            if owner is None: # only unowned records left
+                release_id = self._ids[self.rng.randrange(len(self._ids))]
+            else:
+                release_id = self._upcoming_of(owner)
+                if release_id is None:
+                    ids = self._owner_ids[owner]
+                    release_id = ids[self.rng.randrange(len(ids))]
+            records.append(self._take(release_id))
+        if self.prefetcher is None:
+            return records
+        self._pre_pick()
+        return [self.prefetcher.hydrate(record) for record in records]
+
+    def _turn_owner(self):
+        """ Return the first owner, from the current one in turn, who has
+        records on the shelf; or None if none do.
+        """
+        for k in range(len(self.turn_order)):
+            owner = self.turn_order[(self.turn + k) % len(self.turn_order)]
+            if self._owner_ids.get(owner):
+                return owner
+        return None
+
+    def _upcoming_of(self, owner):
+        """ Return the release_id of the first record pre-picked (see
+        `Shelf.prefetch`) that is still on the shelf and owned by `owner`,
+        removing it from those upcoming; or None.
+        """
+        slots = self._owner_slots.get(owner, {})
+        for release_id in self._upcoming:
+            if release_id in slots:
+                self._upcoming.remove(release_id)
+                return release_id
+        return None
+
+    def _pre_pick(self):
+        """ Pick upcoming draws at random from the records of the owner
+        whose turn it is, up to `ahead` of them.
+        """
+        if not self.turn_order:
+            return super()._pre_pick()
+        owner = self._turn_owner()
+        slots = self._owner_slots.get(owner, {})
+        upcoming = [release_id for release_id in self._upcoming
+                    if release_id in slots]
+        ids = self._owner_ids.get(owner, [])
+        target = min(self.ahead, len(ids))
+        picked = set(upcoming)
+        while len(picked) < target:
+            release_id = ids[self.rng.randrange(len(ids))]
+            if release_id not in picked:
+                picked.add(release_id)
+                upcoming.append(release_id)
+        self._upcoming.clear()
+        self._upcoming.extend(upcoming)
+        self.prefetcher.request(self._upcoming)
+
+    def note_round(self, played, unplayed):
+        """ Pass the turn to the next owner once a record has been played,
+        and prefetch details for their draws.
+        """
+        if played and self.turn_order:
+            self.turn = (self.turn + 1) % len(self.turn_order)
+            if self.prefetcher is not None:
+                self._pre_pick()
+
+    def _put(self, record):
+        release_id = record.release_id
+        owner = self._owner
+        if owner is not None:
+            owners = self.owners.get(release_id, ())
+            if owner not in owners:
+                self.owners[release_id] = owners + (owner,)
+            if release_id in self.records: # shelved from another collection
+                self._own(owner, release_id)
+                return
+        super()._put(record)
+        for owner in self.owners.get(release_id, ()):
+            self._own(owner, release_id)
+    _put.__doc__ = Shelf._put.__doc__
+
+    def _own(self, owner, release_id):
+        """ Add a shelved record to the records `owner` can draw."""
+        slots = self._owner_slots.setdefault(owner, {})
+        if release_id not in slots:
+            ids = self._owner_ids.setdefault(owner, [])
+            slots[release_id] = len(ids)
+            ids.append(release_id)
+
+    def _take_slot(self, slot):
+        record = super()._take_slot(slot)
+        for owner in self.owners.get(record.release_id, ()):
+            # Swap-with-last removal, as for the shelf's own slots
+            ids, slots = self._owner_ids[owner], self._owner_slots[owner]
+            owner_slot = slots.pop(record.release_id)
+            last = ids.pop()
+            if last != record.release_id:
+                ids[owner_slot] = last
+                slots[last] = owner_slot
+        return record
+    _take_slot.__doc__ = Shelf._take_slot.__doc__
+
+    def empty(self):
+        records = super().empty()
+        self._owner_ids = {}
+        self._owner_slots = {}
+        return records
+    empty.__doc__ = Shelf.empty.__doc__
@@ -0,0 +1,148 @@
+""" metrics
+
+Opt-in instrumentation: counters and histograms (of timings or sizes),
+exportable as JSON or Prometheus text.
+
+Instrumented code checks `metrics.enabled` before measuring anything, so
+while disabled (the default) each site costs one attribute lookup:
+
+    from .metrics import metrics
+    if metrics.enabled:
+        start = time.perf_counter()
+    ...
+    if metrics.enabled:
+        metrics.observe('draw_seconds', time.perf_counter() - start)
+"""
+from bisect import bisect_left
+import json
+import threading
+
+# Upper bounds of histogram buckets, in seconds for timings
+BUCKETS = (1e-06, 2.5e-06, 5e-06, 1e-05, 2.5e-05, 5e-05, 0.0001, 0.00025,
+           0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+class Histogram():
+    """ Counts of observations falling in each of fixed buckets."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0]*(len(buckets) + 1) # last for > buckets[-1]
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """ Return the upper bound of the bucket holding quantile `q`."""
+        rank = q*self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank and count:
+                return bound
+        return 0.0
+
+class Metrics():
+    """ Registry of named counters and histograms, each optionally labelled
+    (e.g. count('http_requests_total', status=200)).
+    """
+
+    prefix = 'discogs_jockey_'
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.counters = {} # {(name, labels): value}
+        self.histograms = {} # {(name, labels): Histogram}
+        self._lock = threading.Lock() # updated by fetch threads too
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def count(self, name, value=1, **labels):
+        """ Add `value` to a counter."""
+        key = (name, tuple(sorted(labels.items())) if labels else ())
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """ Add an observation (e.g. seconds taken) to a histogram."""
+        key = (name, tuple(sorted(labels.items())) if labels else ())
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def to_dict(self):
+        """ Return all metrics as a JSON-serialisable dict."""
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self.counters.items())]
+            histograms = [{'name': name, 'labels': dict(labels),
+                           'count': h.count, 'sum': h.sum,
+                           'mean': h.sum / h.count if h.count else 0.0,
+                           'p50': h.quantile(0.5), 'p99': h.quantile(0.99),
+                           'buckets': dict(zip([str(b) for b in h.buckets]
+                                               + ['+Inf'], h.counts))}
+                          for (name, labels), h in sorted(self.histograms.items())]
+        return {'counters': counters, 'histograms': histograms}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self):
+        """ Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                name = self.prefix + name
+                if name not in typed:
+                    typed.add(name)
+                    lines.append('# TYPE {} counter'.format(name))
+                lines.append('{}{} {}'.format(name, _labels(labels), value))
+
+            for (name, labels), h in sorted(self.histograms.items()):
+                name = self.prefix + name
+                if name not in typed:
+                    typed.add(name)
+                    lines.append('# TYPE {} histogram'.format(name))
+                cumulative = 0
+                for bound, count in zip(h.buckets + ('+Inf',), h.counts):
+                    cumulative += count
+                    lines.append('{}_bucket{} {}'.format(
+                            name, _labels(labels + (('le', bound),)),
+                            cumulative))
+                lines.append('{}_sum{} {}'.format(name, _labels(labels), h.sum))
+                lines.append('{}_count{} {}'.format(name, _labels(labels),
+                                                    h.count))
+        return '\n'.join(lines) + '\n'
+
+    def save(self, path):
+        """ Write metrics to `path`, as Prometheus text if it ends '.prom',
+        otherwise as JSON.
+        """
+        with open(path, 'w') as f:
+            f.write(self.to_prometheus() if path.endswith('.prom')
+                    else self.to_json())
+
+def _labels(labels):
+    """ Return Prometheus label set string of (name, value) pairs."""
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(name, str(value).replace('"', '\\"'))
+                          for name, value in labels) + '}'
+
+metrics = Metrics() # shared by all instrumented modules, disabled by default
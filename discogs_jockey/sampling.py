@@ -0,0 +1,211 @@
+""" sampling
+
+Weighted random draws, so that records played recently come up less often
+and long neglected records more often. Weights live in a Fenwick tree, so
+both a draw and a weight update are O(log n).
+"""
+from .collection import Shelf
+import json
+import os
+
+# Kept next to the play history journal (see `history.DEFAULT_JOURNAL`)
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.discogs_jockey',
+                            'weights.json')
+
+class FenwickTree():
+    """ Binary indexed tree of non-negative weights, supporting O(log n)
+    update, total and weighted search. Grows as weights are appended.
+    """
+
+    def __init__(self, weights=()):
+        self.weights = list(weights)
+        self._build(max(len(self.weights), 16))
+
+    def _build(self, capacity):
+        """ Rebuild the tree with room for `capacity` weights, in O(n)."""
+        self._tree = [0.0]*(capacity + 1)
+        self._tree[1:len(self.weights) + 1] = self.weights
+        for i in range(1, capacity + 1):
+            parent = i + (i & -i)
+            if parent <= capacity:
+                self._tree[parent] += self._tree[i]
+
+    def __len__(self):
+        return len(self.weights)
+
+    def _add(self, i, delta):
+        i += 1
+        tree = self._tree
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def set(self, i, weight):
+        """ Set weight at index `i`."""
+        self._add(i, weight - self.weights[i])
+        self.weights[i] = weight
+
+    def append(self, weight):
+        """ Add a weight at the end, growing the tree if needed."""
+        self.weights.append(weight)
+        if len(self.weights) >= len(self._tree):
+            self._build(2*len(self._tree))
+        else:
+            self._add(len(self.weights) - 1, weight)
+
+    def pop(self):
+        """ Remove and return the last weight."""
+        weight = self.weights[-1]
+        self.set(len(self.weights) - 1, 0.0)
+        self.weights.pop()
+        return weight
+
+    @property
+    def total(self):
+        """ Sum of all weights."""
+        i = len(self.weights)
+        total = 0.0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, u):
+        """ Return the index at which the running sum of weights exceeds `u`,
+        for 0 <= u < total.
+        """
+        i = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            j = i + step
+            if j < len(self._tree) and self._tree[j] <= u:
+                u -= self._tree[j]
+                i = j
+            step >>= 1
+        return min(i, len(self.weights) - 1)
+
+class RecencyWeights():
+    """ Draw weights from when each record was last played, over sessions.
+
+    A record played `age` sessions ago has weight
+    min(max_weight, floor + growth*age), while one never played has
+    `max_weight`. During a session, a played record drops to `floor`, and a
+    record drawn but left unplayed has its weight scaled by
+    `unplayed_factor`.
+    """
+
+    def __init__(self, last_played=None, session=0, floor=0.1, growth=0.25,
+                 max_weight=4.0, unplayed_factor=0.5):
+        self.last_played = dict(last_played or {}) # {release_id: session}
+        self.session = session
+        self.floor = floor
+        self.growth = growth
+        self.max_weight = max_weight
+        self.unplayed_factor = unplayed_factor
+        self._passed = {} # {release_id: times left unplayed this session}
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH, **kwargs):
+        """ Return weights saved at `path` (if any), starting a new session."""
+        last_played, session = {}, 0
+        if os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            last_played = {int(id): played
+                           for id, played in saved['last_played'].items()}
+            session = saved['session'] + 1
+        return cls(last_played, session, **kwargs)
+
+    def save(self, path=DEFAULT_PATH):
+        """ Save when records were last played to `path`, as JSON."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'session': self.session,
+                       'last_played': self.last_played}, f)
+
+    def weight(self, release_id):
+        """ Return the current draw weight of a record."""
+        played = self.last_played.get(release_id)
+        if played is None:
+            weight = self.max_weight
+        else:
+            age = self.session - played
+            weight = min(self.max_weight, self.floor + self.growth*age)
+        return weight * self.unplayed_factor**self._passed.get(release_id, 0)
+
+    def played(self, release_ids):
+        for release_id in release_ids:
+            self.last_played[release_id] = self.session
+
+    def unplayed(self, release_ids):
+        for release_id in release_ids:
+            self._passed[release_id] = self._passed.get(release_id, 0) + 1
+
+class WeightedShelf(Shelf):
+    """ A Shelf whose random draws are weighted by `RecencyWeights`.
+
+    The Fenwick tree is kept aligned with the shelf's slots, so adding,
+    taking and reweighting a record are all O(log n).
+    """
+
+    def __init__(self, collection, weights=None, client=None):
+        """
+        Args:
+            collection ::: as for `Shelf`
+            weights ::: `RecencyWeights`, new (all equal) if not given
+        """
+        self.weights = weights if weights is not None else RecencyWeights()
+        self._tree = FenwickTree()
+        super().__init__(collection, client=client)
+
+    @classmethod
+    def load_snapshot(cls, path, weights=None):
+        """ Return a WeightedShelf over a snapshot file written by
+        `save_snapshot`, as `Shelf.load_snapshot`, weighted by `weights`.
+        """
+        shelf = super().load_snapshot(path)
+        if weights is not None:
+            shelf.weights = weights
+        shelf._tree = FenwickTree(shelf.weights.weight(release_id)
+                                  for release_id in shelf._ids)
+        return shelf
+
+    def _pick_slot(self):
+        """ Return the slot of a record to draw, at random by weight."""
+        total = self._tree.total
+        if total > 0:
+            return self._tree.find(self.rng.random()*total)
+        return self.rng.randrange(len(self._ids)) # all weights zero
+
+    def note_round(self, played, unplayed):
+        """ Update weights from a finished round (see `Game.add_to_history`).
+        """
+        self.weights.played(record.release_id for record in played)
+        self.weights.unplayed(record.release_id for record in unplayed)
+        slots = self._slot_map()
+        for record in played + unplayed:
+            if record.release_id in slots: # still on shelf
+                self._tree.set(slots[record.release_id],
+                               self.weights.weight(record.release_id))
+        self._repick()
+
+    def empty(self):
+        records = super().empty()
+        self._tree = FenwickTree()
+        return records
+    empty.__doc__ = Shelf.empty.__doc__
+
+    def _put(self, record):
+        new = record.release_id not in self.records
+        super()._put(record)
+        if new:
+            self._tree.append(self.weights.weight(record.release_id))
+
+    def _take_slot(self, slot):
+        record = super()._take_slot(slot)
+
+        # Mirror the swap-with-last removal of the slot
+        last_weight = self._tree.pop()
+        if slot < len(self._tree):
+            self._tree.set(slot, last_weight)
+        return record
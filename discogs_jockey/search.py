@@ -0,0 +1,165 @@
+""" search
+
+Module for finding records on a shelf from part of their title, artists,
+labels or catalog numbers, fast enough to search as the user types.
+"""
+import heapq
+from itertools import islice
+import re
+
+_non_word = re.compile(r'[\W_]+')
+
+def normalise(text):
+    """ Return `text` lowercased, with runs of punctuation and spaces (e.g.
+    in 'WARP-12' or 'Warp 12') collapsed to single spaces.
+    """
+    return _non_word.sub(' ', text.lower()).strip()
+
+def grams(word):
+    """ Return set of trigrams of `word` with a space before it, so that
+    its first one or two letters are grams of their own (e.g. ' w', ' wa').
+    """
+    padded = ' ' + word
+    result = {padded[i:i + 3] for i in range(len(padded) - 2)}
+    result.add(padded[:2])
+    return result
+
+def prefix_grams(prefix):
+    """ Return set of grams that a word starting with `prefix` must have."""
+    if len(prefix) == 1:
+        return {' ' + prefix}
+    padded = ' ' + prefix
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TrigramIndex():
+    """ Incremental trigram index of Records' title, artists, labels and
+    cat_nums.
+
+    A record matches a query if each query word starts one of its words.
+    The distinct words of all records are indexed by trigram, so the words
+    starting with a query word are found by intersecting a few small sets;
+    the release_ids of records with each of those words are then combined
+    with set operations, rather than checking records one by one.
+    """
+
+    rank_limit = 5000 # most matches to rank, see `search`
+
+    def __init__(self, records=()):
+        """
+        Args:
+            records ::: iterable of Records to index
+        """
+        self.postings = {} # {word: set of release_ids of records with it}
+        self.vocabulary = {} # {trigram: set of words with it}
+        self.texts = {} # {release_id: ' ' + normalised searchable text}
+        self.records = {} # {release_id: Record}
+        for record in records:
+            self.add(record)
+
+    def __len__(self):
+        return len(self.texts)
+
+    @staticmethod
+    def text(record):
+        """ Return the normalised searchable text of a Record, title first."""
+        words = [normalise(record.title), normalise(record.artists)]
+        words.extend(normalise(label) for label in record.labels)
+        for cat_num in map(normalise, record.cat_nums):
+            words.append(cat_num)
+            if ' ' in cat_num: # also as typed without spaces, e.g. 'warp12'
+                words.append(cat_num.replace(' ', ''))
+        return ' '.join(words)
+
+    def add(self, record):
+        """ Index a Record, replacing any with the same release_id."""
+        release_id = record.release_id
+        if release_id in self.texts:
+            self.remove(release_id)
+        text = self.text(record)
+        self.texts[release_id] = ' ' + text
+        self.records[release_id] = record
+
+        postings = self.postings
+        for word in set(text.split()):
+            ids = postings.get(word)
+            if ids is None: # a new word
+                postings[word] = {release_id}
+                for gram in grams(word):
+                    words = self.vocabulary.get(gram)
+                    if words is None:
+                        self.vocabulary[gram] = {word}
+                    else:
+                        words.add(word)
+            else:
+                ids.add(release_id)
+
+    def remove(self, release_id):
+        """ Stop indexing the Record with `release_id`, if indexed."""
+        text = self.texts.pop(release_id, None)
+        if text is None:
+            return
+        del self.records[release_id]
+
+        postings = self.postings
+        for word in set(text.split()):
+            ids = postings[word]
+            ids.discard(release_id)
+            if not ids: # no longer in any record
+                del postings[word]
+                for gram in grams(word):
+                    words = self.vocabulary[gram]
+                    words.discard(word)
+                    if not words:
+                        del self.vocabulary[gram]
+
+    def words_starting(self, prefix):
+        """ Return list of indexed words starting with `prefix`."""
+        vocabulary = self.vocabulary
+        candidates = sorted((vocabulary.get(gram, ())
+                             for gram in prefix_grams(prefix)), key=len)
+        words = set(candidates[0]).intersection(*candidates[1:])
+        if len(prefix) <= 2: # the gram ' ' + prefix matches exactly
+            return list(words)
+        return [word for word in words if word.startswith(prefix)]
+
+    def matches(self, query):
+        """ Return set of release_ids of records with words starting with
+        each word of `query`.
+        """
+        postings = self.postings
+        matches = []
+        for prefix in set(normalise(query).split()):
+            ids = [postings[word] for word in self.words_starting(prefix)]
+            if not ids:
+                return set()
+            matches.append(ids[0] if len(ids) == 1 else set().union(*ids))
+        if not matches:
+            return set()
+
+        matches.sort(key=len)
+        return set(matches[0]).intersection(*matches[1:])
+
+    def search(self, query, limit=10):
+        """ Return list of up to `limit` Records matching `query`, best first.
+
+        Records whose title starts with the query come first, then those
+        with the query as typed in their text, then other matches; shorter
+        texts first within each. A query too short to narrow matches down
+        to `rank_limit` has an arbitrary `rank_limit` of them ranked, to
+        answer within a keystroke.
+        """
+        ids = self.matches(query)
+        if len(ids) > self.rank_limit:
+            ids = islice(ids, self.rank_limit)
+        query = ' ' + normalise(query)
+        texts = self.texts
+
+        def rank(id):
+            text = texts[id]
+            if text.startswith(query):
+                return (0, len(text), id)
+            if query in text:
+                return (1, len(text), id)
+            return (2, len(text), id)
+
+        return [self.records[id] for id in heapq.nsmallest(limit, ids, key=rank)]
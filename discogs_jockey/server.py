@@ -0,0 +1,247 @@
+""" server
+
+Module for hosting many discogs jockey games from one process, over a
+small JSON/HTTP API on asyncio. All sessions draw from one shared,
+loaded collection (a `RecordTable`), each through its own `ShelfView`.
+
+    python -m discogs_jockey.server [collection_dir] [port]
+
+API (all bodies JSON):
+    POST /sessions {"cap": 3, "replace": true}
+        start a game, returns {"session": id, "events": [...]}
+    POST /sessions/<id>/choice {"choice": k | null | "quit"}
+        choose option k (null to draw again), returns {"events": [...]}
+    GET /sessions/<id>
+        return {"events": [...]} queued since last collected
+    DELETE /sessions/<id>
+        abandon a game
+Events are returned once the game is awaiting the next choice, or has
+finished (and the session is then closed). Malformed requests, and rules
+other than a positive integer "cap" and boolean "replace", get a 400.
+"""
+import asyncio
+import itertools
+import json
+import sys
+from .collection import RecordTable
+from .exceptions import StopPlaying
+from .game import AsyncGame
+from .interactor import AsyncInteractor
+
+class BadRequest(ValueError):
+    """ A request that cannot be served as sent."""
+    pass
+
+class Session():
+    """ A single game being played remotely."""
+
+    def __init__(self, shelf, rules):
+        self.io = AsyncInteractor()
+        self.game = AsyncGame(shelf, self.io, rules=rules)
+        self.task = asyncio.ensure_future(self.game.play_set())
+
+    @property
+    def finished(self):
+        return self.task.done()
+
+    async def events(self):
+        """ Return queued events once the game awaits a choice or ends."""
+        prompted = asyncio.ensure_future(self.io.prompted.wait())
+        await asyncio.wait([prompted, self.task],
+                           return_when=asyncio.FIRST_COMPLETED)
+        prompted.cancel()
+        if self.task.done() and self.task.exception() is not None:
+            raise self.task.exception()
+        return self.io.pop_events()
+
+    async def choose(self, choice):
+        """ Send a choice, and return the events it leads to."""
+        if self.finished:
+            raise StopPlaying('Game has finished')
+        self.io.choose(choice)
+        return await self.events()
+
+    def close(self):
+        self.task.cancel()
+
+class GameServer():
+    """ Serves games on a shared collection over HTTP/1.1 (keep-alive)."""
+
+    default_rules = {'cap': 3, 'replace': True}
+
+    def __init__(self, records):
+        """
+        Args:
+            records ::: iterable of Records (e.g. `Shelf.records.values()`)
+        """
+        self.table = RecordTable(records)
+        self.sessions = {}
+        self._ids = itertools.count(1)
+        self.server = None
+
+    async def start(self, host='127.0.0.1', port=8000):
+        """ Start listening; returns the `asyncio` server (port 0 for any)."""
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        for session in self.sessions.values():
+            session.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def dispatch(self, method, path, body):
+        """ Return (status, response dict) for a request."""
+        parts = path.strip('/').split('/')
+        if parts[0] != 'sessions' or len(parts) > 3:
+            return 404, {'message': 'Resource not found.'}
+
+        if body is not None and not isinstance(body, dict):
+            raise BadRequest('Body must be a JSON object.')
+
+        if len(parts) == 1:
+            if method != 'POST':
+                return 405, {'message': 'Method not allowed.'}
+            rules = self.check_rules(body or {})
+            session = Session(self.table.view(), rules)
+            try:
+                events = await session.events()
+            except BaseException:
+                session.close()
+                raise
+            session_id = str(next(self._ids))
+            if not session.finished: # otherwise nothing more to ask
+                self.sessions[session_id] = session
+            return 200, {'session': session_id, 'events': events}
+
+        session = self.sessions.get(parts[1])
+        if session is None:
+            return 404, {'message': 'No such session.'}
+        if len(parts) == 2 and method == 'DELETE':
+            session.close()
+            del self.sessions[parts[1]]
+            return 200, {'events': []}
+        try:
+            if len(parts) == 3 and parts[2] == 'choice' and method == 'POST':
+                events = await session.choose((body or {}).get('choice'))
+            elif len(parts) == 2 and method == 'GET':
+                events = await session.events()
+            else:
+                return 405, {'message': 'Method not allowed.'}
+        finally: # including games that failed
+            self._forget_if_finished(parts[1])
+        return 200, {'events': events}
+
+    def check_rules(self, rules):
+        """ Return the default rules updated with `rules`, a dict from a
+        request body, raising `BadRequest` if any rule is unknown or invalid.
+        """
+        unknown = set(rules) - set(self.default_rules)
+        if unknown:
+            raise BadRequest('Unknown rules: {}'.format(
+                    ', '.join(sorted(map(str, unknown)))))
+        rules = dict(self.default_rules, **rules)
+        cap = rules['cap']
+        if isinstance(cap, bool) or not isinstance(cap, int) or cap < 1:
+            raise BadRequest('Rule cap must be a positive integer.')
+        if not isinstance(rules['replace'], bool):
+            raise BadRequest('Rule replace must be true or false.')
+        return rules
+
+    def _forget_if_finished(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is not None and session.finished:
+            del self.sessions[session_id]
+
+    async def _handle(self, reader, writer):
+        """ Serve HTTP requests on one connection until it is closed."""
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                headers = {}
+                try:
+                    method, path, body = await self._read_request(
+                            request, reader, headers)
+                    status, response = await self.dispatch(method, path, body)
+                except (BadRequest, StopPlaying) as err:
+                    status, response = 400, {'message': str(err)}
+                except Exception as err: # a game failed, not the request
+                    status, response = 500, {'message': repr(err)}
+
+                payload = json.dumps(response).encode('utf-8')
+                keep_alive = (status != 400 and
+                              headers.get('connection', '').lower() != 'close')
+                writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json'
+                             '\r\nContent-Length: {}\r\nConnection: {}\r\n\r\n'
+                             .format(status, _REASONS.get(status, ''),
+                                     len(payload),
+                                     'keep-alive' if keep_alive else 'close')
+                             .encode('latin-1') + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, request, reader, headers):
+        """ Return (method, path, decoded JSON body or None) of a request,
+        given its first line, filling `headers` as they are read.
+
+        Raises `BadRequest` if the request cannot be parsed.
+        """
+        try:
+            method, path, version = request.decode('latin-1').split()
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get('content-length', 0))
+            if length < 0:
+                raise ValueError('Negative Content-Length')
+            body = await reader.readexactly(length) if length else b''
+            return method, path, json.loads(body) if body else None
+        except ValueError as err: # includes bad JSON and unicode
+            raise BadRequest('Malformed request: {}'.format(err))
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+            405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+async def serve(records, host='127.0.0.1', port=8000, ready=None):
+    """ Serve games on `records` until cancelled.
+    Args:
+        ready ::: optional `asyncio.Future`, given the `GameServer` once it
+                  is listening (e.g. to find the port, if `port` is 0)
+    """
+    game_server = GameServer(records)
+    server = await game_server.start(host, port)
+    if ready is not None:
+        ready.set_result(game_server)
+    async with server:
+        await server.serve_forever()
+
+async def _main(records, port):
+    """ Serve games on `records`, saying where once listening."""
+    ready = asyncio.get_running_loop().create_future()
+    task = asyncio.ensure_future(serve(records, port=port, ready=ready))
+    game_server = await ready
+    print('Serving discogs jockey on http://127.0.0.1:{}'.format(
+            game_server.port))
+    await task
+
+if __name__ == '__main__':
+    from .collection import Shelf
+    from .load import iter_rows_from_dir
+    fdir = sys.argv[1] if len(sys.argv) > 1 else 'collection'
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8000
+    shelf = Shelf(iter_rows_from_dir(fdir))
+    asyncio.run(_main(shelf.records.values(), port))
@@ -0,0 +1,245 @@
+""" similarity
+
+Module for drawing records that mix well with the one just played.
+
+Records are described by sparse features (genres, styles, labels and era),
+held as a NumPy matrix in compressed column form, so the similarity of one
+record to all others is a sparse matrix-vector product: a few vectorised
+additions over the records sharing each of its features.
+"""
+import numpy as np
+from .collection import Shelf
+
+class MixabilityIndex():
+    """ Sparse feature matrix of Records, for similarity queries.
+
+    The similarity of two records is the sum, over the features they share,
+    of the feature's field weight times its inverse document frequency, so
+    sharing a rare label counts for more than sharing a common genre.
+    Records from neighbouring eras share half an era feature.
+    """
+
+    weights = {'genre': 1.0, 'style': 2.0, 'label': 1.5, 'era': 1.0}
+    era_years = 3 # years per era
+
+    def __init__(self, records):
+        """
+        Args:
+            records ::: iterable of Records to index
+        """
+        self.ids = [] # release_id of each row
+        self.rows = {} # {release_id: row}
+        self.features = {} # {feature: column}
+        self._record_features = [] # list of feature columns per row
+        rows, cols = [], []
+        for record in records:
+            if record.release_id in self.rows:
+                continue
+            row = len(self.ids)
+            self.rows[record.release_id] = row
+            self.ids.append(record.release_id)
+            columns = [self._column(feature)
+                       for feature in set(self._features(record))]
+            self._record_features.append(columns)
+            rows.extend([row]*len(columns))
+            cols.extend(columns)
+
+        # Compressed column form: rows having feature f are
+        # col_rows[indptr[f]:indptr[f + 1]]
+        rows = np.array(rows, dtype=np.int32)
+        cols = np.array(cols, dtype=np.int32)
+        order = np.argsort(cols, kind='stable')
+        self.col_rows = rows[order]
+        self.indptr = np.searchsorted(cols[order],
+                                      np.arange(len(self.features) + 1))
+        counts = np.diff(self.indptr)
+        n = max(len(self.ids), 1)
+        field_weights = np.array([self.weights[feature[0]]
+                                  for feature in self.features], dtype=np.float32)
+        self.column_weights = field_weights * np.log1p(
+                n / np.maximum(counts, 1)).astype(np.float32)
+        self._columns = list(self.features) # feature of each column
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _column(self, feature):
+        column = self.features.get(feature)
+        if column is None:
+            column = self.features[feature] = len(self.features)
+        return column
+
+    def _features(self, record):
+        """ Yield (field, value) features of a Record."""
+        for genre in record.genres:
+            yield ('genre', genre)
+        for style in record.styles:
+            yield ('style', style)
+        for label in record.labels:
+            if label:
+                yield ('label', label)
+        if record.year:
+            yield ('era', int(record.year) // self.era_years)
+
+    def _query(self, row):
+        """ Return list of (column, weight) of the features to score row
+        `row` against: its own, and half of its neighbouring eras.
+        """
+        query = [(column, 1.0) for column in self._record_features[row]]
+        for column, _ in list(query):
+            field, value = self._columns[column]
+            if field == 'era':
+                for era in (value - 1, value + 1):
+                    neighbour = self.features.get(('era', era))
+                    if neighbour is not None:
+                        query.append((neighbour, 0.5))
+        return query
+
+    def scores(self, release_ids):
+        """ Return float32 array (len(release_ids) x len(self)) of the
+        similarity of each given record to every indexed record.
+        """
+        scores = np.zeros((len(release_ids), len(self.ids)), dtype=np.float32)
+        col_rows, indptr, weights = self.col_rows, self.indptr, self.column_weights
+        for i, release_id in enumerate(release_ids):
+            row_scores = scores[i]
+            for column, weight in self._query(self.rows[release_id]):
+                row_scores[col_rows[indptr[column]:indptr[column + 1]]] += (
+                        weight * weights[column])
+        return scores
+
+    def top_k(self, scores, k):
+        """ Return rows of the `k` highest of each row of `scores` (e.g. from
+        `scores`, masked), best first, as an array (rows of `scores` x k).
+        """
+        scores = np.atleast_2d(scores)
+        k = min(k, scores.shape[1])
+        if k == 0:
+            return np.empty((scores.shape[0], 0), dtype=np.int64)
+        top = np.argpartition(scores, -k, axis=1)[:, -k:]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        return np.take_along_axis(top, order, axis=1)
+
+    def similar(self, release_ids, k=10):
+        """ Return, for each of `release_ids`, a list of up to `k` (release_id,
+        similarity) of the most similar other records, best first.
+        """
+        scores = self.scores(release_ids)
+        for i, release_id in enumerate(release_ids):
+            scores[i, self.rows[release_id]] = 0 # not itself
+        results = []
+        for row_scores, top in zip(scores, self.top_k(scores, k)):
+            results.append([(self.ids[row], float(row_scores[row]))
+                            for row in top if row_scores[row] > 0])
+        return results
+
+class MixableShelf(Shelf):
+    """ A Shelf whose draws favour records that mix with the last played.
+
+    With probability `bias`, a draw is made uniformly from the `k` records
+    on the shelf most similar to the last record played (see `note_round`);
+    otherwise, and until a record has been played, draws are uniform.
+    Similarities to the last played record are computed once per round.
+    """
+
+    def __init__(self, collection, bias=0.5, k=20, client=None):
+        """
+        Args:
+            collection ::: as for `Shelf`
+            bias ::: float chance of each draw being a similar record
+            k ::: int number of most similar records to draw among
+        """
+        self.bias = bias
+        self.k = k
+        self.last_played = None # release_id
+        self._mixability = None # MixabilityIndex, built on first use
+        self._on_shelf = None # bool array, by row of the index
+        self._last_scores = None # similarities to the last played record
+        super().__init__(collection, client=client)
+
+    @property
+    def mixability(self):
+        """ `MixabilityIndex` of the records on the shelf when first used,
+        and of those of the round that first used it (see `note_round`).
+
+        Records added later are only drawn uniformly.
+        """
+        if self._mixability is None:
+            self._build_mixability()
+        return self._mixability
+
+    def _build_mixability(self, taken=()):
+        """ Index the records on the shelf and `taken` (records drawn off it,
+        which are only scored against).
+        """
+        self._apply_pending()
+        records = self.records
+        self._mixability = MixabilityIndex(
+                list(records.values()) + list(taken))
+        self._on_shelf = np.zeros(len(self._mixability), dtype=bool)
+        rows = self._mixability.rows
+        self._on_shelf[np.fromiter((rows[release_id] for release_id in records),
+                                   dtype=np.intp, count=len(records))] = True
+
+    def note_round(self, played, unplayed):
+        """ Remember the last record played, to draw records like it.
+
+        The first round played indexes the shelf, including its records.
+        """
+        if played:
+            if self._mixability is None:
+                self._build_mixability(played + unplayed)
+            self.last_played = played[-1].release_id
+            self._last_scores = None
+            self._repick()
+
+    def _pick_slot(self):
+        """ Return the slot of a record to draw at random, favouring those
+        similar to the last played record.
+        """
+        slot = None
+        if self.last_played is not None and self.rng.random() < self.bias:
+            slot = self._similar_slot()
+        if slot is None:
+            slot = self.rng.randrange(len(self._ids))
+        return slot
+
+    def _similar_slot(self):
+        """ Return the slot of one of the `k` records on the shelf most
+        similar to the last played, at random, or None if there are none.
+        """
+        index = self.mixability
+        if self.last_played not in index.rows:
+            return None
+        if self._last_scores is None:
+            self._last_scores = index.scores([self.last_played])[0]
+        scores = np.where(self._on_shelf, self._last_scores, 0)
+        top = [row for row in index.top_k(scores, self.k)[0] if scores[row] > 0]
+        if not top:
+            return None
+        release_id = index.ids[top[self.rng.randrange(len(top))]]
+        return self._slot_map()[release_id]
+
+    def _put(self, record):
+        super()._put(record)
+        if self._mixability is not None:
+            row = self._mixability.rows.get(record.release_id)
+            if row is not None:
+                self._on_shelf[row] = True
+    _put.__doc__ = Shelf._put.__doc__
+
+    def _take_slot(self, slot):
+        record = super()._take_slot(slot)
+        if self._mixability is not None:
+            row = self._mixability.rows.get(record.release_id)
+            if row is not None:
+                self._on_shelf[row] = False
+        return record
+    _take_slot.__doc__ = Shelf._take_slot.__doc__
+
+    def empty(self):
+        records = super().empty()
+        if self._mixability is not None:
+            self._on_shelf[:] = False
+        return records
+    empty.__doc__ = Shelf.empty.__doc__
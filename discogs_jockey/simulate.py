@@ -0,0 +1,188 @@
+""" simulate
+
+Headless simulation of discogs jockey sets, for choosing game rules.
+Complete sets are played by scripted choice policies instead of a person,
+with seeded random draws, fanned out over a process pool.
+
+    python -m discogs_jockey.simulate [collection_dir]
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+import random
+import sys
+from .collection import Record, RecordTable, Shelf
+from .exceptions import StopPlaying
+from .game import Game
+from .interactor import Interactor
+
+class ChooseAfter():
+    """ Policy: draw `n` records, then choose one of the crate at random."""
+
+    def __init__(self, n):
+        self.n = n
+
+    def __call__(self, crate, cap, rng):
+        if len(crate) >= self.n:
+            return rng.choice(list(crate.records))
+        return None
+
+class ChooseWithProbability():
+    """ Policy: after each draw, choose the newest record with probability
+    `p`, otherwise draw again.
+    """
+
+    def __init__(self, p):
+        self.p = p
+
+    def __call__(self, crate, cap, rng):
+        if rng.random() < self.p:
+            return next(reversed(crate.records))
+        return None
+
+class ScriptedInteractor(Interactor):
+    """ Interactor that makes choices with a policy and keeps statistics.
+
+    The policy is a callable (crate, cap, rng) -> release_id, or None to
+    draw again. A choice is forced once nothing more can be drawn (the cap
+    is reached, or the shelf is empty). The set is ended after `set_length`
+    rounds, as a DJ would.
+    """
+
+    def __init__(self, policy, cap, rng, set_length=30):
+        self.policy = policy
+        self.cap = cap
+        self.rng = rng
+        self.set_length = set_length
+        self.draws = [] # number of records drawn in each round
+        self.cap_hits = 0 # rounds in which the cap was reached
+        self._capped = False
+
+    def display_new_round(self, roundn):
+        if roundn > self.set_length:
+            raise StopPlaying('Set finished')
+        self.draws.append(0)
+        self._capped = False
+
+    def display_option(self, record, k=None):
+        self.draws[-1] += 1
+
+    def display_cap_reached(self, cap):
+        if not self._capped:
+            self.cap_hits += 1
+        self._capped = True
+
+    def get_choice(self, crate):
+        choice = self.policy(crate, self.cap, self.rng)
+        if choice is None and self._capped:
+            choice = self.rng.choice(list(crate.records)) # must choose now
+        return choice
+
+    # Nothing to show or ask without a user
+    def find_record(self, shelf): pass
+    def display_choice(self, record): pass
+    def display_crate(self, crate): pass
+    def display_finished(self): pass
+    def display_history(self, history): pass
+    def request_username(self): pass
+    def bad_username(self, username): pass
+    def greet_user(self, user): pass
+    def request_authorisation(self, auth_url): pass
+
+def play_sets(table, rules, policy, seeds, set_length=30):
+    """ Play a set per seed, each on a fresh view of `table`.
+    Args:
+        table ::: `discogs_jockey.collection.RecordTable` of the collection
+    Returns:
+        stats ::: list of (draws per round list, cap hits) per set
+    """
+    stats = []
+    for seed in seeds:
+        rng = random.Random(seed)
+        shelf = table.view()
+        shelf.rng = rng
+        io = ScriptedInteractor(policy, rules['cap'], rng, set_length)
+        game = Game(shelf, io, rules=rules)
+        game.play_set()
+        stats.append((io.draws, io.cap_hits))
+    return stats
+
+_worker_table = None # RecordTable of the collection, set in each worker
+
+def _init_worker(records):
+    global _worker_table
+    _worker_table = RecordTable(records)
+
+def _play_chunk(rules, policy, seeds, set_length):
+    """ Play a chunk of sets on the worker's table."""
+    return rules, play_sets(_worker_table, rules, policy, seeds, set_length)
+
+def simulate(records, policy, caps=(1, 3, 5), replaces=(True, False),
+             sets=1000, seed=0, set_length=30, processes=None, chunk=50):
+    """ Return aggregate statistics of simulated sets for each rule setting.
+
+    Each set is played on a fresh view of the collection and seeded by set
+    number, so results do not depend on the number of processes.
+    Args:
+        records ::: iterable of Records in the collection
+        policy ::: picklable callable (crate, cap, rng) -> release_id/None
+        caps, replaces ::: values of the 'cap' and 'replace' rules to try
+        sets ::: int number of sets per rule setting
+        seed ::: int base random seed
+        set_length ::: int number of rounds after which a set ends
+        processes ::: int worker processes (default: one per CPU), 1 to
+                      run in this process
+    Returns:
+        stats ::: {(cap, replace): dict of aggregate statistics}
+    """
+    records = [Record(record.to_dict()) for record in records] # picklable
+    jobs = []
+    for cap, replace in product(caps, replaces):
+        rules = {'cap': cap, 'replace': replace}
+        for start in range(0, sets, chunk):
+            seeds = [seed*sets + i for i in range(start, min(sets, start + chunk))]
+            jobs.append((rules, policy, seeds, set_length))
+
+    if processes == 1:
+        _init_worker(records)
+        results = [_play_chunk(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(processes, initializer=_init_worker,
+                                 initargs=(records,)) as pool:
+            results = list(pool.map(_play_chunk, *zip(*jobs)))
+
+    # Aggregate per rule setting
+    sets_by_rules = {}
+    for rules, chunk_stats in results:
+        key = (rules['cap'], rules['replace'])
+        sets_by_rules.setdefault(key, []).extend(chunk_stats)
+    return {key: _aggregate(set_stats)
+            for key, set_stats in sets_by_rules.items()}
+
+def _aggregate(set_stats):
+    """ Return dict of summary statistics of a list of (draws, cap_hits)."""
+    rounds = [len(draws) for draws, cap_hits in set_stats]
+    draws = [n for set_draws, cap_hits in set_stats for n in set_draws]
+    cap_hits = sum(cap_hits for draws, cap_hits in set_stats)
+    histogram = {}
+    for n in draws:
+        histogram[n] = histogram.get(n, 0) + 1
+    return {'sets': len(set_stats),
+            'rounds_per_set': sum(rounds) / max(len(rounds), 1),
+            'draws_per_round': sum(draws) / max(len(draws), 1),
+            'cap_hit_rate': cap_hits / max(len(draws), 1),
+            'draws_histogram': dict(sorted(histogram.items()))}
+
+def print_stats(stats):
+    """ Print a table of `simulate` statistics."""
+    print('{:>4} {:>8} {:>12} {:>12} {:>10}'.format(
+            'cap', 'replace', 'rounds/set', 'draws/round', 'cap hits'))
+    for (cap, replace), row in sorted(stats.items()):
+        print('{:>4} {:>8} {:>12.2f} {:>12.2f} {:>9.1%}'.format(
+                cap, str(replace), row['rounds_per_set'],
+                row['draws_per_round'], row['cap_hit_rate']))
+
+if __name__ == '__main__':
+    from .load import iter_rows_from_dir
+    fdir = sys.argv[1] if len(sys.argv) > 1 else 'collection'
+    shelf = Shelf(iter_rows_from_dir(fdir))
+    print_stats(simulate(shelf.records.values(), ChooseWithProbability(0.4)))
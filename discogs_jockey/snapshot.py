@@ -0,0 +1,181 @@
+""" snapshot
+
+Module for saving a shelf of Records to a compact binary snapshot, and
+opening it again without parsing or building every Record up front.
+
+A snapshot holds, sorted by release_id:
+    release_ids ::: int64 array
+    years ::: int32 array (0 where unknown)
+    for each of title, artists, labels, cat_nums, formats, genres, styles
+    and cover_image:
+        offsets ::: uint64 array of n+1 offsets into a UTF-8 string blob
+        blob ::: UTF-8 strings end to end (tuples of strings joined by US)
+The file is memory mapped when opened, and a Record is only built when
+one is looked up.
+"""
+from .collection import Record
+from array import array
+from bisect import bisect_left
+from collections.abc import MutableMapping
+import mmap
+import struct
+
+MAGIC = b'DJSNAP03'
+HEADER = struct.Struct('<8sQ') # magic, number of records
+SEP = '\x1f' # unit separator between strings of a tuple field (e.g. labels)
+STRING_FIELDS = ('title', 'artists', 'labels', 'cat_nums', 'formats', 'genres',
+                 'styles', 'cover_image')
+TUPLE_FIELDS = STRING_FIELDS[2:7]
+
+def _pad(n):
+    """ Return number of bytes to pad `n` to a multiple of 8."""
+    return -n % 8
+
+def _year(year):
+    """ Return `year` as an int, with 0 for unknown (None or NaN)."""
+    try:
+        return int(year)
+    except (TypeError, ValueError):
+        return 0
+
+def save_snapshot(records, path):
+    """ Write `records` (iterable of Records) to a snapshot file at `path`."""
+    records = sorted(records, key=lambda record: record.release_id)
+    n = len(records)
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, n))
+        f.write(array('q', [record.release_id for record in records]).tobytes())
+        years = array('i', [_year(record.year) for record in records]).tobytes()
+        f.write(years + b'\0'*_pad(len(years)))
+
+        for field in STRING_FIELDS:
+            offsets = array('Q', [0])
+            blob = bytearray()
+            for record in records:
+                value = getattr(record, field)
+                if not isinstance(value, str):
+                    value = SEP.join(value)
+                blob += value.encode('utf-8')
+                offsets.append(len(blob))
+            f.write(offsets.tobytes())
+            f.write(blob + b'\0'*_pad(len(blob)))
+
+class Snapshot():
+    """ A memory mapped snapshot of Records, read with `save_snapshot`."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        magic, n = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError('{} is not a shelf snapshot'.format(path))
+        self._n = n
+
+        # Slice columns out of the mapping without copying
+        pos = HEADER.size
+        self.ids = view[pos:pos + 8*n].cast('q')
+        pos += 8*n
+        self.years = view[pos:pos + 4*n].cast('i')
+        pos += 4*n + _pad(4*n)
+        self._strings = {}
+        for field in STRING_FIELDS:
+            offsets = view[pos:pos + 8*(n + 1)].cast('Q')
+            pos += 8*(n + 1)
+            size = offsets[n]
+            self._strings[field] = (offsets, view[pos:pos + size])
+            pos += size + _pad(size)
+
+    def __len__(self):
+        return self._n
+
+    def row(self, release_id):
+        """ Return row index of `release_id`, raising KeyError if absent."""
+        row = bisect_left(self.ids, release_id)
+        if row == self._n or self.ids[row] != release_id:
+            raise KeyError(release_id)
+        return row
+
+    def __contains__(self, release_id):
+        row = bisect_left(self.ids, release_id)
+        return row < self._n and self.ids[row] == release_id
+
+    def _string(self, field, row):
+        offsets, blob = self._strings[field]
+        return str(blob[offsets[row]:offsets[row + 1]], 'utf-8')
+
+    def _strings_tuple(self, field, row):
+        value = self._string(field, row)
+        return value.split(SEP) if value else ()
+
+    def record(self, row):
+        """ Return a new Record built from row `row`."""
+        labels, cat_nums, formats, genres, styles = [
+                self._strings_tuple(field, row) for field in TUPLE_FIELDS]
+        return Record._from_values(
+                self.ids[row], self._string('title', row),
+                self._string('artists', row), labels, cat_nums,
+                self.years[row], formats, genres, styles,
+                self._string('cover_image', row))
+
+class SnapshotRecords(MutableMapping):
+    """ Mapping of {release_id: Record} over a Snapshot.
+
+    Records are built on lookup; those removed or added since opening are
+    tracked separately, so the snapshot itself is never modified.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._removed = set() # release_ids of snapshot records removed
+        self._added = {} # {release_id: Record} added since opening
+        self._first = 0 # no rows before this are left, for popitem
+
+    def __getitem__(self, release_id):
+        if release_id in self._added:
+            return self._added[release_id]
+        if release_id in self._removed:
+            raise KeyError(release_id)
+        return self.snapshot.record(self.snapshot.row(release_id))
+
+    def __setitem__(self, release_id, record):
+        if release_id not in self._added and release_id in self.snapshot:
+            self._removed.add(release_id) # shadowed by added record
+        self._added[release_id] = record
+
+    def __delitem__(self, release_id):
+        if release_id in self._added:
+            del self._added[release_id]
+        elif release_id in self.snapshot and release_id not in self._removed:
+            self._removed.add(release_id)
+        else:
+            raise KeyError(release_id)
+
+    def __contains__(self, release_id):
+        return release_id in self._added or (
+                release_id not in self._removed and release_id in self.snapshot)
+
+    def __iter__(self):
+        removed = self._removed
+        for release_id in self.snapshot.ids:
+            if release_id not in removed:
+                yield release_id
+        yield from list(self._added)
+
+    def __len__(self):
+        return len(self.snapshot) - len(self._removed) + len(self._added)
+
+    def popitem(self):
+        """ Remove and return a (release_id, Record) pair, in O(1) amortised."""
+        if self._added:
+            return self._added.popitem()
+        ids = self.snapshot.ids
+        while self._first < len(ids) and ids[self._first] in self._removed:
+            self._first += 1
+        if self._first == len(ids):
+            raise KeyError('popitem(): mapping is empty')
+        release_id = ids[self._first]
+        return release_id, self.pop(release_id)
@@ -0,0 +1,307 @@
+""" transport
+
+Pluggable HTTP transports for talking to discogs, to record real API
+responses to disk and replay them offline, e.g. to load test collection
+fetching without credentials or a network.
+
+A transport serves both the `discogs_client.client.Client` made by
+`discogs_api.make_app_client(transport)` (in place of its fetcher) and the
+`fetch.CollectionFetcher` made from that client (in place of its session).
+
+`ReplayTransport` can add latency, discogs rate-limit headers (and 429s
+once over the limit, as discogs does) and randomly injected 429s, and
+counts requests and statuses, so request counts, throughput and backoff
+can be measured.
+
+Cassettes hold responses verbatim, including any access tokens returned
+while authorising, so should be kept private.
+"""
+from collections import Counter, deque
+import base64
+from http.client import responses
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Query parameters that authenticate rather than identify a request
+AUTH_PARAMS = {'token', 'key', 'secret'}
+
+# Headers describing the encoding of the body on the wire, not as stored
+WIRE_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding',
+                'connection', 'set-cookie'}
+
+NOT_FOUND = (404, json.dumps({'message': 'Resource not found.'}))
+TOO_MANY = (429, json.dumps({'message': 'You are making requests too quickly.'}))
+
+def request_key(method, url):
+    """ Return key of a request: its method and url, with query parameters
+    sorted and any credentials (including OAuth parameters) removed.
+    """
+    scheme, netloc, path, query, fragment = urlsplit(url)
+    params = sorted((name, value) for name, value in parse_qsl(query)
+                    if name not in AUTH_PARAMS and not name.startswith('oauth_'))
+    return '{} {}'.format(method.upper(),
+                          urlunsplit((scheme, netloc, path, urlencode(params), '')))
+
+class Cassette():
+    """ Recorded responses, by `request_key`, kept in a JSON lines file.
+
+    Each recording is appended as it is made; when a request is recorded
+    more than once, the latest response is replayed.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path ::: str path of the file, loaded if it exists
+        """
+        self.path = path
+        self.responses = {} # {key: (status, headers dict, body bytes)}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        self._load(json.loads(line))
+
+    def _load(self, entry):
+        body = entry['body']
+        if entry.get('encoding') == 'base64':
+            body = base64.b64decode(body)
+        else:
+            body = body.encode('utf-8')
+        self.responses[entry['key']] = (entry['status'], entry['headers'], body)
+
+    def __len__(self):
+        return len(self.responses)
+
+    def __contains__(self, key):
+        return key in self.responses
+
+    def get(self, key):
+        """ Return (status, headers, body bytes) recorded for `key`, or None."""
+        return self.responses.get(key)
+
+    def put(self, key, status, headers, body):
+        """ Record a response, appending it to the file."""
+        headers = {name: value for name, value in headers.items()
+                   if name.lower() not in WIRE_HEADERS}
+        entry = {'key': key, 'status': status, 'headers': headers}
+        try:
+            entry['body'] = body.decode('utf-8')
+        except UnicodeDecodeError:
+            entry['body'] = base64.b64encode(body).decode('ascii')
+            entry['encoding'] = 'base64'
+        with self._lock:
+            self.responses[key] = (status, headers, body)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+
+def make_response(url, status, headers, body):
+    """ Return a `requests.Response` as if received from `url`."""
+    resp = requests.Response()
+    resp.url = url
+    resp.status_code = status
+    resp.headers = CaseInsensitiveDict(headers)
+    resp.reason = responses.get(status, '')
+    resp._content = body
+    resp.encoding = 'utf-8'
+    return resp
+
+class Transport():
+    """ Base class of transports.
+
+    Subclasses implement `request`; `get` lets a transport stand in for the
+    `requests.Session` of a `CollectionFetcher`, and `wrap` for the fetcher
+    of a discogs client.
+    """
+
+    def request(self, method, url, data=None, headers=None):
+        """ Return a `requests.Response` to a request."""
+        raise NotImplementedError()
+
+    def get(self, url, headers=None, timeout=None, **kwargs):
+        return self.request('GET', url, headers=headers)
+
+    def fetch(self, fetcher, client, method, url, data=None, headers=None,
+              json_format=True):
+        """ Return (content, status code) of a discogs client request, which
+        `fetcher` (the client's own) would otherwise make.
+        """
+        resp = self.request(method, url, data, headers)
+        return resp.content, resp.status_code
+
+    def wrap(self, fetcher):
+        """ Return a discogs client fetcher making requests through this
+        transport, with `fetcher`'s other (e.g. OAuth) methods.
+        """
+        return ClientFetcher(self, fetcher)
+
+class ClientFetcher():
+    """ Fetcher of a `discogs_client.client.Client` using a `Transport`."""
+
+    def __init__(self, transport, fetcher):
+        self.transport = transport
+        self.fetcher = fetcher
+
+    def __getattr__(self, name): # e.g. store_token, or the OAuth `client`
+        return getattr(self.fetcher, name)
+
+    def fetch(self, client, method, url, data=None, headers=None, json=True):
+        return self.transport.fetch(self.fetcher, client, method, url, data,
+                                    headers, json)
+
+class RecordingTransport(Transport):
+    """ Makes real requests, recording each response to a `Cassette`."""
+
+    def __init__(self, cassette, session=None):
+        """
+        Args:
+            cassette ::: `Cassette` to record to
+            session ::: `requests.Session`, created (pooled) if not given
+        """
+        from .fetch import CollectionFetcher
+        self.cassette = cassette
+        self.session = session or CollectionFetcher._make_session(8)
+
+    def request(self, method, url, data=None, headers=None):
+        resp = self.session.request(method, url, data=data, headers=headers,
+                                    timeout=30)
+        self.cassette.put(request_key(method, url), resp.status_code,
+                          resp.headers, resp.content)
+        return resp
+
+    def fetch(self, fetcher, client, method, url, data=None, headers=None,
+              json_format=True):
+        # Requests are made (and signed) by the client's own fetcher, which
+        # does not return headers
+        content, status = fetcher.fetch(client, method, url, data, headers,
+                                        json_format)
+        self.cassette.put(request_key(method, url), status, {}, content)
+        return content, status
+
+class ReplayTransport(Transport):
+    """ Replays recorded responses, as a rate limited discogs would.
+
+    Requests not recorded get a 404. Over `per_minute` requests in the last
+    minute get a 429, and any request gets one with probability
+    `error_rate`. Every response carries X-Discogs-Ratelimit headers.
+    """
+
+    def __init__(self, cassette, latency=0.0, per_minute=60, error_rate=0.0,
+                 seed=0, clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            cassette ::: `Cassette` to replay
+            latency ::: float seconds per response, or (low, high) range of
+                        seconds to pick from uniformly
+            per_minute ::: int requests allowed in any minute, or None for
+                           no limit
+            error_rate ::: float probability of injecting a 429
+            seed ::: int random seed for latency and injected errors
+        """
+        self.cassette = cassette
+        self.latency = latency
+        self.per_minute = per_minute
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self._clock = clock
+        self._sleep = sleep
+        self._window = deque() # times of requests in the last minute
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """ Clear request statistics."""
+        self.requests = 0
+        self.statuses = Counter() # {status code: count}
+        self.misses = [] # keys of requests not in the cassette
+
+    def request(self, method, url, data=None, headers=None):
+        key = request_key(method, url)
+        with self._lock:
+            now = self._clock()
+            while self._window and self._window[0] <= now - 60:
+                self._window.popleft()
+            limited = (self.per_minute is not None
+                       and len(self._window) >= self.per_minute)
+            if not limited:
+                self._window.append(now)
+            injected = self.error_rate and self.rng.random() < self.error_rate
+            if isinstance(self.latency, (tuple, list)):
+                latency = self.rng.uniform(*self.latency)
+            else:
+                latency = self.latency
+
+            recorded = self.cassette.get(key)
+            if limited or injected:
+                status, headers, body = TOO_MANY[0], {}, TOO_MANY[1].encode()
+            elif recorded is None:
+                self.misses.append(key)
+                status, headers, body = NOT_FOUND[0], {}, NOT_FOUND[1].encode()
+            else:
+                status, headers, body = recorded
+            self.requests += 1
+            self.statuses[status] += 1
+
+            headers = dict(headers)
+            if self.per_minute is not None:
+                used = len(self._window)
+                headers.update({'X-Discogs-Ratelimit': str(self.per_minute),
+                                'X-Discogs-Ratelimit-Used': str(used),
+                                'X-Discogs-Ratelimit-Remaining':
+                                        str(max(self.per_minute - used, 0))})
+
+        if latency:
+            self._sleep(latency)
+        return make_response(url, status, headers, body)
+
+def transport_from_env():
+    """ Return a transport set by environment variable, or None.
+
+    DISCOGS_JOCKEY_RECORD=path records responses to the cassette at path,
+    and DISCOGS_JOCKEY_REPLAY=path replays them (without rate limiting).
+    """
+    if os.environ.get('DISCOGS_JOCKEY_REPLAY'):
+        return ReplayTransport(Cassette(os.environ['DISCOGS_JOCKEY_REPLAY']),
+                               per_minute=None)
+    if os.environ.get('DISCOGS_JOCKEY_RECORD'):
+        return RecordingTransport(Cassette(os.environ['DISCOGS_JOCKEY_RECORD']))
+    return None
+
+class SessionTransport(Transport):
+    """ Makes real requests through one pooled, keep-alive session.
+
+    Shared by a discogs client and the `CollectionFetcher` made from it, so
+    a whole run reuses the same connections. Client requests are signed as
+    the client's OAuth fetcher would sign them.
+    """
+
+    def __init__(self, session=None, workers=8):
+        """
+        Args:
+            session ::: `requests.Session`, created (pooled) if not given
+            workers ::: int connections to pool, if creating the session
+        """
+        from .fetch import CollectionFetcher
+        self.session = session or CollectionFetcher._make_session(workers)
+
+    def request(self, method, url, data=None, headers=None):
+        return self.session.request(method, url, data=data, headers=headers,
+                                    timeout=30)
+
+    def fetch(self, fetcher, client, method, url, data=None, headers=None,
+              json_format=True):
+        oauth = getattr(fetcher, 'client', None)
+        if oauth is not None: # as `discogs_client.fetchers.OAuth2Fetcher`
+            body = json.dumps(data) if json_format and data else data
+            url, headers, _ = oauth.sign(url, http_method=method, body=data,
+                                         headers=headers)
+            data = body
+        resp = self.request(method, url, data, headers)
+        return resp.content, resp.status_code
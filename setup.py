@@ -10,6 +10,7 @@ setup(name='Discogs Jockey',
       description='DJ mixing tool',
       url='https://github.com/AP-e/Discogs-Jockey',
       packages=['discogs_jockey'],
-      install_requires=['discogs-client', 'pandas']
+      install_requires=['discogs-client', 'numpy', 'pandas', 'requests'],
+      extras_require={'covers': ['Pillow']}
      )
 
@@ -0,0 +1,40 @@
+""" Factories of Records and discogs collection items shared by the tests.
+
+Import them with `from conftest import make_records` etc.
+"""
+from discogs_jockey.collection import Record
+
+def make_record(release_id, **fields):
+    """ Return a vinyl Record with placeholder fields, any of which can be
+    given in `fields`, e.g. make_record(1, labels=('Warp',)).
+    """
+    info = {'release_id': release_id, 'title': 'Title {}'.format(release_id),
+            'artists': 'Artist', 'labels': ('Label',),
+            'cat_nums': ('CAT{}'.format(release_id),), 'year': 1990}
+    info.update(fields)
+    return Record(info)
+
+def make_records(n, **fields):
+    """ Return Records with release_ids 0 to `n` - 1, as `make_record`."""
+    return [make_record(release_id, **fields) for release_id in range(n)]
+
+def make_item(release_id, year=1990, date_added='2020-01-01T00:00:00+00:00',
+              **info):
+    """ Return a collection item dict of a vinyl release, as from the
+    discogs collection releases endpoint, with any of its
+    `basic_information` given in `info`.
+    """
+    basic_information = {
+            'id': release_id, 'title': 'Title {}'.format(release_id),
+            'artists': [{'name': 'Artist', 'anv': '', 'join': ''}],
+            'labels': [{'name': 'Label', 'catno': 'CAT{}'.format(release_id)}],
+            'formats': [{'name': 'Vinyl'}], 'year': year}
+    basic_information.update(info)
+    return {'id': release_id, 'instance_id': 1000 + release_id,
+            'date_added': date_added, 'basic_information': basic_information}
+
+def make_items(release_ids, **kwargs):
+    """ Return a collection item dict of each of `release_ids`, as
+    `make_item`.
+    """
+    return [make_item(release_id, **kwargs) for release_id in release_ids]
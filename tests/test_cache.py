@@ -0,0 +1,50 @@
+""" Sync collections into `discogs_jockey.cache.CollectionCache`."""
+from discogs_jockey.cache import CollectionCache
+from discogs_jockey.collection import Shelf
+from conftest import make_item
+
+class Fetcher():
+    """ Collection fetcher of a folder of `items`, newest first."""
+
+    def __init__(self, items, error=None):
+        self.items = items
+        self.error = error
+
+    def fetch_items(self, username, folder_id=0):
+        if self.error:
+            raise self.error
+        return list(self.items)
+
+    def iter_pages(self, username, folder_id=0, sort=None, sort_order=None):
+        if self.error:
+            raise self.error
+        yield {'pagination': {'items': len(self.items)},
+               'releases': list(self.items)}
+
+class Interactor():
+    def __init__(self):
+        self.errors = []
+
+    def display_sync_failed(self, error):
+        self.errors.append(error)
+
+def test_sync_compares_times_not_strings():
+    cache = CollectionCache(':memory:')
+    items = [make_item(1, date_added='2020-01-01T10:00:00+02:00')] # 08:00 UTC
+    assert len(cache.sync(Fetcher(items), 'dj')[0]) == 1
+
+    # Later, though earlier as a string
+    items.insert(0, make_item(2, date_added='2020-01-01T09:00:00+00:00'))
+    added, removed = cache.sync(Fetcher(items), 'dj')
+    assert [record.release_id for record in added] == [2]
+    assert removed == []
+    assert cache.count('dj') == 2
+
+def test_background_sync_errors_are_reported():
+    cache = CollectionCache(':memory:')
+    io = Interactor()
+    thread = cache.sync_in_background(Fetcher([], error=OSError('offline')),
+                                      Shelf(None), 'dj', io=io)
+    thread.join()
+    assert io.errors == [thread.error]
+    assert str(thread.error) == 'offline'
@@ -0,0 +1,103 @@
+""" Build and draw Records with `discogs_jockey.collection`."""
+import pytest
+from discogs_jockey import collection
+from discogs_jockey.collection import Shelf
+from conftest import make_record, make_records
+
+def test_label_tuples_are_shared():
+    first, second = (make_record(1, labels=(' Warp ',)),
+                     make_record(2, labels=('Warp',)))
+    assert first.labels == ('Warp',)
+    assert first.labels is second.labels
+
+def test_tuple_pool_is_bounded(monkeypatch):
+    monkeypatch.setattr(collection, '_POOL_SIZE', 8)
+    shelf = Shelf([make_record(i, labels=('Label {}'.format(i),))
+                   for i in range(100)])
+    assert len(collection._pooled_tuples) <= 8
+    assert len(shelf) == 100
+    assert shelf.records[99].labels == ('Label 99',)
+
+class Prefetcher():
+    """ Stands in for `details.Prefetcher`, with every release fetched."""
+
+    def __init__(self):
+        self.requested = set()
+
+    def request(self, release_ids):
+        self.requested.update(release_ids)
+
+    def hydrate(self, record):
+        record.details = {'tracklist': []}
+        return record
+
+def test_shelves_made_from_a_shelf_keep_prefetching_and_updates():
+    from discogs_jockey.sampling import WeightedShelf
+    from discogs_jockey.similarity import MixableShelf
+    records = [make_record(i, labels=('Warp' if i % 2 else 'Rephlex',))
+               for i in range(20)]
+    root = Shelf(records[:10])
+    prefetcher = Prefetcher()
+    root.prefetch(prefetcher)
+    for shelf_type in (MixableShelf, WeightedShelf):
+        shelf = shelf_type(root.query(labels='Warp'))
+        assert shelf.prefetcher is prefetcher
+        assert sorted(shelf.records) == [1, 3, 5, 7, 9]
+
+        # A background sync of the first shelf reaches it, filtered
+        root.queue_update(records[10:], removed=[1])
+        assert len(shelf) == 9 # applied before the next draw
+        assert sorted(shelf.records) == [3, 5, 7, 9, 11, 13, 15, 17, 19]
+        drawn = shelf.random_records(3)
+        assert all(record.details is not None for record in drawn)
+        assert set(shelf._upcoming) <= set(shelf.records)
+        assert set(shelf._upcoming) <= prefetcher.requested
+        root = Shelf(records[:10])
+        root.prefetch(prefetcher)
+
+def test_shelf_views_draw_as_shelves_do():
+    import random
+    from discogs_jockey.collection import RecordTable
+    records = make_records(50)
+    shelf = Shelf(records)
+    view = RecordTable(records).view()
+    shelf.rng, view.rng = random.Random(1), random.Random(1)
+
+    def drawn(records):
+        return [record.release_id for record in records]
+
+    def check():
+        assert len(view) == len(shelf)
+        assert all((i in view) == (i in shelf.records) for i in range(50))
+
+    for turn in range(5):
+        first, second = shelf.random_records(6), view.random_records(6)
+        assert drawn(first) == drawn(second)
+        check()
+        kept = [i for i in (0, 10, 20, 30) if i in shelf.records]
+        assert drawn(shelf.pick_records(kept)) == drawn(view.pick_records(kept))
+        shelf.add_records(first[::2])
+        view.add_records(second[::2])
+        check()
+        assert view.current_owner == shelf.current_owner
+        assert view.owners_of(first[0].release_id) == shelf.owners_of(
+                first[0].release_id)
+    assert drawn(view.random_records(100)) == drawn(shelf.random_records(100))
+    assert len(view) == len(shelf) == 0
+
+def test_shelf_views_are_independent():
+    from discogs_jockey.collection import RecordTable
+    table = RecordTable(make_records(10) + [make_record(3, title='Again')])
+    assert len(table) == 10
+    assert table.records[table.rows[3]].title == 'Again' # latest, as Shelf
+    first, second = table.view(), table.view()
+    taken = first.pick_records([3]) + first.random_records(4)
+    assert len(first) == 5 and len(second) == 10
+    assert 3 not in first and 3 in second
+    with pytest.raises(KeyError): # already taken
+        first.pick_records([3])
+    first.add_records(taken + taken) # putting back twice is harmless
+    assert len(first) == 10
+    assert sorted(record.release_id for record in first.empty()) == list(
+            range(10))
+    assert len(first) == 0 and len(second) == len(table.view()) == 10
@@ -0,0 +1,75 @@
+""" Cache and hold cover thumbnails with `discogs_jockey.covers`."""
+from io import BytesIO
+import itertools
+from types import SimpleNamespace
+import pytest
+from discogs_jockey import covers
+from discogs_jockey.covers import CoverArt, CoverCache
+from conftest import make_record
+
+@pytest.fixture
+def clock(monkeypatch):
+    """ Make each use of a cached thumbnail one second after the last."""
+    monkeypatch.setattr(covers, 'time',
+                        SimpleNamespace(time=itertools.count().__next__))
+
+def test_least_recently_used_thumbnails_are_evicted(tmp_path, clock):
+    cache = CoverCache(str(tmp_path), budget=30)
+    cache.put(1, b'a'*10)
+    cache.put(2, b'b'*10)
+    cache.put(3, b'c'*10)
+    assert cache.get(1) == b'a'*10 # now used more recently than 2 and 3
+    cache.put(4, b'd'*10)
+    assert 2 not in cache and cache.get(2) is None
+    assert [cache.get(i) for i in (1, 3, 4)] == [b'a'*10, b'c'*10, b'd'*10]
+    assert cache.size == 30
+    cache.put(5, b'e'*25)
+    assert [i for i in range(1, 6) if i in cache] == [5]
+    assert len(list(tmp_path.glob('*/*.jpg'))) == 1 # evicted files deleted
+
+def test_identical_thumbnails_are_stored_once(tmp_path, clock):
+    cache = CoverCache(str(tmp_path), budget=30)
+    cache.put(1, b'a'*20)
+    cache.put(2, b'a'*20)
+    assert cache.size == 20
+    cache.put(3, b'c'*10) # within budget, as the first two share bytes
+    assert all(i in cache for i in (1, 2, 3))
+    cache.close()
+    assert CoverCache(str(tmp_path), budget=30).size == 30 # reopened
+
+def test_hold_keeps_crate_thumbnails_in_memory(tmp_path, clock):
+    cache = CoverCache(str(tmp_path), budget=20)
+    art = CoverArt(cache, download=lambda url: None)
+    records = [make_record(i) for i in range(3)]
+    cache.put(0, b'a'*10)
+    cache.put(1, b'b'*10)
+    art.hold(records) # no cover of record 2 to hold
+    assert set(art._held) == {0, 1}
+
+    cache.put(2, b'c'*20) # evicts the others from disk
+    assert 0 not in cache
+    assert art.thumbnail(records[0]) == b'a'*10 # still held
+    art.hold(records[2:]) # the next crate
+    assert art.thumbnail(records[0]) is None
+    assert art.thumbnail(records[2]) == b'c'*20
+
+def test_warm_thumbnails_covers_not_yet_cached(tmp_path):
+    Image = pytest.importorskip('PIL.Image')
+    image = BytesIO()
+    Image.new('RGB', (400, 400), 'red').save(image, 'PNG')
+    downloaded = []
+    def download(url):
+        downloaded.append(url)
+        if url == 'missing':
+            raise IOError(url)
+        return b'not an image' if url == 'corrupt' else image.getvalue()
+
+    art = CoverArt(CoverCache(str(tmp_path)), download=download, workers=2,
+                   processes=1, size=50)
+    records = [make_record(i, cover_image=url) for i, url in enumerate(
+            ['red', 'missing', 'corrupt', '', 'red'])]
+    assert art.warm(records) == (2, 2)
+    assert downloaded.count('red') == 2 and '' not in downloaded
+    thumbnail = Image.open(BytesIO(art.thumbnail(records[0])))
+    assert thumbnail.format == 'JPEG' and max(thumbnail.size) <= 50
+    assert art.warm(records) == (0, 2) # only the failures are tried again
@@ -0,0 +1,78 @@
+""" Remember and forget users with `discogs_jockey.credentials`."""
+import os
+from discogs_jockey import discogs_api
+from discogs_jockey.credentials import CredentialCache
+from discogs_jockey.transport import Cassette, ReplayTransport
+
+def test_save_load_and_clear(tmp_path):
+    credentials = CredentialCache(str(tmp_path / 'credentials.json'))
+    assert credentials.load() is None
+    credentials.save('dj', user_id=1, token='t', secret='s')
+    assert os.stat(credentials.path).st_mode & 0o777 == 0o600
+    assert credentials.load() == {'username': 'dj', 'user_id': 1,
+                                  'token': 't', 'secret': 's'}
+    credentials.clear()
+    assert credentials.load() is None
+    credentials.clear() # nothing saved
+
+def test_refused_token_is_forgotten(tmp_path, monkeypatch):
+    credentials = CredentialCache(str(tmp_path / 'credentials.json'))
+    calls = []
+    def get_authorisation(io, transport, credentials, client):
+        calls.append((credentials.load(), client))
+        return 'client', 'user'
+    monkeypatch.setattr(discogs_api, 'get_authorisation', get_authorisation)
+
+    # A user without a token authorises the client they have
+    credentials.save('dj', user_id=1)
+    discogs_api.reauthorise(None, None, credentials, 'old client')
+    assert calls[-1] == (credentials.load(), 'old client')
+
+    # A revoked token is cleared, along with the client holding it
+    credentials.save('dj', user_id=1, token='t', secret='s')
+    assert discogs_api.reauthorise(None, None, credentials, 'old client') == (
+            'client', 'user')
+    assert calls[-1] == (None, None)
+
+def test_save_replaces_credentials_and_tightens_permissions(tmp_path):
+    path = tmp_path / 'credentials.json'
+    path.write_text('{}')
+    os.chmod(str(path), 0o644)
+    credentials = CredentialCache(str(path))
+    credentials.save('dj', user_id=1)
+    credentials.save('mc', user_id=2, token='t', secret='s')
+    assert credentials.load()['username'] == 'mc'
+    assert os.stat(credentials.path).st_mode & 0o777 == 0o600
+    assert os.listdir(str(tmp_path)) == ['credentials.json'] # no temp file
+
+def test_unreadable_or_nameless_credentials_are_none(tmp_path):
+    path = tmp_path / 'credentials.json'
+    credentials = CredentialCache(str(path))
+    path.write_text('{"username": "dj", "tok')
+    assert credentials.load() is None
+    path.write_text('{"username": "", "token": "t"}')
+    assert credentials.load() is None
+
+class Greeter():
+    """ Interactor that greets, and fails if asked for anything else."""
+
+    def __init__(self):
+        self.greeted = []
+
+    def greet_user(self, user):
+        self.greeted.append(user.username)
+
+def test_saved_user_is_neither_asked_for_nor_looked_up(tmp_path, monkeypatch):
+    monkeypatch.setenv('DISCOGS_JOCKEY_CONSUMER_KEY', 'key')
+    monkeypatch.setenv('DISCOGS_JOCKEY_CONSUMER_SECRET', 'secret')
+    credentials = CredentialCache(str(tmp_path / 'credentials.json'))
+    credentials.save('dj', user_id=1, token='t', secret='s')
+    transport = ReplayTransport(Cassette(str(tmp_path / 'empty.jsonl')),
+                                per_minute=None)
+    io = Greeter()
+
+    client, user = discogs_api.get_identity(io, transport, credentials)
+    assert io.greeted == ['dj']
+    assert transport.requests == 0
+    assert client._fetcher.client.resource_owner_key == 't'
+    assert client._fetcher.client.resource_owner_secret == 's'
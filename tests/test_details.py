@@ -0,0 +1,21 @@
+""" Bound and hydrate from `discogs_jockey.details.DetailsCache`."""
+from discogs_jockey.details import DetailsCache, Prefetcher
+
+def test_disk_cache_is_trimmed_while_open():
+    cache = DetailsCache(':memory:', maxsize=2, max_stored=5, trim_every=2)
+    for release_id in range(20):
+        cache.put(release_id, {'tracklist': []})
+        stored = cache._conn.execute('SELECT COUNT(*) FROM details').fetchone()
+        assert stored[0] <= 5 + 1
+    assert stored[0] == 5
+    cache.close()
+
+def test_prefetcher_fills_cache():
+    cache = DetailsCache(':memory:')
+    prefetcher = Prefetcher(lambda release_id: {'tracklist': [
+            {'position': 'A1', 'title': str(release_id)}]}, cache)
+    prefetcher.request([1, 2])
+    prefetcher.join()
+    prefetcher.close()
+    assert cache.get(2)['tracklist'] == [['A1', '2', '']]
+    cache.close()
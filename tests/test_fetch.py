@@ -0,0 +1,117 @@
+""" Fetch from a local stub of the discogs API with
+`discogs_jockey.fetch.CollectionFetcher`, retrying and rate limiting.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import pytest
+from discogs_client.exceptions import HTTPError
+from discogs_jockey.fetch import CollectionFetcher, TokenBucket
+
+class Stub(BaseHTTPRequestHandler):
+    """ Replies to each GET with the next of the server's `replies`, a list
+    of (status, headers, body dict), recording the path requested.
+    """
+
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        status, headers, body = self.server.replies.pop(0)
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args): # keep test output quiet
+        pass
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Stub)
+    server.replies = []
+    server.paths = []
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,),
+                              daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+class Clock():
+    """ Fake time for a TokenBucket, passing only when slept."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+def make_fetcher(stub, **kwargs):
+    clock = Clock()
+    sleeps = []
+    fetcher = CollectionFetcher(
+            base_url='http://127.0.0.1:{}'.format(stub.server_port),
+            limiter=TokenBucket(60, clock=clock, sleep=clock.sleep),
+            sleep=sleeps.append, **kwargs)
+    return fetcher, clock, sleeps
+
+OK = (200, {}, {'id': 1})
+
+def test_429_drains_bucket_and_honours_retry_after(stub):
+    fetcher, clock, sleeps = make_fetcher(stub)
+    stub.replies = [(429, {'Retry-After': '7'}, {'message': 'Slow down'}), OK]
+    assert fetcher.get_release(1) == {'id': 1}
+    assert sleeps == [7.0]
+    assert clock.slept # the drained bucket waited for a token
+    assert stub.paths == ['/releases/1']*2
+
+def test_retry_after_as_http_date(stub):
+    fetcher, clock, sleeps = make_fetcher(stub)
+    stub.replies = [(429, {'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'},
+                     {}), OK]
+    assert fetcher.get_release(1) == {'id': 1}
+    assert sleeps == [0.0] # already passed
+
+def test_unreadable_retry_after_backs_off(stub):
+    fetcher, clock, sleeps = make_fetcher(stub, backoff=2.0)
+    stub.replies = [(503, {'Retry-After': 'soon'}, {}), OK]
+    assert fetcher.get_release(1) == {'id': 1}
+    assert 2.0 <= sleeps[0] <= 3.0
+
+def test_5xx_backs_off_exponentially_then_gives_up(stub):
+    fetcher, clock, sleeps = make_fetcher(stub, backoff=1.0, max_retries=3)
+    stub.replies = [(500, {}, {}), (502, {}, {}), (503, {}, {}),
+                    (504, {}, {'message': 'Gateway timeout'})]
+    with pytest.raises(HTTPError) as err:
+        fetcher.get_release(1)
+    assert err.value.args == ('Gateway timeout', 504)
+    assert len(sleeps) == 3
+    for attempt, delay in enumerate(sleeps):
+        assert 2**attempt <= delay <= 1.5 * 2**attempt
+    assert not clock.slept # 5xx leave the bucket alone
+
+def test_ratelimit_headers_update_bucket(stub):
+    fetcher, clock, sleeps = make_fetcher(stub)
+    stub.replies = [(200, {'X-Discogs-Ratelimit': '25',
+                           'X-Discogs-Ratelimit-Remaining': '3'}, {'id': 1})]
+    fetcher.get_release(1)
+    assert fetcher.limiter.capacity == 25
+    assert fetcher.limiter.rate == 25 / 60
+    assert fetcher.limiter.tokens == 3
+
+def test_fetch_items_pages_through_folder(stub):
+    fetcher, clock, sleeps = make_fetcher(stub, per_page=2, workers=1)
+    page = lambda n: (200, {}, {'pagination': {'pages': 3, 'page': n},
+                                'releases': [{'id': 2*n}, {'id': 2*n + 1}]})
+    stub.replies = [page(1), page(2), page(3)]
+    items = fetcher.fetch_items('dj')
+    assert [item['id'] for item in items] == [2, 3, 4, 5, 6, 7]
+    assert stub.paths[0] == '/users/dj/collection/folders/0/releases?page=1&per_page=2'
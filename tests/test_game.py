@@ -0,0 +1,66 @@
+""" Play rounds of `discogs_jockey.game.Game` with scripted input."""
+from discogs_jockey.collection import Shelf
+from discogs_jockey.exceptions import FreePick
+from discogs_jockey.game import Game
+from discogs_jockey.interactor import Interactor
+from conftest import make_records
+
+class Script(Interactor):
+    """ Answers prompts from lists: `choices` (FreePick to ask for a free
+    pick, 'first' to choose the first record in the crate) and `finds`
+    ('first' to find the first record on the shelf).
+    """
+
+    def __init__(self, choices, finds=()):
+        self.choices = list(choices)
+        self.finds = list(finds)
+        self.drawn = 0
+        self.no_free_picks = 0
+
+    def display_option(self, record, k=None):
+        self.drawn += 1
+
+    def display_no_free_picks(self):
+        self.no_free_picks += 1
+
+    def get_choice(self, crate):
+        choice = self.choices.pop(0)
+        if choice is FreePick:
+            raise FreePick()
+        if choice == 'first':
+            return next(iter(crate.records))
+        return choice
+
+    def find_record(self, shelf):
+        find = self.finds.pop(0)
+        if find == 'first':
+            return next(iter(shelf.records))
+        return find
+
+def play_round(io, free_picks):
+    game = Game(Shelf(make_records(10)), io, rules={
+            'cap': 3, 'replace': False, 'free_picks': free_picks})
+    game.play_round()
+    return game
+
+def test_cancelled_free_pick_does_not_draw():
+    io = Script([FreePick, FreePick, 'first'], finds=[None, None])
+    game = play_round(io, free_picks=1)
+    assert io.drawn == 1
+    assert game.free_picks == 1 # cancelled searches are free
+    assert len(game.history[1]['played']) == 1
+
+def test_free_pick_takes_record_off_shelf():
+    io = Script([FreePick], finds=['first'])
+    game = play_round(io, free_picks=1)
+    found = game.history[1]['played'][0].release_id
+    assert game.free_picks == 0
+    assert found not in game.shelf.records
+    assert len(game.history[1]['unplayed']) == 1 # the record drawn
+
+def test_no_free_picks_left_is_shown_without_drawing():
+    io = Script([FreePick, 'first'])
+    game = play_round(io, free_picks=0)
+    assert io.no_free_picks == 1
+    assert io.drawn == 1
+    assert io.finds == [] # never searched
@@ -0,0 +1,67 @@
+""" Journal, resume and compact sets with `discogs_jockey.history`."""
+import os
+from discogs_jockey.collection import Shelf
+from discogs_jockey.game import Game
+from discogs_jockey.history import HistoryJournal, HistoryStore, resume_game
+from conftest import make_records
+
+def make_game():
+    return Game(Shelf(make_records(10)), None, rules={'cap': 2,
+                                                      'replace': False})
+
+def write_set(path, finished):
+    records = make_records(10)
+    journal = HistoryJournal(path)
+    journal.append(1, records[:1], records[1:2])
+    journal.append(2, records[2:3], [])
+    if finished:
+        journal.finish()
+    journal.close()
+    return journal.session
+
+def test_unfinished_set_resumes(tmp_path):
+    path = str(tmp_path / 'history.journal')
+    session = write_set(path, finished=False)
+    game = make_game()
+    assert resume_game(game, path) == session
+    assert game.round == 3
+    assert len(game.shelf) == 7
+
+def test_finished_set_does_not_resume(tmp_path):
+    # As if the journal outlived a crash after its set was stored
+    path = str(tmp_path / 'history.journal')
+    write_set(path, finished=True)
+    store = HistoryStore(':memory:')
+    assert store.compact(path) == 3
+    write_set(path, finished=True)
+    game = make_game()
+    assert resume_game(game, path) is None
+    assert game.round == 1
+    assert len(game.shelf) == 10
+
+def test_sessions_started_together_differ(tmp_path):
+    path = str(tmp_path / 'history.journal')
+    journals = [HistoryJournal(path) for i in range(10)]
+    assert len({journal.session for journal in journals}) == 10
+    for journal in journals:
+        journal.close()
+
+def test_torn_tail_then_resume_keeps_every_round(tmp_path):
+    path = str(tmp_path / 'history.journal')
+    session = write_set(path, finished=False)
+    with open(path, 'a', encoding='utf-8') as f: # crash mid write
+        f.write('{"session": "%s", "round": 3, "pla' % session)
+
+    game = make_game()
+    assert resume_game(game, path) == session
+    assert game.round == 3
+    journal = HistoryJournal(path, session=session)
+    journal.append(3, make_records(10)[3:4], [])
+    journal.finish()
+    journal.close()
+
+    assert resume_game(make_game(), path) is None # finish marker readable
+    store = HistoryStore(':memory:')
+    assert store.compact(path) == 4
+    assert store.sessions() == [(session, 3)]
+    assert os.path.getsize(path) == 0
@@ -0,0 +1,71 @@
+""" Find Records by field with `discogs_jockey.index.ShelfIndex` and
+`discogs_jockey.collection.Shelf.query`, as records are taken and put back.
+"""
+import pytest
+from discogs_jockey.collection import Shelf
+from discogs_jockey.index import ShelfIndex
+from conftest import make_record
+
+def make_shelf():
+    """ Return a Shelf of 12 records on labels A, B and C, of years 1990 to
+    1995, styled Techno (even release_ids) or House (odd).
+    """
+    return Shelf([make_record(i, labels=('ABC'[i % 3],), year=1990 + i % 6,
+                              styles=('Techno' if i % 2 == 0 else 'House',))
+                  for i in range(12)])
+
+def test_ids_union_values_and_intersect_fields():
+    index = ShelfIndex(make_shelf().records.values())
+    assert index.ids(labels='A') == {0, 3, 6, 9}
+    assert index.ids(labels=['A', 'B']) == {0, 1, 3, 4, 6, 7, 9, 10}
+    assert index.ids(labels='A', styles='Techno') == {0, 6}
+    assert index.ids(year=range(1990, 1992), styles='House') == {1, 7}
+    assert index.ids(labels='Z') == set()
+    assert index.values('labels') == [('A', 4), ('B', 4), ('C', 4)]
+
+def test_ids_refuses_unindexed_fields_and_no_criteria():
+    index = ShelfIndex()
+    with pytest.raises(TypeError):
+        index.ids(title='Title 1')
+    with pytest.raises(TypeError):
+        index.ids()
+
+def test_remove_drops_empty_postings():
+    records = [make_record(1, labels=('A', 'B')), make_record(2)]
+    index = ShelfIndex(records)
+    index.remove(records[0])
+    assert index.ids(labels=['A', 'B']) == set()
+    assert [value for value, n in index.values('labels')] == ['Label']
+
+def test_query_leaves_records_on_shelf():
+    shelf = make_shelf()
+    techno = shelf.query(styles='Techno', labels='A')
+    assert list(techno.records) == [0, 6]
+    assert len(shelf) == 12
+
+def test_query_skips_taken_records_until_put_back():
+    shelf = make_shelf()
+    shelf.query(labels='A') # build the index before drawing
+    taken = shelf.pick_records([0, 3]) + shelf.random_records(4)
+    on_shelf = {i for i in (0, 3, 6, 9) if i in shelf.records}
+    assert set(shelf.query(labels='A').records) == on_shelf
+    assert shelf.index.ids(labels='A') == on_shelf
+
+    shelf.add_records(taken)
+    assert list(shelf.query(labels='A').records) == [0, 3, 6, 9]
+
+def test_put_back_record_is_found_by_its_new_fields():
+    shelf = make_shelf()
+    shelf.query(labels='A')
+    record, = shelf.pick_records([0])
+    shelf.add_records(make_record(0, labels=('Z',)))
+    assert list(shelf.query(labels='Z').records) == [0]
+    assert list(shelf.query(labels='A').records) == [3, 6, 9]
+
+def test_emptied_shelf_is_indexed_afresh():
+    shelf = make_shelf()
+    shelf.query(labels='A')
+    shelf.empty()
+    shelf.add_records(make_record(0, labels=('Z',)))
+    assert list(shelf.query(labels=['A', 'Z']).records) == [0]
+    assert shelf.index.values('labels') == [('Z', 1)]
@@ -0,0 +1,100 @@
+""" Merge, draw from and put back onto `discogs_jockey.merged.MergedShelf`."""
+from discogs_jockey.merged import MergedShelf
+from conftest import make_items
+
+def check_owner_slots(shelf):
+    """ Assert each owner's draw list holds exactly their shelved records."""
+    for owner, ids in shelf._owner_ids.items():
+        assert sorted(ids) == sorted(
+                release_id for release_id in shelf.records
+                if owner in shelf.owners[release_id])
+        slots = shelf._owner_slots[owner]
+        assert {release_id: ids.index(release_id) for release_id in ids} == slots
+
+def test_shared_records_are_shelved_once_with_all_owners():
+    shelf = MergedShelf({'ann': make_items(range(0, 6)),
+                         'bob': make_items(range(4, 10))}, chunk=2)
+    assert len(shelf) == 10
+    assert shelf.owners_of(4) == shelf.owners_of(5) == ('ann', 'bob')
+    assert shelf.owners_of(0) == ('ann',)
+    assert shelf.owners_of(9) == ('bob',)
+    assert sorted(r.release_id for r in shelf.records_of('bob')) == list(
+            range(4, 10))
+    check_owner_slots(shelf)
+
+def test_turns_pass_between_owners():
+    shelf = MergedShelf({'ann': make_items(range(0, 20)),
+                         'bob': make_items(range(100, 120))}, turn_order=True)
+    assert shelf.current_owner == 'ann'
+    for owner in ['ann', 'bob', 'ann', 'bob']:
+        assert shelf.current_owner == owner
+        drawn = shelf.random_records(3)
+        assert all(owner in shelf.owners_of(r.release_id) for r in drawn)
+        shelf.note_round(drawn[:1], drawn[1:])
+    shelf.note_round([], []) # nothing played, same turn
+    assert shelf.current_owner == 'ann'
+    check_owner_slots(shelf)
+
+def test_turn_skips_owner_with_no_records_left():
+    shelf = MergedShelf({'ann': make_items(range(2)),
+                         'bob': make_items(range(100, 110))}, turn_order=True)
+    shelf.random_records(2)
+    assert shelf.current_owner == 'bob'
+    assert all(r.release_id >= 100 for r in shelf.random_records(3))
+
+def test_put_back_restores_ownership():
+    shelf = MergedShelf({'ann': make_items(range(0, 6)),
+                         'bob': make_items(range(4, 10))}, turn_order=True)
+    drawn = shelf.pick_records([4, 5]) + shelf.random_records(4)
+    assert 4 not in shelf._owner_slots['ann']
+    check_owner_slots(shelf)
+    shelf.add_records(drawn)
+    assert len(shelf) == 10
+    assert shelf.owners_of(4) == ('ann', 'bob')
+    check_owner_slots(shelf)
+
+def test_query_keeps_owners_and_turns():
+    shelf = MergedShelf({'ann': make_items(range(0, 6), year=1995),
+                         'bob': make_items(range(4, 6), year=1995)
+                                + make_items(range(6, 10), year=2005)},
+                        turn_order=['bob', 'ann'])
+    nineties = shelf.query(year=range(1990, 2000))
+    assert isinstance(nineties, MergedShelf)
+    assert sorted(nineties.records) == list(range(0, 6))
+    assert nineties.turn_order == ['bob', 'ann']
+    assert nineties.owners_of(4) == ('ann', 'bob')
+    assert nineties.current_owner == 'bob'
+    check_owner_slots(nineties)
+
+def test_refused_merged_collection_is_authorised_and_read_again(
+        tmp_path, monkeypatch):
+    from types import SimpleNamespace
+    from discogs_client.exceptions import HTTPError
+    from discogs_jockey import discogs_api
+    from discogs_jockey.credentials import CredentialCache
+
+    class Fetcher():
+        def __init__(self, client):
+            self.client = client
+
+        def iter_pages(self, username, folder_id=0):
+            if username == 'dj' and self.client == 'revoked':
+                raise HTTPError('Unauthorized', 401)
+            ids = range(0, 3) if username == 'dj' else range(10, 13)
+            yield {'pagination': {'pages': 1}, 'releases': make_items(ids)}
+
+    user = SimpleNamespace(username='dj')
+    monkeypatch.setattr(discogs_api, 'get_identity',
+                        lambda io, transport, credentials: ('revoked', user))
+    monkeypatch.setattr(discogs_api, 'make_collection_fetcher', Fetcher)
+    monkeypatch.setattr(discogs_api, 'get_authorisation',
+                        lambda io, transport, credentials, client:
+                                ('authorised', user))
+    credentials = CredentialCache(str(tmp_path / 'credentials.json'))
+    credentials.save('dj', token='t', secret='s')
+
+    shelf = discogs_api.get_merged_shelf_from_discogs(
+            None, ['guest'], credentials=credentials)
+    assert sorted(shelf.records) == [0, 1, 2, 10, 11, 12]
+    assert shelf.turn_order == ['dj', 'guest']
+    assert credentials.load() is None # revoked token forgotten
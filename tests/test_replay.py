@@ -0,0 +1,61 @@
+""" Build shelves from collections replayed by
+`discogs_jockey.transport.ReplayTransport`, counting the requests made.
+"""
+import json
+from discogs_jockey.collection import Shelf
+from discogs_jockey.discogs_api import make_app_client
+from discogs_jockey.transport import Cassette, ReplayTransport, request_key
+from conftest import make_item
+
+BASE_URL = 'https://api.discogs.com'
+USERNAME = 'dj'
+PER_PAGE = 50 # discogs_client's page size
+
+def record(cassette, url, body):
+    cassette.put(request_key('GET', url), 200, {}, json.dumps(body).encode())
+
+def write_cassette(path, n):
+    """ Record a user with `n` vinyl releases in folder 0, and each release."""
+    cassette = Cassette(path)
+    user_url = '{}/users/{}'.format(BASE_URL, USERNAME)
+    folders_url = user_url + '/collection/folders'
+    record(cassette, user_url, {'id': 1, 'username': USERNAME,
+                                'resource_url': user_url,
+                                'collection_folders_url': folders_url})
+    record(cassette, folders_url, {'folders': [
+            {'id': 0, 'name': 'All', 'count': n,
+             'resource_url': folders_url + '/0'}]})
+    pages = -(-n // PER_PAGE)
+    for page in range(1, pages + 1):
+        record(cassette, '{}/0/releases?page={}&per_page={}'.format(
+                       folders_url, page, PER_PAGE),
+               {'pagination': {'page': page, 'pages': pages, 'items': n,
+                               'per_page': PER_PAGE},
+                'releases': [make_item(i) for i in range(
+                        (page - 1)*PER_PAGE, min(page*PER_PAGE, n))]})
+    for i in range(n):
+        record(cassette, '{}/releases/{}'.format(BASE_URL, i),
+               {'id': i, 'title': 'Title {}'.format(i),
+                'tracklist': [{'position': 'A1', 'title': 'Track'}]})
+    return cassette
+
+def test_shelf_from_folder_fetches_only_pages(tmp_path):
+    n = 120
+    transport = ReplayTransport(write_cassette(str(tmp_path / 'c.jsonl'), n),
+                                per_minute=None)
+    client = make_app_client(transport)
+    folder = client.user(USERNAME).collection_folders[0]
+    transport.reset() # count requests for the shelf only
+
+    shelf = Shelf(folder)
+    assert len(shelf) == n
+    assert transport.misses == []
+    assert transport.requests == -(-n // PER_PAGE) # one per page
+    assert dict(transport.statuses) == {200: transport.requests}
+
+    # A full release is only fetched once asked for
+    drawn = shelf.random_records(1)[0]
+    assert transport.requests == -(-n // PER_PAGE)
+    assert drawn.release.title == drawn.title
+    assert transport.requests == -(-n // PER_PAGE) + 1
+    assert transport.misses == []
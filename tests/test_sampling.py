@@ -0,0 +1,25 @@
+""" Weighted draws from `discogs_jockey.sampling.WeightedShelf`."""
+from discogs_jockey.collection import Shelf
+from discogs_jockey.sampling import RecencyWeights, WeightedShelf
+from conftest import make_records
+
+def test_weights_survive_save_and_load(tmp_path):
+    path = str(tmp_path / 'weights.json')
+    weights = RecencyWeights.load(path)
+    weights.played([1])
+    weights.save(path)
+    weights = RecencyWeights.load(path)
+    assert weights.session == 1
+    assert weights.weight(1) < weights.weight(2) == weights.max_weight
+
+def test_load_snapshot_draws_by_weight(tmp_path):
+    path = str(tmp_path / 'shelf.snapshot')
+    Shelf(make_records(50)).save_snapshot(path)
+    weights = RecencyWeights(last_played={i: 0 for i in range(49)},
+                             session=0, floor=0.0)
+    shelf = WeightedShelf.load_snapshot(path, weights=weights)
+    assert len(shelf) == 50
+    assert [r.release_id for r in shelf.random_records(1)] == [49]
+    drawn = shelf.random_records(49) # all weights zero, drawn uniformly
+    assert len(shelf) == 0
+    assert sorted(r.release_id for r in drawn) == list(range(49))
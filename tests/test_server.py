@@ -0,0 +1,84 @@
+""" Play games against `discogs_jockey.server.serve` over a real socket."""
+import asyncio
+import http.client
+import json
+import socket
+from discogs_jockey.server import serve
+from conftest import make_records
+
+class Client():
+    """ Local JSON client of one keep-alive connection to the server."""
+
+    def __init__(self, port):
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+
+    def request(self, method, path, body=None):
+        payload = None if body is None else json.dumps(body)
+        self.conn.request(method, path, body=payload,
+                          headers={'Content-Type': 'application/json'})
+        resp = self.conn.getresponse()
+        return resp.status, json.loads(resp.read())
+
+def run_with_server(records, client_func):
+    """ Run `client_func(port, game_server)` in a thread against `serve`."""
+    async def main():
+        ready = asyncio.get_running_loop().create_future()
+        task = asyncio.ensure_future(serve(records, port=0, ready=ready))
+        game_server = await ready
+        try:
+            return await asyncio.to_thread(client_func, game_server.port,
+                                           game_server)
+        finally:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    return asyncio.run(main())
+
+def test_play_set():
+    def play(port, game_server):
+        client = Client(port)
+        status, reply = client.request('POST', '/sessions',
+                                       {'cap': 2, 'replace': False})
+        assert status == 200
+        session = reply['session']
+        played = []
+        events = reply['events']
+        while events[-1]['event'] == 'choose':
+            crate = [e for e in events if e['event'] == 'crate']
+            choice = 1 if crate else None # draw until there is a crate
+            status, reply = client.request(
+                    'POST', '/sessions/{}/choice'.format(session),
+                    {'choice': choice})
+            assert status == 200
+            events = reply['events']
+            played += [e['record']['release_id'] for e in events
+                       if e['event'] == 'choice']
+        assert events[-1]['event'] in ('finished', 'history')
+        assert session not in game_server.sessions
+        return played
+
+    played = run_with_server(make_records(6), play)
+    assert len(played) == len(set(played)) >= 3 # each record played once
+
+def test_bad_requests_get_400_and_no_session():
+    def bad(port, game_server):
+        statuses = []
+        for body in ([1], {'cap': 'x'}, {'cap': -1}, {'cap': 0},
+                     {'replace': 1}, {'bogus': 1}):
+            status, reply = Client(port).request('POST', '/sessions', body)
+            statuses.append(status)
+
+        # Malformed request line, header and JSON
+        for raw in (b'NONSENSE\r\n\r\n',
+                    b'POST /sessions HTTP/1.1\r\nno colon\r\n\r\n',
+                    b'POST /sessions HTTP/1.1\r\nContent-Length: 3\r\n\r\n{x}'):
+            with socket.create_connection(('127.0.0.1', port), 10) as sock:
+                sock.sendall(raw)
+                statuses.append(int(sock.recv(1024).split()[1]))
+        return statuses, len(game_server.sessions)
+
+    statuses, sessions = run_with_server(make_records(6), bad)
+    assert statuses == [400]*9
+    assert sessions == 0
@@ -0,0 +1,29 @@
+""" Draws that mix with the last record, from
+`discogs_jockey.similarity.MixableShelf`.
+"""
+from discogs_jockey.similarity import MixableShelf
+from conftest import make_record
+
+def styled(i, styles):
+    """ Return a Record of `styles`, with a label and era of its own."""
+    return make_record(i, labels=('Label {}'.format(i),), year=1970 + 5*i,
+                       styles=styles)
+
+def test_second_round_is_biased_toward_first_played():
+    records = [styled(i, ('Techno',) if i < 3 else ('Jazz {}'.format(i),))
+               for i in range(40)]
+    shelf = MixableShelf(records, bias=1.0, k=5)
+    played = shelf.pick_records([0])
+    shelf.note_round(played, [])
+    drawn = [r.release_id for r in shelf.random_records(2)]
+    assert sorted(drawn) == [1, 2] # the only other Techno records
+    assert len(shelf) == 37
+
+def test_index_built_early_skips_records_drawn_since():
+    shelf = MixableShelf([styled(i, ('Techno',)) for i in range(6)],
+                         bias=1.0)
+    assert len(shelf.mixability) == 6
+    played = shelf.pick_records([0, 1])
+    shelf.note_round(played[:1], played[1:])
+    drawn = {r.release_id for r in shelf.random_records(4)}
+    assert drawn == {2, 3, 4, 5}
@@ -0,0 +1,42 @@
+""" Cold start of the game and the `discogs_jockey` modules it imports,
+timed with `python -X importtime` in a fresh interpreter, as
+benchmarks/bench_startup.py.
+"""
+import os
+import subprocess
+import sys
+import pytest
+
+BUDGET_MS = 100 # as benchmarks/bench_startup.py
+HEAVY = ['pandas', 'numpy', 'discogs_client', 'requests']
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_times(module):
+    """ Return {module: cumulative import microseconds} for a cold import."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                           'import {}'.format(module)],
+                          env=env, cwd=ROOT, stderr=subprocess.PIPE,
+                          universal_newlines=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative_us)
+    return times
+
+def test_game_starts_within_budget():
+    times = import_times('Play_Discogs_Jockey')
+    assert times['Play_Discogs_Jockey'] / 1e3 <= BUDGET_MS
+
+# Modules the game or server start with; collection sources such as
+# discogs_api import their dependencies when loaded
+@pytest.mark.parametrize('module', [
+        'Play_Discogs_Jockey', 'discogs_jockey.collection',
+        'discogs_jockey.game', 'discogs_jockey.interactor',
+        'discogs_jockey.merged', 'discogs_jockey.sampling',
+        'discogs_jockey.server'])
+def test_heavy_dependencies_are_imported_lazily(module):
+    times = import_times(module)
+    assert [name for name in HEAVY if name in times] == []
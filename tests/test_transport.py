@@ -0,0 +1,74 @@
+""" Make a discogs client's requests, and those of the collection fetcher
+made from it, through one `discogs_jockey.transport.SessionTransport`,
+against a local stub of the discogs API.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import pytest
+from discogs_jockey.discogs_api import make_app_client, make_collection_fetcher
+from discogs_jockey.transport import SessionTransport
+
+class Echo(BaseHTTPRequestHandler):
+    """ Replies to each GET with its path, recording the path, headers and
+    client port of the request.
+    """
+    protocol_version = 'HTTP/1.1' # keep connections alive
+
+    def do_GET(self):
+        self.server.requests.append(
+                (self.path, dict(self.headers), self.client_address[1]))
+        payload = json.dumps({'path': self.path}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args): # keep test output quiet
+        pass
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Echo)
+    server.requests = []
+    server.url = 'http://127.0.0.1:{}'.format(server.server_port)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,),
+                              daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def client(stub, monkeypatch):
+    """ A client of the stub, holding an access token."""
+    monkeypatch.setenv('DISCOGS_JOCKEY_CONSUMER_KEY', 'key')
+    monkeypatch.setenv('DISCOGS_JOCKEY_CONSUMER_SECRET', 'secret')
+    client = make_app_client(SessionTransport(workers=1))
+    client._base_url = stub.url
+    client.set_token('t', 's')
+    return client
+
+def test_client_requests_are_signed(stub, client):
+    assert client._get(stub.url + '/releases/1') == {'path': '/releases/1'}
+    path, headers, port = stub.requests[0]
+    assert headers['Authorization'].startswith('OAuth ')
+    assert 'oauth_consumer_key="key"' in headers['Authorization']
+    assert 'oauth_token="t"' in headers['Authorization']
+    assert 'oauth_signature=' in headers['Authorization']
+
+def test_fetcher_shares_the_client_session(stub, client):
+    transport = client._fetcher.transport
+    fetcher = make_collection_fetcher(client)
+    assert fetcher.session is transport
+
+    client._get(stub.url + '/users/dj')
+    assert fetcher.get_release(2) == {'path': '/releases/2'}
+    client._get(stub.url + '/releases/3')
+    assert [path for path, headers, port in stub.requests] == [
+            '/users/dj', '/releases/2', '/releases/3']
+    assert all('oauth_token="t"' in headers['Authorization']
+               for path, headers, port in stub.requests)
+    # One pooled connection, kept alive throughout
+    assert len({port for path, headers, port in stub.requests}) == 1